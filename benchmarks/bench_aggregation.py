@@ -0,0 +1,88 @@
+"""Сравнение агрегации по строковому ключу и колоночной агрегации.
+
+Запуск: python -m benchmarks.bench_aggregation --sizes 10000 1000000 10000000
+Результат печатается в stdout в виде JSON.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from legacy.aggregation import aggregate, aggregate_frame
+from legacy.partner_data.data import PartnerData
+
+DEFAULT_SIZES = [10_000, 1_000_000, 10_000_000]
+
+
+def string_key_aggregate(partner_data_list):
+    """Прежняя реализация agg_list_2keys_2values — точка отсчёта для сравнения."""
+    aggregated_data = {}
+
+    for partner_data in partner_data_list:
+        key = str(partner_data.ssp) + str(partner_data.dsp_id) + str(partner_data.date)
+        if key in aggregated_data:
+            aggregated_data[key].imps += partner_data.imps
+            aggregated_data[key].spent += partner_data.spent
+        else:
+            aggregated_data[key] = partner_data
+
+    return list(aggregated_data.values())
+
+
+def make_frame(size, days=365, partners=12, seed=0):
+    """Синтетические строки: partners партнёров × days дней, повторяющиеся ключи."""
+    rng = np.random.default_rng(seed)
+    dsp_ids = rng.integers(0, partners, size)
+    return pd.DataFrame({
+        'date': pd.Timestamp('2025-01-01') + pd.to_timedelta(rng.integers(0, days, size), unit='D'),
+        'dsp_id': dsp_ids,
+        'ssp': np.where(dsp_ids % 2 == 0, 'ssp-partner-' + dsp_ids.astype(str), ''),
+        'imps': rng.integers(0, 10_000, size),
+        'spent': rng.random(size) * 100,
+        'currency': np.where(dsp_ids % 3 == 0, 'rub', 'usd'),
+    })
+
+
+def frame_to_rows(frame):
+    return [
+        PartnerData(date=date, dsp_id=int(dsp_id), ssp=ssp, imps=int(imps), spent=float(spent), currency=currency)
+        for date, dsp_id, ssp, imps, spent, currency in frame.itertuples(index=False, name=None)
+    ]
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - started, result
+
+
+def run(sizes):
+    results = []
+    for size in sizes:
+        frame = make_frame(size)
+        rows = frame_to_rows(frame)
+        frame_seconds, frame_result = timed(aggregate_frame, frame)
+        rows_seconds, _ = timed(aggregate, rows)
+        # string_key_aggregate мутирует входные объекты, поэтому меряем его последним
+        legacy_seconds, _ = timed(string_key_aggregate, rows)
+        results.append({
+            'rows': size,
+            'groups': len(frame_result),
+            'string_key_seconds': legacy_seconds,
+            'aggregate_seconds': rows_seconds,
+            'aggregate_frame_seconds': frame_seconds,
+        })
+    return results
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    args = arg_parser.parse_args()
+    print(json.dumps(run(args.sizes), indent=2))
+
+
+if __name__ == '__main__':
+    main()
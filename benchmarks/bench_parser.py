@@ -0,0 +1,130 @@
+"""Бенчмарк разбора ответов всех партнёров на синтетических данных.
+
+Для каждого размера и партнёра замеряются norm_parse, преобразование записей
+в PartnerBatch (parse_one_url без сети), agg_list_2keys_2values и сквозной load()
+для всех партнёров через httpx.MockTransport внутри процесса.
+
+Запуск: python -m benchmarks.bench_parser --sizes 1000 100000 1000000 --output bench.json
+Результат — JSON, который можно сравнивать между версиями. size — запрошенный
+размер, payload_rows и rows — строк в теле и разобранных записей: у партнёров,
+где дата — ключ словаря, их не больше одного на день (см. benchmarks.payloads).
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import platform
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+import httpx
+import pandas as pd
+
+from benchmarks.payloads import AUTH_RESPONSES, generate_payload, payload_rows
+from legacy.context import RunContext
+from legacy.partner_data.batch import PartnerBatch
+from legacy.parser import agg_list_2keys_2values, get_all_partners, load, parse_one_url
+from legacy.singleflight import SingleFlight
+
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+START_DATE = datetime.date(2025, 1, 1)
+FINISH_DATE = datetime.date(2025, 12, 31)
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - started, result
+
+
+def bench_partner(partner, body):
+    """Замеры одного партнёра на одном теле ответа."""
+    parse_seconds, records = timed(lambda: list(partner.norm_parse(body)))
+
+    async def fetch_records(url):
+        return records
+
+    partner.fetch_records = fetch_records
+    partner_data_list = []
+    convert_seconds, _ = timed(asyncio.run, parse_one_url(partner, 'bench://', partner_data_list))
+    aggregate_seconds, aggregated = timed(agg_list_2keys_2values, PartnerBatch.concat(partner_data_list))
+    return {
+        'partner': partner.id,
+        'body_bytes': len(body),
+        'rows': len(records),
+        'norm_parse_seconds': parse_seconds,
+        'convert_seconds': convert_seconds,
+        'aggregate_seconds': aggregate_seconds,
+        'aggregated_rows': len(aggregated),
+    }
+
+
+def mock_transport(bodies_by_host):
+    """Транспорт, отдающий заготовленные тела по хосту и токены на эндпоинтах авторизации."""
+    def handler(request):
+        url = str(request.url)
+        if request.method == 'POST':
+            return httpx.Response(200, json=AUTH_RESPONSES[url])
+        return httpx.Response(200, content=bodies_by_host[urlsplit(url).netloc])
+    return httpx.MockTransport(handler)
+
+
+def bench_load(bodies):
+    """Сквозной load() по всем партнёрам через транспорт внутри процесса."""
+    partners = get_all_partners()
+    bodies_by_host = {}
+    for partner in partners:
+        for url in partner.get_urls(partner.format_date(START_DATE), partner.format_date(FINISH_DATE)):
+            bodies_by_host[urlsplit(url).netloc] = bodies[partner.id]
+    context = RunContext(single_flight=SingleFlight())
+    seconds, data = timed(asyncio.run, load(partners, START_DATE, FINISH_DATE, mock_transport(bodies_by_host), context))
+    return {'load_seconds': seconds, 'load_rows': len(data)}
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes, partner_ids=None):
+    results = []
+    for size in sizes:
+        bodies = {}
+        for partner in get_all_partners():
+            if partner_ids and partner.id not in partner_ids:
+                continue
+            bodies[partner.id] = generate_payload(partner.id, size)
+            results.append({'size': size, 'payload_rows': payload_rows(partner.id, size),
+                            **bench_partner(partner, bodies[partner.id])})
+        if not partner_ids:
+            results.append({'size': size, 'partner': '*', **bench_load(bodies)})
+    return {
+        'revision': git_revision(),
+        'python': sys.version.split()[0],
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'results': results,
+    }
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    arg_parser.add_argument('--partners', nargs='+', help='id партнёров; без него замеряются все и сквозной load')
+    arg_parser.add_argument('--output', help='файл для JSON; по умолчанию stdout')
+    args = arg_parser.parse_args()
+    report = json.dumps(run(args.sizes, args.partners), indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(report)
+    else:
+        print(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""Локальный HTTP-заменитель ClickHouse для проверки вставки.
+
+Принимает POST на HTTP-интерфейс, как ClickHouse: запрос в параметре query, тело —
+блоки формата Native. Каждое тело разбирается обратно в PartnerBatch, поэтому тесты
+и нагрузочные прогоны видят, какие именно строки и какими запросами пришли.
+Блок с уже виденным insert_deduplication_token принимается, но не добавляется,
+как в ClickHouse. Настраиваются задержка ответа и доля отказов (500).
+"""
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import random
+import threading
+import time
+from typing import List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from legacy.clickhouse import native_to_batch
+from legacy.partner_data.batch import PartnerBatch
+
+
+@dataclass
+class ReceivedInsert:
+    query: str
+    user: Optional[str]
+    deduplication_token: Optional[str]
+    rows: int
+    bytes: int
+
+
+@dataclass
+class ClickHouseStandinStats:
+    requests: int = 0
+    errors: int = 0
+    max_in_flight: int = 0
+    deduplicated: int = 0
+    inserts: List[ReceivedInsert] = field(default_factory=list)
+
+
+class ClickHouseStandin:
+    """ThreadingHTTPServer в фоновом потоке; принятые строки копятся в batches."""
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, seed: int = 0, host: str = '127.0.0.1'):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.stats = ClickHouseStandinStats()
+        self.batches: List[PartnerBatch] = []
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._tokens = set()
+        self._server = ThreadingHTTPServer((host, 0), self._handler())
+        self.host, self.port = self._server.server_address[:2]
+
+    def rows(self) -> PartnerBatch:
+        with self._lock:
+            return PartnerBatch.concat(self.batches)
+
+    def __enter__(self) -> 'ClickHouseStandin':
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _accept(self, query: str, user: Optional[str], token: Optional[str], body: bytes) -> Optional[str]:
+        """Возвращает текст ошибки или None, если вставка принята."""
+        with self._lock:
+            self.stats.requests += 1
+            self._in_flight += 1
+            self.stats.max_in_flight = max(self.stats.max_in_flight, self._in_flight)
+            fail = self._random.random() < self.error_rate
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+            if fail:
+                return 'Code: 241. DB::Exception: Memory limit exceeded (stand-in)'
+            if not query.startswith('INSERT INTO ') or not query.endswith(' FORMAT Native'):
+                return f'Code: 62. DB::Exception: unexpected query {query!r}'
+            batch = native_to_batch(body)
+            with self._lock:
+                self.stats.inserts.append(ReceivedInsert(query, user, token, len(batch), len(body)))
+                if token is not None and token in self._tokens:
+                    self.stats.deduplicated += 1
+                    return None
+                self._tokens.add(token)
+                self.batches.append(batch)
+            return None
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def _handler(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                params = parse_qs(urlsplit(self.path).query)
+                token = params.get('insert_deduplication_token', [None])[0]
+                error = standin._accept(params.get('query', [''])[0], self.headers.get('X-ClickHouse-User'), token, body)
+                if error is not None:
+                    with standin._lock:
+                        standin.stats.errors += 1
+                self.send_response(500 if error else 200)
+                payload = (error or '').encode()
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
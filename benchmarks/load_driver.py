@@ -0,0 +1,139 @@
+"""Сквозной нагрузочный прогон load_insert_data против локального стенда партнёров.
+
+Поднимает StandinServer в отдельном потоке, гоняет load_insert_data через
+LocalRedirectTransport нужное число раз и печатает JSON с пропускной способностью
+(строк и запросов в секунду) и перцентилями задержки запросов. Вставка в ClickHouse
+по умолчанию заменяется счётчиком строк, чтобы измерялась только загрузка и разбор;
+с --clickhouse строки идут через ClickHouseWriter в локальный ClickHouseStandin.
+
+Запуск: python -m benchmarks.load_driver --rows 100000 --latency 0.05 --error-rate 0.01 --runs 3
+"""
+import argparse
+import asyncio
+from contextlib import ExitStack
+import datetime
+import json
+import threading
+import time
+
+import numpy as np
+
+from benchmarks.bench_parser import git_revision
+from benchmarks.clickhouse_standin import ClickHouseStandin
+from benchmarks.standin_server import LocalRedirectTransport, StandinConfig, StandinServer
+from legacy.clickhouse import ClickHouseWriter
+from legacy.parser import get_all_partners, load_insert_data
+
+PERCENTILES = [50, 90, 95, 99]
+
+
+class ServerThread:
+    """Держит стенд в собственном event loop, пока load_insert_data крутит свой через asyncio.run."""
+
+    def __init__(self, server: StandinServer):
+        self.server = server
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+
+    def __enter__(self) -> StandinServer:
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self.server.start(), self._loop).result()
+        return self.server
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        asyncio.run_coroutine_threadsafe(self.server.stop(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+
+def latency_summary(latencies):
+    if not latencies:
+        return {}
+    values = np.array(latencies) * 1000
+    summary = {f'p{p}_ms': float(np.percentile(values, p)) for p in PERCENTILES}
+    summary['max_ms'] = float(values.max())
+    summary['mean_ms'] = float(values.mean())
+    return summary
+
+
+def run(config: StandinConfig, runs=1, start_date=None, finish_date=None, clickhouse=False):
+    inserted = []
+
+    def count_rows(rows):
+        inserted.append(len(rows))
+
+    latencies, statuses, run_seconds, run_report, clickhouse_stats = [], {}, [], None, None
+    with ExitStack() as stack:
+        server = stack.enter_context(ServerThread(StandinServer(get_all_partners(), config)))
+        writer = None
+        if clickhouse:
+            standin = stack.enter_context(ClickHouseStandin())
+            clickhouse_stats = standin.stats
+            writer = stack.enter_context(ClickHouseWriter({'host': standin.host, 'port': standin.port}))
+
+        def insert_func(rows):
+            if writer is not None:
+                writer.insert(rows)
+            count_rows(rows)
+
+        for _ in range(runs):
+            transport = LocalRedirectTransport(server.port)
+            started = time.perf_counter()
+            run_report = load_insert_data(start_date, finish_date, transport=transport, insert_func=insert_func)
+            run_seconds.append(time.perf_counter() - started)
+            latencies += transport.latencies
+            for status, count in transport.statuses.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    total_seconds = sum(run_seconds)
+    rows = sum(inserted)
+    return {
+        'revision': git_revision(),
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'config': vars(config),
+        'runs': runs,
+        'run_seconds': run_seconds,
+        'rows_inserted': rows,
+        'rows_per_second': rows / total_seconds if total_seconds else None,
+        'requests': len(latencies),
+        'requests_per_second': len(latencies) / total_seconds if total_seconds else None,
+        'latency': latency_summary(latencies),
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        'server': vars(server.stats),
+        'clickhouse': {'requests': clickhouse_stats.requests, 'errors': clickhouse_stats.errors,
+                       'max_in_flight': clickhouse_stats.max_in_flight,
+                       'bytes': sum(received.bytes for received in clickhouse_stats.inserts)} if clickhouse_stats else None,
+        'last_run': run_report,
+    }
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--rows', type=int, default=StandinConfig.rows, help='строк в ответе каждого партнёра (с датой-ключом — не больше одной на день, см. payload_rows)')
+    arg_parser.add_argument('--latency', type=float, default=0.0, help='задержка ответа, секунды')
+    arg_parser.add_argument('--latency-jitter', type=float, default=0.0, help='случайная добавка к задержке, секунды')
+    arg_parser.add_argument('--error-rate', type=float, default=0.0, help='доля ответов 502')
+    arg_parser.add_argument('--rate-limit', type=float, help='запросов в секунду на хост, сверх — 429')
+    arg_parser.add_argument('--rate-burst', type=int, default=1)
+    arg_parser.add_argument('--seed', type=int, default=0)
+    arg_parser.add_argument('--runs', type=int, default=1)
+    arg_parser.add_argument('--start', help='начало периода; по умолчанию вчера')
+    arg_parser.add_argument('--finish', help='конец периода; по умолчанию вчера')
+    arg_parser.add_argument('--clickhouse', action='store_true', help='вставлять через ClickHouseWriter в локальный стенд')
+    arg_parser.add_argument('--output', help='файл для JSON; по умолчанию stdout')
+    args = arg_parser.parse_args()
+
+    config = StandinConfig(rows=args.rows, latency=args.latency, latency_jitter=args.latency_jitter,
+                           error_rate=args.error_rate, rate_limit=args.rate_limit, rate_burst=args.rate_burst,
+                           seed=args.seed)
+    report = json.dumps(run(config, args.runs, args.start, args.finish, args.clickhouse), indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(report)
+    else:
+        print(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+"""Генераторы синтетических ответов API партнёров для бенчмарков и нагрузочных тестов.
+
+Для каждого из 12 форматов generate_payload(partner_id, rows) возвращает тело ответа
+(bytes) заданного размера. Форматы со строками списком повторяют даты по кругу
+(как отчёт с разбивкой по площадкам). В форматах, где дата — ключ словаря, разбивки
+нет: как и в настоящих отчётах, там по одному ключу на день за REPORT_DAYS дней, так
+что строк в них не больше REPORT_DAYS при любом rows. Фактическое число строк тела
+возвращает payload_rows.
+"""
+import datetime
+import json
+import random
+from typing import Callable, Dict, List
+
+# Сколько различных дней в отчётах, начиная с REPORT_START
+REPORT_START = datetime.date(2025, 1, 1)
+REPORT_DAYS = 365
+# Форматы, где дата — ключ словаря: одна строка на день
+KEYED_PARTNERS = frozenset({'ssp-partner-b', 'ssp-partner-s', 'superpartner', '35'})
+
+AUTH_RESPONSES = {
+    'https://ssp-partner-a.example/oauth2/token': {'access_token': 'bench-token', 'expires_in': 3600},
+    'https://ssp-partner-b.example/auth': {'data': 'bench-token'},
+    'https://dsp-partner-b.example/token': {'data': 'bench-token'},
+}
+
+
+def _report_dates(rows: int) -> List[datetime.date]:
+    return [REPORT_START + datetime.timedelta(days=i % REPORT_DAYS) for i in range(rows)]
+
+
+def _keyed_dates(rows: int) -> List[datetime.date]:
+    return [REPORT_START + datetime.timedelta(days=i) for i in range(min(rows, REPORT_DAYS))]
+
+
+def _values(rng: random.Random):
+    return rng.randint(0, 100_000), round(rng.random() * 1000, 4)
+
+
+def _json(data) -> bytes:
+    return json.dumps(data).encode()
+
+
+def _xml_rows(dates, rng, row_template) -> bytes:
+    parts = ['<root>']
+    for date in dates:
+        imps, spent = _values(rng)
+        parts.append(row_template.format(date=date.isoformat(), imps=imps, spent=spent))
+    parts.append('</root>')
+    return ''.join(parts).encode()
+
+
+def _ssp_m(rows, rng):
+    items = []
+    for date in _report_dates(rows):
+        imps, spent = _values(rng)
+        items.append({'date': date.isoformat(), 'base': {'shows': imps, 'spent': spent}})
+    return _json({'items': [{'rows': items}]})
+
+
+def _total_by_date(rows, rng, spent_key):
+    dates = [date.isoformat() for date in _keyed_dates(rows)]
+    count_imps, payable = {}, {}
+    for date in dates:
+        count_imps[date], payable[date] = _values(rng)
+    return _json({'data': {'total': {'date': dates, 'count_imps': count_imps, spent_key: payable}}})
+
+
+def _ssp_b(rows, rng):
+    return _total_by_date(rows, rng, 'net_payable_data')
+
+
+def _ssp_o(rows, rng):
+    data = []
+    for date in _report_dates(rows):
+        imps, spent = _values(rng)
+        data.append({'date': date.isoformat(), 'impressionCount': imps, 'spent': spent})
+    return _json({'data': data})
+
+
+def _ssp_s(rows, rng):
+    data = {}
+    for date in _keyed_dates(rows):
+        imps, spent = _values(rng)
+        data[date.isoformat()] = {'impressions': imps, 'revenue': spent}
+    return _json(data)
+
+
+def _ssp_c(rows, rng):
+    return _xml_rows(_report_dates(rows), rng,
+                     '<day date="{date}"><impressions>{imps}</impressions><revenue>{spent}</revenue></day>')
+
+
+def _ssp_a(rows, rng):
+    data = {}
+    for date in _keyed_dates(rows):
+        imps, spent = _values(rng)
+        data[date.strftime('%Y%m%d')] = {'impression_count': imps, 'click_count': imps // 20, 'cost': spent}
+    return _json({'code': 0, 'message': 'success', 'total_count': len(data), 'data': data})
+
+
+def _dsp_i(rows, rng):
+    data = []
+    for date in _report_dates(rows):
+        imps, spent = _values(rng)
+        data.append({'date': date.isoformat(), 'imp': imps, 'revenue': spent})
+    return _json({'data': data})
+
+
+def _dsp_o(rows, rng):
+    data = []
+    for date in _report_dates(rows):
+        imps, spent = _values(rng)
+        data.append({'day': date.strftime('%d-%m-%Y'), 'impressions': imps, 'earnings': spent * 1000})
+    return _json({'data': data})
+
+
+def _dsp_m(rows, rng):
+    items = []
+    for date in _report_dates(rows):
+        imps, spent = _values(rng)
+        items.append({'date': date.isoformat(), 'shows': imps, 'amount': spent})
+    return _json({'items': [{'rows': items}]})
+
+
+def _dsp_b(rows, rng):
+    return _total_by_date(rows, rng, 'total_pub_payable')
+
+
+def _dsp_f(rows, rng):
+    return _xml_rows(_report_dates(rows), rng,
+                     '<report><date>{date}</date><impressions>{imps}</impressions><revenue>{spent}</revenue></report>')
+
+
+GENERATORS: Dict[str, Callable[[int, random.Random], bytes]] = {
+    'ssp-partner-m': _ssp_m,
+    'ssp-partner-b': _ssp_b,
+    'ssp-partner-o': _ssp_o,
+    'ssp-partner-s': _ssp_s,
+    'ssp-partner-c': _ssp_c,
+    'ssp-partner-d': _ssp_c,
+    'superpartner': _ssp_a,
+    '71': _dsp_i,
+    '65': _dsp_o,
+    '27': _dsp_m,
+    '35': _dsp_b,
+    '110': _dsp_f,
+}
+
+
+def payload_rows(partner_id: str, rows: int) -> int:
+    """Сколько строк на самом деле в теле generate_payload(partner_id, rows)."""
+    return min(rows, REPORT_DAYS) if partner_id in KEYED_PARTNERS else rows
+
+
+def generate_payload(partner_id: str, rows: int, seed: int = 0) -> bytes:
+    """Тело ответа партнёра partner_id на payload_rows(partner_id, rows) строк."""
+    return GENERATORS[partner_id](rows, random.Random(seed))
@@ -0,0 +1,167 @@
+"""Локальный HTTP-заменитель API всех партнёров для сквозных нагрузочных тестов.
+
+Сервер на asyncio отвечает на запросы данных всех 12 партнёров и на эндпоинты
+авторизации партнёров A и B. Партнёр определяется по заголовку Host, поэтому
+клиент должен ходить на сервер через LocalRedirectTransport, который подменяет
+адрес, сохраняя исходный Host. Настраиваются задержка, размер ответа, доля ошибок
+и лимит запросов в секунду на хост (сверх лимита — 429).
+"""
+import asyncio
+from dataclasses import dataclass, field
+import json
+import random
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+from benchmarks.payloads import AUTH_RESPONSES, generate_payload
+from legacy.config import HTTP_CLIENT_CONFIG
+from legacy.rate_limit import TokenBucket
+
+REASONS = {200: 'OK', 404: 'Not Found', 429: 'Too Many Requests', 502: 'Bad Gateway'}
+
+
+@dataclass
+class StandinConfig:
+    rows: int = 1000
+    latency: float = 0.0
+    latency_jitter: float = 0.0
+    error_rate: float = 0.0
+    rate_limit: Optional[float] = None
+    rate_burst: int = 1
+    seed: int = 0
+
+
+@dataclass
+class StandinStats:
+    requests: int = 0
+    errors: int = 0
+    throttled: int = 0
+    bytes_sent: int = 0
+    by_host: Dict[str, int] = field(default_factory=dict)
+
+
+def partner_routes(partners) -> Dict[str, str]:
+    """Хост → id партнёра по URL, которые строят сами партнёры."""
+    routes = {}
+    for partner in partners:
+        for url in partner.get_urls('start', 'finish'):
+            routes[urlsplit(url).netloc] = partner.id
+    return routes
+
+
+class StandinServer:
+    """HTTP/1.1 сервер с keep-alive, отдающий синтетические ответы партнёров."""
+
+    def __init__(self, partners, config: Optional[StandinConfig] = None, host: str = '127.0.0.1', port: int = 0):
+        self.config = config or StandinConfig()
+        self.host = host
+        self.port = port
+        self.stats = StandinStats()
+        self._routes = partner_routes(partners)
+        self._auth = {(urlsplit(url).netloc, urlsplit(url).path): body for url, body in AUTH_RESPONSES.items()}
+        self._bodies: Dict[str, bytes] = {}
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._random = random.Random(self.config.seed)
+        self._server = None
+
+    async def start(self) -> int:
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def stop(self) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+
+    def _body_for(self, partner_id: str) -> bytes:
+        if partner_id not in self._bodies:
+            self._bodies[partner_id] = generate_payload(partner_id, self.config.rows, self.config.seed)
+        return self._bodies[partner_id]
+
+    def _route(self, method: str, host: str, path: str) -> Tuple[int, bytes]:
+        if self.config.rate_limit:
+            if host not in self._buckets:
+                self._buckets[host] = TokenBucket(self.config.rate_limit, self.config.rate_burst)
+            if not self._buckets[host].try_acquire():
+                self.stats.throttled += 1
+                return 429, b''
+        if self._random.random() < self.config.error_rate:
+            self.stats.errors += 1
+            return 502, b''
+        if method == 'POST' and (host, path) in self._auth:
+            return 200, json.dumps(self._auth[(host, path)]).encode()
+        if method == 'GET' and host in self._routes:
+            return 200, self._body_for(self._routes[host])
+        return 404, b''
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                if headers.get('content-length'):
+                    await reader.readexactly(int(headers['content-length']))
+
+                delay = self.config.latency + self._random.random() * self.config.latency_jitter
+                if delay:
+                    await asyncio.sleep(delay)
+                host = headers.get('host', '')
+                status, body = self._route(method, host, urlsplit(target).path)
+                self.stats.requests += 1
+                self.stats.bytes_sent += len(body)
+                self.stats.by_host[host] = self.stats.by_host.get(host, 0) + 1
+
+                head = (f'HTTP/1.1 {status} {REASONS.get(status, "")}\r\n'
+                        f'Content-Length: {len(body)}\r\n'
+                        f'Content-Type: application/octet-stream\r\n')
+                if status == 429:
+                    head += 'Retry-After: 1\r\n'
+                writer.write(head.encode('latin-1') + b'\r\n' + body)
+                await writer.drain()
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+class LocalRedirectTransport(httpx.AsyncBaseTransport):
+    """Отправляет все запросы на локальный сервер, сохраняя исходный Host.
+
+    Заодно замеряет время каждого запроса до получения заголовков ответа.
+    """
+
+    def __init__(self, port: int, host: str = '127.0.0.1'):
+        self._host = host
+        self._port = port
+        self._transport = httpx.AsyncHTTPTransport(limits=httpx.Limits(
+            max_connections=HTTP_CLIENT_CONFIG['max_connections'],
+            max_keepalive_connections=HTTP_CLIENT_CONFIG['max_keepalive_connections'],
+            keepalive_expiry=HTTP_CLIENT_CONFIG['keepalive_expiry'],
+        ))
+        self.latencies = []
+        self.statuses: Dict[int, int] = {}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        request.url = request.url.copy_with(scheme='http', host=self._host, port=self._port)
+        started = time.perf_counter()
+        response = await self._transport.handle_async_request(request)
+        self.latencies.append(time.perf_counter() - started)
+        self.statuses[response.status_code] = self.statuses.get(response.status_code, 0) + 1
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
@@ -8,4 +8,10 @@ CLICKHOUSE_CONFIG_RO = {
     'password': 'somepassword'
 }
 
+CLICKHOUSE_CONFIG_RW = {
+    'user': 'somewriter',
+    'host': 'somehost.test',
+    'password': 'somewriterpassword'
+}
+
 API_DATA = 'somedata'
@@ -1,11 +1,29 @@
 from abc import ABC, abstractmethod
+import asyncio
+from contextlib import asynccontextmanager, nullcontext
 from dataclasses import dataclass, field
 import datetime
+import time
 import httpx
-from typing import Any, Dict, List
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
+from legacy.archive import ResponseArchive
+from legacy.config import HTTP_CLIENT_CONFIG, PIPELINE_CONFIG, RETRY_CONFIG
+from legacy.http_client import client_timeout
+from legacy.hedging import hedged
+from legacy.incremental import BufferedParser
+from legacy.metrics import RunMetrics, UrlMetrics, ttfb_trace
+from legacy.rate_limit import get_bucket
+from legacy.retry import retry_async
+from legacy.scheduler import FetchScheduler, SlotStats
+from legacy.token_store import TokenStore, default_token_store
 
-@dataclass
+
+class ResponseTooLargeError(Exception):
+    """Тело ответа превысило max_body_size партнёра."""
+
+
+@dataclass(slots=True)
 class PartnerRecord:
     date: datetime
     imps: int
@@ -17,10 +35,100 @@ class AbstractPartner(ABC):
     urltype: str
     id: str
     currency: str = 'usd'
+    date_format: Optional[str] = None
+    stream_response: bool = False
+    max_body_size: Optional[int] = HTTP_CLIENT_CONFIG['max_body_size']
+    max_concurrency: Optional[int] = None
+    max_concurrency_per_host: Optional[int] = None
+    rate_limit: Optional[float] = None
+    rate_burst: int = 1
+    date_window: Optional[str] = None
+    auth_scheme: Optional[str] = None
+    coalesce_requests: bool = True
+    finalization_lag: Optional[int] = None
+    max_attempts: int = RETRY_CONFIG['max_attempts']
+    time_budget: Optional[float] = PIPELINE_CONFIG['partner_time_budget']
+    # дублировать запрос, если он идёт дольше этого перцентиля запросов партнёра в запуске
+    hedge_percentile: Optional[float] = None
+    hedge_min_samples: int = 5
+    token_store: Optional[TokenStore] = field(default=None, repr=False, compare=False)
     _headers: Dict[str, str] = field(default_factory=dict)
+    _client: Optional[httpx.AsyncClient] = field(default=None, repr=False, compare=False)
+    _archive: Optional[ResponseArchive] = field(default=None, repr=False, compare=False)
+    _metrics: Optional[RunMetrics] = field(default=None, repr=False, compare=False)
+    _scheduler: Optional[FetchScheduler] = field(default=None, repr=False, compare=False)
+    _slot_stats: Optional[SlotStats] = field(default=None, repr=False, compare=False)
 
-    async def authentificate(self) -> None:
-        pass
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._check_auth(getattr(cls, 'auth_scheme', None))
+
+    def __post_init__(self):
+        # auth_scheme можно передать и при создании партнёра
+        self._check_auth(self.auth_scheme)
+
+    @classmethod
+    def _check_auth(cls, auth_scheme: Optional[str]) -> None:
+        if auth_scheme is not None and cls.request_token is AbstractPartner.request_token:
+            raise TypeError(f'{cls.__name__} sets auth_scheme but does not override request_token')
+
+    def bind_client(self, client: Optional[httpx.AsyncClient]) -> None:
+        """Привязывает общий клиент запуска (None — отвязывает)."""
+        self._client = client
+
+    def bind_archive(self, archive: Optional[ResponseArchive]) -> None:
+        """Привязывает архив, в который сохраняются сырые тела ответов (None — отвязывает)."""
+        self._archive = archive
+
+    def bind_metrics(self, metrics: Optional[RunMetrics]) -> None:
+        """Привязывает замеры запуска, в которые пишутся TTFB, объём и время разбора (None — отвязывает)."""
+        self._metrics = metrics
+
+    def bind_scheduler(self, scheduler: Optional[FetchScheduler], run_stats: Optional[SlotStats] = None) -> None:
+        """Привязывает планировщик запуска: каждая попытка запроса занимает его слот (None — отвязывает)."""
+        self._scheduler = scheduler
+        self._slot_stats = run_stats
+
+    def _slot(self, url):
+        if self._scheduler is None:
+            return nullcontext()
+        return self._scheduler.slot(self, url, self._slot_stats)
+
+    def url_metrics(self, url) -> Optional[UrlMetrics]:
+        return self._metrics.url(self.id, url) if self._metrics is not None else None
+
+    @asynccontextmanager
+    async def http_client(self) -> AsyncIterator[httpx.AsyncClient]:
+        """Отдаёт общий клиент запуска, а вне запуска открывает временный."""
+        if self._client is not None:
+            yield self._client
+        else:
+            async with httpx.AsyncClient(timeout=client_timeout()) as client:
+                yield client
+
+    async def authentificate(self, refresh: bool = False) -> None:
+        """Ставит токен в заголовки, логинясь только если в хранилище нет живого токена.
+
+        Партнёры с авторизацией задают auth_scheme и переопределяют request_token.
+        """
+        if self.auth_scheme is None:
+            return
+        store = self.token_store or default_token_store()
+        token = None if refresh else store.get(self.id)
+        if token is None:
+            async with self.http_client() as client:
+                token, expires_in = await retry_async(lambda: self.request_token(client), self.max_attempts)
+            store.set(self.id, token, expires_in)
+        self._headers['Authorization'] = f'{self.auth_scheme} {token}'
+
+    async def request_token(self, client: httpx.AsyncClient) -> Tuple[str, Optional[float]]:
+        """Логин у партнёра: возвращает токен и его срок жизни в секундах (если известен).
+
+        Обязателен для партнёров с auth_scheme: без него TypeError при объявлении класса или создании партнёра.
+        Неуспешный ответ должен поднимать httpx.HTTPStatusError (raise_for_status):
+        authentificate повторяет логин при сетевых ошибках и статусах из RETRY_CONFIG.
+        """
+        raise NotImplementedError
 
     def format_date(self, date: datetime) -> Any:
         date_str = date.strftime("%Y-%m-%d")
@@ -30,11 +138,171 @@ class AbstractPartner(ABC):
     def get_urls(self, start_date, finish_date) -> List[Any]:
         pass
 
+    async def throttle(self) -> None:
+        """Ждёт токен rate limit партнёра (rate_limit запросов в секунду, запас rate_burst)."""
+        if self.rate_limit:
+            await get_bucket(self.id, self.rate_limit, self.rate_burst).acquire()
+
     async def request_data(self, url) -> str:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=self._headers)
+        """Загружает тело URL, повторяя запрос при сетевых ошибках и статусах из RETRY_CONFIG."""
+        return await retry_async(lambda: self._attempt(lambda: self._request_data(url), url),
+                                 self.max_attempts, on_retry=self._on_retry(url))
+
+    async def _attempt(self, func, url):
+        """Одна попытка: ждёт rate limit, занимает слот планировщика и запускает func с хеджированием.
+
+        Слот держится только на время самой попытки: паузы retry_async между попытками
+        и ожидание токена rate limit идут без слота и не отнимают его у других партнёров.
+        Ожидание токена не входит в задержку хеджирования — дублируется только медленный
+        HTTP-запрос, а не запрос, стоящий в очереди rate limit. Дубль берёт свой токен
+        и свой слот, поэтому лимиты max_concurrency и max_concurrency_per_host не превышаются.
+        """
+        await self.throttle()
+        delay = None
+        if self.hedge_percentile is not None and self._metrics is not None:
+            delay = self._metrics.latency_percentile(self.id, self.hedge_percentile, self.hedge_min_samples)
+        copies = 0
+
+        async def copy():
+            nonlocal copies
+            copies += 1
+            if copies == 1:
+                return await func()
+            await self.throttle()
+            async with self._slot(url):
+                return await func()
+        async with self._slot(url):
+            return await hedged(copy, delay, on_hedge=self._on_hedge(url))
+
+    def _on_hedge(self, url):
+        def on_hedge() -> None:
+            metrics = self.url_metrics(url)
+            if metrics is not None:
+                metrics.hedges += 1
+        return on_hedge
+
+    def _on_retry(self, url):
+        def on_retry(error: BaseException) -> None:
+            metrics = self.url_metrics(url)
+            if metrics is not None:
+                metrics.retries += 1
+        return on_retry
+
+    async def _request_data(self, url) -> str:
+        metrics = self.url_metrics(url)
+        async with self.http_client() as client:
+            started = time.perf_counter()
+            response = await client.get(url, headers=self._headers, extensions=self._trace(metrics, started))
+            if response.status_code == 401 and self.auth_scheme is not None:
+                # токен из кэша отозван или истёк раньше срока — логинимся заново
+                await self.authentificate(refresh=True)
+                started = time.perf_counter()
+                response = await client.get(url, headers=self._headers, extensions=self._trace(metrics, started))
+            if response.status_code in RETRY_CONFIG['retry_statuses']:
+                response.raise_for_status()
+            if metrics is not None:
+                elapsed = time.perf_counter() - started
+                metrics.requests += 1
+                metrics.fetch_seconds += elapsed
+                metrics.bytes += len(response.content)
+                self._metrics.observe_latency(self.id, elapsed)
+            # страницы ошибок не архивируем: при повторе они заслонили бы последний хороший ответ
+            if self._archive is not None and response.is_success:
+                # gzip и запись на диск — не в event loop
+                await asyncio.to_thread(self._archive.store, self.id, url, response.content)
             return response.text
 
+    @staticmethod
+    def _trace(metrics: Optional[UrlMetrics], started: float) -> Dict[str, Any]:
+        return {'trace': ttfb_trace(metrics, started)} if metrics is not None else {}
+
+    async def fetch_records(self, url) -> List[PartnerRecord]:
+        """Загружает и разбирает один URL.
+
+        При stream_response тело читается кусками через aiter_bytes() и сразу
+        подаётся в incremental_parser(), так что разбор идёт параллельно загрузке.
+        Упавшая загрузка повторяется целиком, а долгая хеджируется, как и в request_data.
+        """
+        if not self.stream_response:
+            text = await self.request_data(url)
+            started = time.perf_counter()
+            records = list(self.norm_parse(text))
+            metrics = self.url_metrics(url)
+            if metrics is not None:
+                metrics.parse_seconds += time.perf_counter() - started
+                metrics.records += len(records)
+            return records
+
+        async def stream_once():
+            async with self.http_client() as client:
+                return await self._stream_records(client, url)
+
+        return await retry_async(lambda: self._attempt(stream_once, url), self.max_attempts, on_retry=self._on_retry(url))
+
+    async def _stream_records(self, client: httpx.AsyncClient, url, retry_auth: bool = True) -> List[PartnerRecord]:
+        metrics = self.url_metrics(url)
+        started = time.perf_counter()
+        async with client.stream('GET', url, headers=self._headers) as response:
+            if not (retry_auth and response.status_code == 401 and self.auth_scheme is not None):
+                # контекст stream открывается, как только получены заголовки
+                headers_received = time.perf_counter()
+                if response.status_code in RETRY_CONFIG['retry_statuses']:
+                    response.raise_for_status()
+                content_length = response.headers.get('content-length')
+                if content_length and self.max_body_size and int(content_length) > self.max_body_size:
+                    raise ResponseTooLargeError(f'{url}: {content_length} bytes > {self.max_body_size}')
+                parser = self.incremental_parser()
+                archive_writer = None
+                if self._archive is not None and response.is_success:
+                    archive_writer = self._archive.writer(self.id, url)
+                records = []
+                received = 0
+                parse_seconds = 0.0
+                # ошибка разбора не прерывает загрузку: тело докачивается в архив, чтобы его можно было разобрать повторно
+                parse_error = None
+                try:
+                    async for chunk in response.aiter_bytes():
+                        received += len(chunk)
+                        if self.max_body_size and received > self.max_body_size:
+                            raise ResponseTooLargeError(f'{url}: more than {self.max_body_size} bytes')
+                        if archive_writer is not None:
+                            await asyncio.to_thread(archive_writer.write, chunk)
+                        if parse_error is None:
+                            parse_started = time.perf_counter()
+                            try:
+                                records.extend(parser.feed(chunk))
+                            except Exception as e:
+                                parse_error = e
+                            parse_seconds += time.perf_counter() - parse_started
+                except BaseException:
+                    # обрыв связи, превышение max_body_size или отмена — тело неполное
+                    if archive_writer is not None:
+                        archive_writer.discard()
+                    raise
+                if archive_writer is not None:
+                    await asyncio.to_thread(archive_writer.commit)
+                if parse_error is not None:
+                    raise parse_error
+                parse_started = time.perf_counter()
+                records.extend(parser.close())
+                parse_seconds += time.perf_counter() - parse_started
+                if metrics is not None:
+                    elapsed = time.perf_counter() - started
+                    metrics.requests += 1
+                    metrics.ttfb_seconds += headers_received - started
+                    metrics.fetch_seconds += elapsed
+                    self._metrics.observe_latency(self.id, elapsed)
+                    metrics.bytes += received
+                    metrics.parse_seconds += parse_seconds
+                    metrics.records += len(records)
+                return records
+        await self.authentificate(refresh=True)
+        return await self._stream_records(client, url, retry_auth=False)
+
+    def incremental_parser(self):
+        """Парсер для потокового режима: объект с методами feed(chunk) и close()."""
+        return BufferedParser(self.norm_parse)
+
     @abstractmethod
     def norm_parse(self, text: str) -> List[PartnerRecord]:
         pass
@@ -0,0 +1,51 @@
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+from legacy.partner_data.batch import PartnerBatch
+from legacy.partner_data.data import PartnerData
+
+KEY_COLUMNS = ['ssp', 'dsp_id', 'date', 'currency']
+VALUE_COLUMNS = ['imps', 'spent']
+COLUMNS = ['date', 'dsp_id', 'ssp', 'imps', 'spent', 'currency']
+
+# Ниже этого числа строк словарь с кортежным ключом быстрее, чем сборка DataFrame.
+SMALL_INPUT_THRESHOLD = 10_000
+
+
+def aggregate(partner_data: Iterable[PartnerData]) -> PartnerBatch:
+    """Суммирует imps и spent по ключу (ssp, dsp_id, date, currency).
+
+    Принимает PartnerBatch или последовательность PartnerData и возвращает PartnerBatch.
+    Входные данные не изменяются. Порядок результата — порядок первого появления ключа.
+    """
+    batch = PartnerBatch.from_rows(partner_data)
+    if len(batch) < SMALL_INPUT_THRESHOLD:
+        return _aggregate_rows(batch)
+    return PartnerBatch.from_frame(aggregate_frame(batch.to_frame()))
+
+
+def aggregate_frame(frame: pd.DataFrame) -> pd.DataFrame:
+    """Агрегирует колоночные данные через groupby по типизированному ключу."""
+    grouped = frame.groupby(KEY_COLUMNS, sort=False, dropna=False)[VALUE_COLUMNS].sum()
+    return grouped.reset_index()[COLUMNS]
+
+
+def _aggregate_rows(batch: PartnerBatch) -> PartnerBatch:
+    """Агрегация небольших входов через словарь с кортежным ключом."""
+    aggregated = {}
+    keys = zip(batch.ssp.tolist(), batch.dsp_id.tolist(), batch.date.view(np.int64).tolist(), batch.currency.tolist())
+    for key, imps, spent in zip(keys, batch.imps.tolist(), batch.spent.tolist()):
+        total = aggregated.get(key)
+        if total is None:
+            aggregated[key] = [imps, spent]
+        else:
+            total[0] += imps
+            total[1] += spent
+    if not aggregated:
+        return PartnerBatch.empty()
+    ssp, dsp_id, date, currency = zip(*aggregated)
+    imps, spent = zip(*aggregated.values())
+    return PartnerBatch(date=np.array(date, dtype=np.int64).view('datetime64[ns]'), dsp_id=dsp_id, ssp=ssp,
+                        imps=imps, spent=spent, currency=currency)
@@ -0,0 +1,114 @@
+import datetime
+import gzip
+import hashlib
+import json
+import mmap
+import os
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+
+class ArchiveMissError(KeyError):
+    """В архиве нет ответа для запрошенного партнёра и URL."""
+
+
+class ArchiveWriter:
+    """Пишет тело ответа в архив по кускам: сжимает на лету и считает sha256."""
+
+    def __init__(self, archive: 'ResponseArchive', partner_id: str, url: str, fetched: datetime.date):
+        self._archive = archive
+        self._partner_id = partner_id
+        self._url = url
+        self._fetched = fetched
+        self._hash = hashlib.sha256()
+        fd, self._tmp_path = tempfile.mkstemp(dir=archive.objects_dir, suffix='.tmp')
+        self._file = gzip.GzipFile(fileobj=os.fdopen(fd, 'wb'), mode='wb', mtime=0)
+
+    def write(self, chunk: bytes) -> None:
+        self._hash.update(chunk)
+        self._file.write(chunk)
+
+    def commit(self) -> str:
+        """Переносит тело на его адрес в архиве и добавляет запись в индекс."""
+        self._close()
+        digest = self._hash.hexdigest()
+        path = self._archive.object_path(digest)
+        if os.path.exists(path):
+            os.remove(self._tmp_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(self._tmp_path, path)
+        self._archive.add_to_index(self._partner_id, self._url, self._fetched, digest)
+        return digest
+
+    def discard(self) -> None:
+        self._close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+    def _close(self) -> None:
+        if not self._file.closed:
+            fileobj = self._file.fileobj
+            self._file.close()
+            fileobj.close()
+
+
+class ResponseArchive:
+    """Локальный архив сырых ответов партнёров.
+
+    Тела хранятся сжатыми gzip и адресуются по sha256 содержимого (одинаковые ответы
+    лежат один раз), а index.jsonl связывает (партнёр, URL, дата загрузки) с хешем.
+    По архиву можно перезапустить разбор без обращения к API партнёров.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.objects_dir = os.path.join(root, 'objects')
+        self.index_path = os.path.join(root, 'index.jsonl')
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self._index: Dict[Tuple[str, str], List[Tuple[str, str]]] = {}
+        self._load_index()
+
+    def _load_index(self) -> None:
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path) as file:
+            for line in file:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._remember(entry['partner'], entry['url'], entry['fetched'], entry['sha256'])
+
+    def _remember(self, partner_id: str, url: str, fetched: str, digest: str) -> None:
+        self._index.setdefault((partner_id, url), []).append((fetched, digest))
+
+    def object_path(self, digest: str) -> str:
+        return os.path.join(self.objects_dir, digest[:2], f'{digest}.gz')
+
+    def add_to_index(self, partner_id: str, url: str, fetched: datetime.date, digest: str) -> None:
+        entry = {'partner': partner_id, 'url': url, 'fetched': fetched.isoformat(), 'sha256': digest}
+        with open(self.index_path, 'a') as file:
+            file.write(json.dumps(entry) + '\n')
+        self._remember(partner_id, url, entry['fetched'], digest)
+
+    def writer(self, partner_id: str, url: str, fetched: Optional[datetime.date] = None) -> ArchiveWriter:
+        """Открывает запись тела ответа по кускам (для потоковых загрузок)."""
+        return ArchiveWriter(self, partner_id, url, fetched or datetime.date.today())
+
+    def store(self, partner_id: str, url: str, body: bytes, fetched: Optional[datetime.date] = None) -> str:
+        """Сохраняет тело ответа целиком и возвращает его sha256."""
+        writer = self.writer(partner_id, url, fetched)
+        writer.write(body)
+        return writer.commit()
+
+    def load(self, partner_id: str, url: str, fetched: Optional[datetime.date] = None) -> bytes:
+        """Читает тело ответа: последнее загруженное или загруженное в дату fetched."""
+        entries = self._index.get((partner_id, url), [])
+        if fetched is not None:
+            entries = [entry for entry in entries if entry[0] == fetched.isoformat()]
+        if not entries:
+            raise ArchiveMissError((partner_id, url, fetched))
+        # sorted устойчив: среди загрузок одного дня берём последнюю
+        _, digest = sorted(entries, key=lambda entry: entry[0])[-1]
+        with open(self.object_path(digest), 'rb') as file:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return gzip.decompress(mapped)
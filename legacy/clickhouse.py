@@ -0,0 +1,184 @@
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import io
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+import httpx
+import numpy as np
+import pandas as pd
+
+from common.config import CLICKHOUSE_CONFIG_RW
+from legacy.config import CLICKHOUSE_INSERT_CONFIG
+from legacy.partner_data.batch import COLUMNS, PartnerBatch
+
+# Типы колонок блока Native. Если в таблице типы другие (например, UInt64 для imps),
+# ClickHouse приводит их при вставке (input_format_native_allow_types_conversion).
+COLUMN_TYPES = {
+    'date': 'Date',
+    'dsp_id': 'Int64',
+    'ssp': 'String',
+    'imps': 'Int64',
+    'spent': 'Float64',
+    'currency': 'String',
+}
+
+_FIXED_DTYPES = {'Date': np.dtype('<u2'), 'Int64': np.dtype('<i8'), 'Float64': np.dtype('<f8')}
+
+
+class ClickHouseError(Exception):
+    """ClickHouse отклонил вставку; в сообщении — статус и текст ответа сервера."""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(f'{status_code}: {message}')
+        self.status_code = status_code
+
+
+def _varuint(value: int) -> bytes:
+    out = bytearray()
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _string(value: str) -> bytes:
+    data = value.encode()
+    return _varuint(len(data)) + data
+
+
+def _encode_column(values: np.ndarray, type_name: str) -> bytes:
+    if type_name == 'String':
+        # ssp и currency повторяются по всей пачке — кодируем каждое значение один раз
+        codes, uniques = pd.factorize(values)
+        encoded = np.array([_string(value) for value in uniques] or [b''], dtype=object)
+        return b''.join(encoded[codes].tolist())
+    if type_name == 'Date':
+        values = values.astype('datetime64[D]').view(np.int64)
+    return np.ascontiguousarray(values, dtype=_FIXED_DTYPES[type_name]).tobytes()
+
+
+def encode_native(batch: PartnerBatch) -> bytes:
+    """Кодирует пачку одним блоком формата Native: колонки целиком, без разбора на строки."""
+    parts = [_varuint(len(COLUMNS)), _varuint(len(batch))]
+    for column in COLUMNS:
+        type_name = COLUMN_TYPES[column]
+        parts += [_string(column), _string(type_name), _encode_column(getattr(batch, column), type_name)]
+    return b''.join(parts)
+
+
+def _read_varuint(stream: io.BytesIO) -> int:
+    value = shift = 0
+    while True:
+        byte = stream.read(1)
+        if not byte:
+            raise EOFError('unexpected end of Native data')
+        value |= (byte[0] & 0x7F) << shift
+        if byte[0] < 0x80:
+            return value
+        shift += 7
+
+
+def _read_string(stream: io.BytesIO) -> str:
+    return stream.read(_read_varuint(stream)).decode()
+
+
+def decode_native(data: bytes) -> Iterator[Dict[str, Tuple[str, np.ndarray]]]:
+    """Разбирает блоки Native обратно в колонки {имя: (тип, массив)} — для стендов и проверок."""
+    stream = io.BytesIO(data)
+    while stream.tell() < len(data):
+        column_count = _read_varuint(stream)
+        row_count = _read_varuint(stream)
+        block = {}
+        for _ in range(column_count):
+            name = _read_string(stream)
+            type_name = _read_string(stream)
+            if type_name == 'String':
+                values = np.array([_read_string(stream) for _ in range(row_count)], dtype=object)
+            else:
+                dtype = _FIXED_DTYPES[type_name]
+                values = np.frombuffer(stream.read(dtype.itemsize * row_count), dtype=dtype)
+                if type_name == 'Date':
+                    values = values.astype(np.int64).astype('datetime64[D]')
+            block[name] = (type_name, values)
+        yield block
+
+
+def native_to_batch(data: bytes) -> PartnerBatch:
+    """Собирает PartnerBatch из блоков Native, закодированных encode_native."""
+    return PartnerBatch.concat(
+        PartnerBatch(**{column: block[column][1] for column in COLUMNS}) for block in decode_native(data))
+
+
+def deduplication_token(body: bytes) -> str:
+    """Стабильный токен блока: одинаковое содержимое — одинаковый токен при любом повторе.
+
+    ClickHouse отбрасывает блок с уже виденным токеном (для Replicated*MergeTree сразу,
+    для обычного MergeTree — при non_replicated_deduplication_window в настройках таблицы).
+    """
+    return hashlib.sha256(body).hexdigest()
+
+
+def _chunks(batch: PartnerBatch, size: int) -> Iterable[PartnerBatch]:
+    for start in range(0, len(batch), size):
+        yield batch[start:start + size]
+
+
+class ClickHouseWriter:
+    """Вставка PartnerBatch в ClickHouse через HTTP-интерфейс в формате Native.
+
+    Строки делятся на блоки по block_rows, каждый блок уходит отдельным POST
+    со своим insert_deduplication_token; до max_connections блоков отправляются
+    параллельно по keep-alive соединениям общего пула. insert() синхронный: BatchInserter вызывает его в отдельном потоке.
+    """
+
+    def __init__(self, config: Optional[Dict] = None, transport: Optional[httpx.BaseTransport] = None):
+        # адрес и учётные данные пишущего пользователя — из общего конфига проекта, если не переопределены
+        credentials = {key: CLICKHOUSE_CONFIG_RW[key] for key in ('host', 'user', 'password')}
+        self.config = {**credentials, **CLICKHOUSE_INSERT_CONFIG, **(config or {})}
+        self._transport = transport
+        self._client: Optional[httpx.Client] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def url(self) -> str:
+        scheme = 'https' if self.config['secure'] else 'http'
+        return f"{scheme}://{self.config['host']}:{self.config['port']}/"
+
+    @property
+    def query(self) -> str:
+        return f"INSERT INTO {self.config['table']} ({', '.join(COLUMNS)}) FORMAT Native"
+
+    def __enter__(self) -> 'ClickHouseWriter':
+        max_connections = self.config['max_connections']
+        self._client = httpx.Client(
+            transport=self._transport,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=self.config['timeout'],
+            headers={'X-ClickHouse-User': self.config['user'], 'X-ClickHouse-Key': self.config['password']},
+        )
+        self._executor = ThreadPoolExecutor(max_connections, thread_name_prefix='clickhouse-insert')
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._executor.shutdown()
+        self._client.close()
+        self._executor = None
+        self._client = None
+
+    def insert(self, rows: Iterable) -> None:
+        """Вставляет строки блоками; ошибка любого блока пробрасывается после завершения остальных."""
+        batch = PartnerBatch.from_rows(rows)
+        futures = [self._executor.submit(self._send, chunk) for chunk in _chunks(batch, self.config['block_rows'])]
+        errors = [error for error in (future.exception() for future in futures) if error is not None]
+        if errors:
+            raise errors[0]
+
+    def _send(self, batch: PartnerBatch) -> None:
+        body = encode_native(batch)
+        params = {'query': self.query}
+        if self.config['deduplication_token']:
+            params['insert_deduplication_token'] = deduplication_token(body)
+        response = self._client.post(self.url, params=params, content=body)
+        if response.status_code != 200:
+            raise ClickHouseError(response.status_code, response.text.strip())
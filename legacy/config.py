@@ -29,3 +29,96 @@ PARTNER_S_DSP_TOKEN = 'verisecret'
 PARTNER_S_DSP_LOGIN = 'verisecret'
 
 DSP_B_ACCESS_TOKEN = 'verisecret'
+
+HTTP_CLIENT_CONFIG = {
+    'max_connections': 100,
+    'max_keepalive_connections': 20,
+    'keepalive_expiry': 30.0,
+    'max_body_size': 1024 ** 3,
+    'connect_timeout': 10.0,
+    # таймаут чтения (и записи, и ожидания соединения из пула), секунды
+    'read_timeout': 120.0,
+}
+
+PIPELINE_CONFIG = {
+    'insert_batch_size': 100000,
+    'flush_interval': 5.0,
+    'queue_size': 16,
+    # сколько секунд даётся партнёру на весь запуск; дольше — партнёр считается упавшим
+    'partner_time_budget': 1800.0,
+}
+
+SCHEDULER_CONFIG = {
+    'max_in_flight': 64,
+    'max_per_host': 8,
+}
+
+TOKEN_STORE_CONFIG = {
+    'path': None,
+    'expiry_margin': 60,
+}
+
+ARCHIVE_CONFIG = {
+    'path': None,
+}
+
+RESULT_CACHE_CONFIG = {
+    'path': None,
+}
+
+PROMETHEUS_CONFIG = {
+    # слот воркера на хосте (0, 1, ...): метка worker у всех метрик, {worker} в textfile_path и сдвиг порта;
+    # None — из переменной окружения PARTNER_PARSER_WORKER, а без неё 0
+    'worker': None,
+    # файл для textfile collector node_exporter; {worker} — чтобы воркеры не перетирали друг друга
+    'textfile_path': None,
+    # базовый порт эндпоинта /metrics; воркер слушает port + worker
+    'port': None,
+    # адрес, на котором слушает эндпоинт; '0.0.0.0' — чтобы Prometheus ходил с других хостов
+    'host': '127.0.0.1',
+}
+
+RETRY_CONFIG = {
+    'max_attempts': 4,
+    'backoff_base': 0.5,
+    'backoff_max': 30.0,
+    'retry_statuses': (429, 500, 502, 503, 504),
+}
+
+CLICKHOUSE_INSERT_CONFIG = {
+    'table': 'dbname.partner_data',
+    # HTTP-интерфейс; host, user и password пользователя с правом INSERT берутся из CLICKHOUSE_CONFIG_RW
+    'port': 8123,
+    'secure': False,
+    # строк в одном блоке Native (один POST)
+    'block_rows': 50000,
+    # сколько блоков отправляется параллельно
+    'max_connections': 4,
+    'timeout': 300.0,
+    # передавать insert_deduplication_token (sha256 блока): повтор того же блока ClickHouse отбросит
+    'deduplication_token': True,
+}
+
+INSERT_SNAPSHOT_CONFIG = {
+    # JSON-снимок уже вставленных итогов; если задан, вставляются только изменившиеся строки
+    'path': None,
+    'retention_days': 60,
+}
+
+SINKS_CONFIG = {
+    # вставлять ли данные в ClickHouse
+    'database': True,
+    # каталог для колоночных файлов (нужен pyarrow); если задан, данные пишутся и туда
+    'file_path': None,
+    # 'parquet' или 'arrow' (Arrow IPC)
+    'file_format': 'parquet',
+    # сколько строк FileSink держит в памяти, прежде чем дописать разделы новыми файлами
+    'row_group_rows': 100000,
+}
+
+SPOOL_CONFIG = {
+    # каталог спула вставки; если задан, пачки сохраняются до отправки и досылаются после сбоя базы
+    'path': None,
+    'fsync': True,
+    'compress_level': 1,
+}
@@ -0,0 +1,35 @@
+from dataclasses import dataclass, field
+from typing import Optional
+
+import httpx
+
+from legacy.archive import ResponseArchive
+from legacy.insert_snapshot import InsertSnapshot
+from legacy.metrics import RunMetrics
+from legacy.result_cache import ResultCache
+from legacy.scheduler import FetchScheduler, SlotStats
+from legacy.spool import InsertSpool
+from legacy.singleflight import SingleFlight, default_single_flight
+
+
+@dataclass
+class RunContext:
+    """Состояние одного запуска парсера, общее для всех партнёров."""
+    scheduler: FetchScheduler = field(default_factory=FetchScheduler)
+    # ожидание слотов планировщика в этом запуске (планировщик может быть общим на сессию)
+    scheduler_stats: SlotStats = field(default_factory=SlotStats)
+    single_flight: SingleFlight = field(default_factory=default_single_flight)
+    # куда сохранять сырые ответы
+    archive: Optional[ResponseArchive] = None
+    # откуда брать ответы вместо сети (режим повторного разбора)
+    replay: Optional[ResponseArchive] = None
+    # кэш закрытых дней партнёров с finalization_lag
+    result_cache: Optional[ResultCache] = None
+    # снимок уже вставленных итогов для вставки только изменений
+    insert_snapshot: Optional[InsertSnapshot] = None
+    # спул пачек вставки на случай недоступной базы
+    spool: Optional[InsertSpool] = None
+    # замеры запуска по партнёрам, URL и вставке
+    metrics: RunMetrics = field(default_factory=RunMetrics)
+    # клиент ParserSession; без него запуск открывает свой пул HttpClientManager
+    client: Optional[httpx.AsyncClient] = None
@@ -0,0 +1,24 @@
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+
+def normalize_date_array(values: Iterable, date_format: Optional[str] = None) -> np.ndarray:
+    """Преобразует даты отчёта в массив datetime64[ns], разбирая каждую уникальную строку один раз.
+
+    В отчёте обычно всего несколько сотен различных дней, поэтому вместо pd.to_datetime
+    на каждую запись разбираем только уникальные значения одним векторным вызовом.
+    Если значения в разных форматах, откатываемся на поштучный разбор уникальных.
+    """
+    values = list(values)
+    unique_values = list(dict.fromkeys(values))
+    if not unique_values:
+        return np.array([], dtype='datetime64[ns]')
+    try:
+        parsed = pd.to_datetime(pd.Index(unique_values, dtype=object), format=date_format)
+    except (ValueError, TypeError):
+        parsed = pd.DatetimeIndex([pd.to_datetime(value, format=date_format) for value in unique_values])
+    position = {value: i for i, value in enumerate(unique_values)}
+    codes = np.fromiter((position[value] for value in values), np.intp, len(values))
+    return parsed.to_numpy('datetime64[ns]')[codes]
@@ -0,0 +1,36 @@
+import asyncio
+from typing import Awaitable, Callable, Optional, TypeVar
+
+T = TypeVar('T')
+
+
+async def hedged(func: Callable[[], Awaitable[T]], delay: Optional[float],
+                 on_hedge: Optional[Callable[[], None]] = None) -> T:
+    """Вызывает func, а если она не завершилась за delay секунд — запускает вторую копию.
+
+    Возвращается результат той копии, что успешно завершится первой; вторая отменяется.
+    Ошибка пробрасывается, только если упали обе. Без delay это обычный вызов func.
+    """
+    if delay is None:
+        return await func()
+    tasks = [asyncio.ensure_future(func())]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if done:
+            return tasks[0].result()
+        if on_hedge is not None:
+            on_hedge()
+        tasks.append(asyncio.ensure_future(func()))
+        pending = set(tasks)
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = error or task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,47 @@
+from typing import Dict, Optional
+
+import httpx
+
+from legacy.config import HTTP_CLIENT_CONFIG
+
+
+def client_timeout(config: Optional[Dict] = None) -> httpx.Timeout:
+    """Таймауты клиента: connect_timeout на соединение, read_timeout на остальное."""
+    config = {**HTTP_CLIENT_CONFIG, **(config or {})}
+    return httpx.Timeout(config['read_timeout'], connect=config['connect_timeout'])
+
+
+class HttpClientManager:
+    """Владеет общим пулом соединений httpx на время одного запуска парсера.
+
+    Все партнёры получают один и тот же AsyncClient, поэтому запросы к одному хосту
+    переиспользуют keep-alive соединения вместо нового TCP+TLS рукопожатия на каждый URL.
+    Число одновременных запросов к хосту ограничивает FetchScheduler (max_per_host).
+    """
+
+    def __init__(self, config: Optional[Dict] = None, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.config = {**HTTP_CLIENT_CONFIG, **(config or {})}
+        self._transport = transport
+        self._client_cm = None
+        self.client: Optional[httpx.AsyncClient] = None
+
+    def _build_transport(self) -> httpx.AsyncBaseTransport:
+        if self._transport is not None:
+            return self._transport
+        return httpx.AsyncHTTPTransport(limits=httpx.Limits(
+            max_connections=self.config['max_connections'],
+            max_keepalive_connections=self.config['max_keepalive_connections'],
+            keepalive_expiry=self.config['keepalive_expiry'],
+        ))
+
+    async def __aenter__(self) -> httpx.AsyncClient:
+        self._client_cm = httpx.AsyncClient(transport=self._build_transport(), timeout=client_timeout(self.config))
+        self.client = await self._client_cm.__aenter__()
+        return self.client
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        try:
+            await self._client_cm.__aexit__(exc_type, exc, tb)
+        finally:
+            self._client_cm = None
+            self.client = None
@@ -0,0 +1,73 @@
+from typing import Any, Callable, Iterable, Iterator, List, Union
+import xml.etree.ElementTree as ET
+
+Chunk = Union[str, bytes]
+# PartnerRecord; не импортируем, чтобы abstract_partners мог использовать этот модуль
+PartnerRecord = Any
+
+
+class XMLRowParser:
+    """Инкрементальный разбор XML-отчёта.
+
+    Куски ответа подаются через feed(); как только закрывается элемент строки
+    (прямой потомок корня), из него сразу делается PartnerRecord, а сам элемент
+    удаляется из дерева. Поэтому в памяти не держится ни весь текст, ни всё дерево.
+    """
+
+    def __init__(self, extract_data: Callable[[ET.Element], PartnerRecord]):
+        self._extract_data = extract_data
+        self._parser = ET.XMLPullParser(events=('start', 'end'))
+        self._root = None
+        self._depth = 0
+
+    def feed(self, chunk: Chunk) -> List[PartnerRecord]:
+        """Подаёт очередной кусок ответа и возвращает закрывшиеся строки."""
+        self._parser.feed(chunk)
+        return self._read_rows()
+
+    def close(self) -> List[PartnerRecord]:
+        """Завершает разбор и возвращает оставшиеся строки."""
+        self._parser.close()
+        return self._read_rows()
+
+    def _read_rows(self) -> List[PartnerRecord]:
+        records = []
+        for event, element in self._parser.read_events():
+            if event == 'start':
+                if self._root is None:
+                    self._root = element
+                self._depth += 1
+                continue
+            self._depth -= 1
+            if self._depth == 1:
+                records.append(self._extract_data(element))
+                self._root.remove(element)
+        return records
+
+
+class BufferedParser:
+    """Парсер по умолчанию для партнёров без инкрементального формата.
+
+    Копит куски байтов и отдаёт тело целиком в norm_parse при close(). json.loads
+    принимает bytes, поэтому лишней копии в виде декодированной строки не появляется.
+    """
+
+    def __init__(self, norm_parse: Callable[[bytes], Iterable[PartnerRecord]]):
+        self._norm_parse = norm_parse
+        self._chunks = []
+
+    def feed(self, chunk: Chunk) -> List[PartnerRecord]:
+        self._chunks.append(chunk.encode() if isinstance(chunk, str) else chunk)
+        return []
+
+    def close(self) -> List[PartnerRecord]:
+        body = b''.join(self._chunks)
+        self._chunks = []
+        return list(self._norm_parse(body))
+
+
+def parse_chunks(parser, chunks: Iterable[Chunk]) -> Iterator[PartnerRecord]:
+    """Прогоняет куски ответа через инкрементальный парсер, отдавая записи по мере готовности."""
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
@@ -0,0 +1,102 @@
+import datetime
+import json
+import os
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from legacy.partner_data.batch import PartnerBatch
+
+# (ssp, dsp_id, день в днях от эпохи, валюта) → (imps, spent)
+Key = Tuple[str, int, int, str]
+
+# суммы spent из разных запусков могут отличаться в последних знаках из-за порядка сложения
+SPENT_TOLERANCE = 1e-6
+
+
+def _keys(batch: PartnerBatch) -> Iterable[Key]:
+    days = batch.date.astype('datetime64[D]').view(np.int64)
+    return zip(batch.ssp.tolist(), batch.dsp_id.tolist(), days.tolist(), batch.currency.tolist())
+
+
+class InsertSnapshot:
+    """Итоги (imps, spent) по ключу (партнёр, день, валюта), уже вставленные в ClickHouse.
+
+    Повторные запуски за пересекающийся период (ежедневная сверка последних дней)
+    в основном приносят те же цифры; changed() оставляет только новые и изменившиеся
+    строки. Снимок хранится JSON-файлом и записывается атомарно; ключи старше
+    retention_days отбрасываются при сохранении. Методы защищены блокировкой: снимок
+    ParserSession делят задания, чьи вставки идут в разных потоках. Разные процессы
+    не должны одновременно писать в один файл снимка.
+    """
+
+    def __init__(self, path: str, retention_days: Optional[int] = None):
+        self.path = path
+        self.retention_days = retention_days
+        self._totals: Dict[Key, Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+        try:
+            with open(path) as file:
+                rows = json.load(file)
+        except FileNotFoundError:
+            rows = []
+        for ssp, dsp_id, day, currency, imps, spent in rows:
+            self._totals[(ssp, dsp_id, int(np.datetime64(day, 'D').view(np.int64)), currency)] = (imps, spent)
+
+    def __len__(self) -> int:
+        return len(self._totals)
+
+    def changed(self, rows: Iterable) -> PartnerBatch:
+        """Строки, которых нет в снимке или чьи imps/spent отличаются от вставленных."""
+        batch = PartnerBatch.from_rows(rows)
+        mask = np.ones(len(batch), dtype=bool)
+        with self._lock:
+            for i, (key, imps, spent) in enumerate(zip(_keys(batch), batch.imps.tolist(), batch.spent.tolist())):
+                previous = self._totals.get(key)
+                if previous is not None and previous[0] == imps and abs(previous[1] - spent) <= SPENT_TOLERANCE:
+                    mask[i] = False
+        return batch[mask]
+
+    def update(self, rows: Iterable) -> None:
+        """Запоминает строки как вставленные."""
+        batch = PartnerBatch.from_rows(rows)
+        with self._lock:
+            for key, imps, spent in zip(_keys(batch), batch.imps.tolist(), batch.spent.tolist()):
+                self._totals[key] = (imps, spent)
+
+    def save(self, today: Optional[datetime.date] = None) -> None:
+        with self._lock:
+            self._save(today)
+
+    def _save(self, today: Optional[datetime.date]) -> None:
+        if self.retention_days is not None:
+            oldest = np.datetime64(today or datetime.date.today(), 'D') - np.timedelta64(self.retention_days, 'D')
+            oldest_day = int(oldest.view(np.int64))
+            self._totals = {key: value for key, value in self._totals.items() if key[2] >= oldest_day}
+        payload: List = [
+            [ssp, dsp_id, str(np.datetime64(day, 'D')), currency, imps, spent]
+            for (ssp, dsp_id, day, currency), (imps, spent) in self._totals.items()
+        ]
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f'{self.path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as file:
+            json.dump(payload, file)
+        os.replace(tmp_path, self.path)
+
+
+def delta_insert(snapshot: InsertSnapshot, insert_func: Callable[[PartnerBatch], None],
+                 on_skipped: Optional[Callable[[int], None]] = None) -> Callable[[Iterable], None]:
+    """Оборачивает вставку: пишутся только изменившиеся строки, снимок обновляется после успешной вставки."""
+    def insert(rows):
+        batch = PartnerBatch.from_rows(rows)
+        changed = snapshot.changed(batch)
+        if on_skipped is not None:
+            on_skipped(len(batch) - len(changed))
+        if not len(changed):
+            return
+        insert_func(changed)
+        snapshot.update(changed)
+        snapshot.save()
+    return insert
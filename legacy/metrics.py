@@ -0,0 +1,155 @@
+from dataclasses import asdict, dataclass, field
+import time
+
+import numpy as np
+from typing import Any, Callable, Dict, List, Optional
+
+# события httpcore, после которых заголовки ответа получены
+_HEADERS_RECEIVED_EVENTS = ('http11.receive_response_headers.complete', 'http2.receive_response_headers.complete')
+
+
+@dataclass
+class UrlMetrics:
+    """Замеры одного URL партнёра; склеенные одинаковые запросы копятся в одной записи."""
+    url: str
+    requests: int = 0
+    retries: int = 0
+    hedges: int = 0
+    ttfb_seconds: float = 0.0
+    # от отправки запроса до конца тела; в потоковом режиме включает разбор
+    fetch_seconds: float = 0.0
+    bytes: int = 0
+    parse_seconds: float = 0.0
+    records: int = 0
+    convert_seconds: float = 0.0
+    rows: int = 0
+    errors: int = 0
+    error_types: Dict[str, int] = field(default_factory=dict)
+    last_error: Optional[str] = None
+
+    def record_error(self, error: BaseException) -> None:
+        error_type = type(error).__name__
+        self.errors += 1
+        self.error_types[error_type] = self.error_types.get(error_type, 0) + 1
+        self.last_error = f'{error_type}: {error}'
+
+
+@dataclass
+class PartnerMetrics:
+    partner: str
+    auth_seconds: float = 0.0
+    cached_rows: int = 0
+    aggregation_seconds: float = 0.0
+    aggregated_rows: int = 0
+    # почему партнёр не загрузился целиком: исчерпан time_budget или упала авторизация
+    error: Optional[str] = None
+    urls: Dict[str, UrlMetrics] = field(default_factory=dict)
+
+    def url(self, url: str) -> UrlMetrics:
+        if url not in self.urls:
+            self.urls[url] = UrlMetrics(url)
+        return self.urls[url]
+
+    def report(self) -> Dict[str, Any]:
+        urls = list(self.urls.values())
+        report = asdict(self)
+        report['urls'] = [asdict(url_metrics) for url_metrics in urls]
+        for name in ('fetch_seconds', 'bytes', 'parse_seconds', 'convert_seconds', 'rows', 'retries', 'hedges', 'errors'):
+            report[name] = sum(getattr(url_metrics, name) for url_metrics in urls)
+        report['failed'] = self.failed
+        return report
+
+    @property
+    def failed(self) -> bool:
+        return self.error is not None or any(url_metrics.errors for url_metrics in self.urls.values())
+
+
+@dataclass
+class InsertMetrics:
+    batches: int = 0
+    rows: int = 0
+    # строки, не изменившиеся с прошлой вставки (INSERT_SNAPSHOT_CONFIG)
+    skipped_rows: int = 0
+    # строки, оставшиеся в спуле из-за сбоя вставки, и досланные из спула прошлых запусков
+    spooled_rows: int = 0
+    replayed_rows: int = 0
+    error: Optional[str] = None
+    error_types: Dict[str, int] = field(default_factory=dict)
+    seconds: float = 0.0
+    batch_rows: List[int] = field(default_factory=list)
+
+    def record_error(self, error: BaseException) -> None:
+        error_type = type(error).__name__
+        self.error_types[error_type] = self.error_types.get(error_type, 0) + 1
+        self.error = f'{error_type}: {error}'
+
+
+class RunMetrics:
+    """Замеры одного запуска парсера по партнёрам, URL и вставке.
+
+    Пишутся только счётчики и perf_counter на URL и на пачку, поэтому сбор можно
+    не выключать в проде. report() отдаёт всё словарём для логов и JSON.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.partners: Dict[str, PartnerMetrics] = {}
+        self.insert = InsertMetrics()
+        # длительности отдельных запросов по партнёрам — для перцентилей (в отчёт не попадают)
+        self.latencies: Dict[str, List[float]] = {}
+
+    def partner(self, partner_id: str) -> PartnerMetrics:
+        if partner_id not in self.partners:
+            self.partners[partner_id] = PartnerMetrics(partner_id)
+        return self.partners[partner_id]
+
+    def url(self, partner_id: str, url: str) -> UrlMetrics:
+        return self.partner(partner_id).url(url)
+
+    def observe_latency(self, partner_id: str, seconds: float) -> None:
+        self.latencies.setdefault(partner_id, []).append(seconds)
+
+    def latency_percentile(self, partner_id: str, percentile: float, min_samples: int = 1) -> Optional[float]:
+        """Перцентиль длительности запросов партнёра в этом запуске; None, пока замеров меньше min_samples."""
+        latencies = self.latencies.get(partner_id, [])
+        if len(latencies) < max(1, min_samples):
+            return None
+        return float(np.percentile(latencies, percentile))
+
+    def skip_insert_rows(self, rows: int) -> None:
+        self.insert.skipped_rows += rows
+
+    def spool_insert_rows(self, rows: int) -> None:
+        self.insert.spooled_rows += rows
+
+    def replay_insert_rows(self, rows: int) -> None:
+        self.insert.replayed_rows += rows
+
+    def timed_insert(self, insert_func: Callable[[List[Any]], Any]) -> Callable[[List[Any]], Any]:
+        """Оборачивает функцию вставки, считая пачки, строки и время."""
+        def insert(rows):
+            started = time.perf_counter()
+            try:
+                return insert_func(rows)
+            finally:
+                self.insert.seconds += time.perf_counter() - started
+                self.insert.batches += 1
+                self.insert.rows += len(rows)
+                self.insert.batch_rows.append(len(rows))
+        return insert
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            'total_seconds': time.perf_counter() - self.started,
+            'partners': {partner_id: metrics.report() for partner_id, metrics in self.partners.items()},
+            'failed_partners': [partner_id for partner_id, metrics in self.partners.items() if metrics.failed],
+            'insert': asdict(self.insert),
+        }
+
+
+def ttfb_trace(metrics: UrlMetrics, started: float):
+    """trace-расширение httpcore: записывает время до получения заголовков ответа."""
+    async def trace(event_name: str, info: Dict[str, Any]) -> None:
+        if event_name in _HEADERS_RECEIVED_EVENTS:
+            metrics.ttfb_seconds += time.perf_counter() - started
+    return trace
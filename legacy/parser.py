@@ -1,17 +1,34 @@
 import asyncio
+from contextlib import AsyncExitStack, nullcontext
 import datetime
+from functools import partial
+import logging
+import time
 import traceback
-from multiprocessing.connection import Client
 
 import pandas as pd
-from dataclasses import asdict
 
-from common.config import CLICKHOUSE_CONFIG_RO
 from common.queue import queue
 from legacy.abstract_partners import AbstractPartner
+from legacy.aggregation import aggregate
+from legacy.archive import ResponseArchive
+from legacy.clickhouse import ClickHouseWriter
+from legacy.config import ARCHIVE_CONFIG, INSERT_SNAPSHOT_CONFIG, RESULT_CACHE_CONFIG, SPOOL_CONFIG
+from legacy.context import RunContext
+from legacy.dates import normalize_date_array
+from legacy.http_client import HttpClientManager
+from legacy.insert_snapshot import InsertSnapshot
+from legacy.pipeline import BatchInserter
+from legacy.prometheus import export_run
+from legacy.result_cache import ResultCache, as_day, read_finalized_prefix, store_finalized_days
+from legacy.sinks import default_sinks, write_all
+from legacy.spool import InsertSpool
+from legacy.windows import split_date_range
 from legacy.partners.dsp_partners import DSPPartnerB, DSPPartnerF, DSPPartnerI, DSPPartnerM, DSPPartnerO
 from legacy.partners.ssp_partners import SSPPartnerA, SSPPartnerB, SSPPartnerC, SSPPartnerD, SSPPartnerM, SSPPartnerO, SSPPartnerS
-from .partner_data.data import PartnerData
+from .partner_data.batch import PartnerBatch
+
+logger = logging.getLogger(__name__)
 
 
 def Partners_data_loader(start_date=None, finish_date=None):
@@ -20,14 +37,83 @@ def Partners_data_loader(start_date=None, finish_date=None):
     return {'job_id': job.get_id()}, 200
 
 
-def load_insert_data(start_date, finish_date):
-    """Загружает данные всех партнёров за указанный период и вставляет их в базу."""
+def load_insert_data(start_date, finish_date, replay_archive=None, transport=None, insert_func=None, sinks=None):
+    """Загружает данные всех партнёров за указанный период и вставляет их в базу.
+
+    Синхронная обёртка над aload_insert_data для воркера очереди: каждый вызов
+    поднимает свой event loop и свой пул соединений.
+    """
+    return asyncio.run(aload_insert_data(start_date, finish_date, replay_archive, transport, insert_func, sinks))
+
+
+async def aload_insert_data(start_date, finish_date, replay_archive=None, transport=None, insert_func=None, sinks=None,
+                            partners=None, session=None):
+    """Загружает данные партнёров за указанный период и отдаёт их приёмникам внутри текущего event loop.
+
+    Если задан ARCHIVE_CONFIG['path'], сырые ответы сохраняются в архив. С replay_archive
+    (путь к архиву) ответы берутся из архива вместо API партнёров — для повторного разбора.
+    transport и insert_func подменяют сеть и вставку (нагрузочные тесты на локальном стенде),
+    sinks — приёмники данных вместо настроенных в SINKS_CONFIG (например, только FileSink),
+    partners — партнёры вместо get_all_partners(); одновременные запуски не должны делить
+    объекты партнёров. С session (ParserSession) запуск берёт из неё клиент, планировщик
+    и снимок вставок, поэтому много заданий одного процесса делят соединения и лимиты;
+    transport тогда не используется.
+    Возвращает отчёт RunMetrics о запуске: время и объёмы по партнёрам, URL и вставке;
+    он же накапливается в метриках Prometheus процесса (см. PROMETHEUS_CONFIG).
+    """
     start_date = pd.to_datetime(start_date) if start_date else datetime.date.today() - datetime.timedelta(days=1)
     finish_date = pd.to_datetime(finish_date) if finish_date else datetime.date.today() - datetime.timedelta(days=1)
 
-    normal_partners = get_all_partners()
-    data = asyncio.run(load(normal_partners, start_date, finish_date))
-    insert(data)
+    context = new_run_context(replay_archive, session)
+    normal_partners = get_all_partners() if partners is None else partners
+    try:
+        await load_and_insert(normal_partners, start_date, finish_date, insert_func, transport, context, sinks)
+    except Exception as e:
+        # сбой вставки (или приёмника) прерывает запуск, но отчёт о нём всё равно уходит в метрики
+        context.metrics.insert.record_error(e)
+        raise
+    finally:
+        report = report_run(context)
+    return report
+
+
+def new_run_context(replay_archive=None, session=None):
+    """Собирает RunContext запуска по конфигам и общим ресурсам сессии."""
+    context = RunContext()
+    if replay_archive:
+        context.replay = ResponseArchive(replay_archive)
+    elif ARCHIVE_CONFIG['path']:
+        context.archive = ResponseArchive(ARCHIVE_CONFIG['path'])
+    if RESULT_CACHE_CONFIG['path']:
+        context.result_cache = ResultCache(RESULT_CACHE_CONFIG['path'])
+    if session is not None:
+        context.client = session.client
+        context.scheduler = session.scheduler
+        context.insert_snapshot = session.insert_snapshot
+    elif INSERT_SNAPSHOT_CONFIG['path']:
+        context.insert_snapshot = InsertSnapshot(INSERT_SNAPSHOT_CONFIG['path'], INSERT_SNAPSHOT_CONFIG['retention_days'])
+    if SPOOL_CONFIG['path']:
+        context.spool = InsertSpool(SPOOL_CONFIG['path'])
+    return context
+
+
+def report_run(context):
+    """Логирует отчёт запуска, добавляет его в метрики Prometheus и возвращает."""
+    report = context.metrics.report()
+    logger.info('run report: %s', report)
+    if report['failed_partners']:
+        logger.warning('failed partners: %s', ', '.join(report['failed_partners']))
+    if report['insert']['spooled_rows']:
+        logger.warning('%d rows left in spool %s after insert error: %s',
+                       report['insert']['spooled_rows'], SPOOL_CONFIG['path'], report['insert']['error'])
+    elif report['insert']['error']:
+        logger.error('insert failed: %s', report['insert']['error'])
+    try:
+        export_run(report)
+    except Exception:
+        # данные уже вставлены; сбой метрик не должен ронять задание или заслонять ошибку вставки
+        logger.exception('failed to export run metrics')
+    return report
 
 
 def get_all_partners():
@@ -48,70 +134,186 @@ def get_all_partners():
     ]
 
 
-async def load(normal_partners, start_date, finish_date):
-    """Асинхронно загружает данные партнёров и агрегирует их."""
-    tasks = [ok_parser(partner, start_date, finish_date) for partner in normal_partners]
-    partners_data_list = await asyncio.gather(*tasks)
+async def load(normal_partners, start_date, finish_date, transport=None, context=None):
+    """Асинхронно загружает данные партнёров и агрегирует их в один PartnerBatch."""
+    batches = []
+    async for partner_batch in iter_partner_data(normal_partners, start_date, finish_date, transport, context):
+        batches.append(partner_batch)
+    return PartnerBatch.concat(batches)
+
+
+async def load_and_insert(normal_partners, start_date, finish_date, insert_func=None, transport=None, context=None,
+                          sinks=None):
+    """Загружает партнёров и отдаёт их данные приёмникам по мере готовности через ограниченную очередь.
 
-    data = []
-    for partner_data_list in partners_data_list:
-        data += agg_list_2keys_2values(partner_data_list)
-    return data
+    Данные партнёра уходят во вставку сразу после его агрегации, пока остальные ещё
+    загружаются, поэтому в памяти не копятся результаты всего запуска.
+    Без sinks приёмники берутся из SINKS_CONFIG (default_sinks): база — ClickHouseWriter
+    на весь запуск или insert_func вместо него, со спулом и записью только изменений
+    из context (см. InsertSink), и, если настроено, колоночные файлы (FileSink).
+    """
+    context = context or RunContext()
+    sinks = default_sinks(insert_func, context) if sinks is None else list(sinks)
+    async with AsyncExitStack() as stack:
+        for sink in sinks:
+            await asyncio.to_thread(sink.open)
+            # при ошибке запуска приёмник получает abort() вместо close()
+            stack.push_async_exit(partial(asyncio.to_thread, sink.__exit__))
+        async with BatchInserter(write_all(sinks)) as inserter:
+            async for partner_data_list in iter_partner_data(normal_partners, start_date, finish_date, transport, context):
+                await inserter.put(partner_data_list)
 
 
-async def ok_parser(normal_partner: AbstractPartner, start_date, finish_date):
-    """Асинхронно получает данные одного партнёра за указанный период."""
+async def iter_partner_data(normal_partners, start_date, finish_date, transport=None, context=None):
+    """Асинхронный генератор агрегированных данных партнёров в порядке завершения их загрузки.
+
+    Все партнёры запуска работают через один пул соединений HttpClientManager
+    (или клиент сессии из context.client),
+    а запросы проходят через общий FetchScheduler из RunContext. Партнёр, не уложившийся
+    в свой time_budget или упавший целиком, отмечается в context.metrics как упавший
+    и ничего не отдаёт, а остальные партнёры загружаются и вставляются как обычно.
+    """
+    context = context or RunContext()
+
+    async def load_partner(partner):
+        try:
+            return partner, await asyncio.wait_for(ok_parser(partner, start_date, finish_date, context), partner.time_budget)
+        except asyncio.TimeoutError:
+            error = f'TimeoutError: time budget of {partner.time_budget}s exceeded'
+        except Exception as e:
+            error = f'{type(e).__name__}: {e}'
+        logger.error('partner %s failed: %s', partner.id, error)
+        context.metrics.partner(partner.id).error = error
+        return partner, []
+
+    client_manager = HttpClientManager(transport=transport) if context.client is None else nullcontext(context.client)
+    async with client_manager as client:
+        for partner in normal_partners:
+            partner.bind_client(client)
+            partner.bind_archive(context.archive)
+            partner.bind_metrics(context.metrics)
+            partner.bind_scheduler(context.scheduler, context.scheduler_stats)
+        tasks = [asyncio.create_task(load_partner(partner)) for partner in normal_partners]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                partner, partner_data_list = await next_done
+                started = time.perf_counter()
+                aggregated = agg_list_2keys_2values(partner_data_list)
+                partner_metrics = context.metrics.partner(partner.id)
+                partner_metrics.aggregation_seconds += time.perf_counter() - started
+                partner_metrics.aggregated_rows += len(aggregated)
+                yield aggregated
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for partner in normal_partners:
+                partner.bind_client(None)
+                partner.bind_archive(None)
+                partner.bind_metrics(None)
+                partner.bind_scheduler(None)
+            logger.info('fetch scheduler stats: %s', context.scheduler.stats(context.scheduler_stats))
+
+
+async def ok_parser(normal_partner: AbstractPartner, start_date, finish_date, context=None):
+    """Асинхронно получает данные одного партнёра за указанный период.
+
+    Если у партнёра задан date_window, период делится на окна, URL строятся для
+    каждого окна и загружаются параллельно (в пределах лимитов планировщика).
+    Для партнёров с finalization_lag закрытые дни в начале периода берутся из
+    context.result_cache, а загружается только остаток.
+    """
+    context = context or RunContext()
+    use_cache = context.result_cache is not None and normal_partner.finalization_lag is not None
+    # при повторе по архиву URL должны совпасть с архивными, поэтому кэш не используем
+    use_cache = use_cache and context.replay is None
+    cached_data_list = PartnerBatch.empty()
+    if use_cache:
+        cached_data_list, start_date = read_finalized_prefix(context.result_cache, normal_partner, start_date, finish_date)
+        context.metrics.partner(normal_partner.id).cached_rows += len(cached_data_list)
+        finish_date = as_day(finish_date)
+        if start_date > finish_date:
+            return cached_data_list
+
     partner_data_list = []
-    await normal_partner.authentificate()
-    start_date_str = normal_partner.format_date(start_date)
-    finish_date_str = normal_partner.format_date(finish_date)
-    urls = normal_partner.get_urls(start_date_str, finish_date_str)
+    if context.replay is None:
+        started = time.perf_counter()
+        await normal_partner.authentificate()
+        context.metrics.partner(normal_partner.id).auth_seconds += time.perf_counter() - started
+    urls = []
+    for window_start, window_finish in split_date_range(start_date, finish_date, normal_partner.date_window):
+        start_date_str = normal_partner.format_date(window_start)
+        finish_date_str = normal_partner.format_date(window_finish)
+        urls += normal_partner.get_urls(start_date_str, finish_date_str)
 
-    await asyncio.gather(*(parse_one_url(normal_partner, url, partner_data_list) for url in urls))
-    return partner_data_list
+    results = await asyncio.gather(*(parse_one_url(normal_partner, url, partner_data_list, context) for url in urls))
+    fetched = PartnerBatch.concat(partner_data_list)
+    if use_cache and all(results):
+        # кэшируем только полностью загруженные дни, иначе потерянный URL закрепится навсегда
+        store_finalized_days(context.result_cache, normal_partner, start_date, finish_date, fetched)
+    return PartnerBatch.concat([cached_data_list, fetched])
 
 
-async def parse_one_url(normal_partner, url, partner_data_list):
-    """Асинхронно обрабатывает один URL партнёра и добавляет результаты в список."""
+async def parse_one_url(normal_partner, url, partner_data_list, context=None):
+    """Асинхронно обрабатывает один URL партнёра и добавляет его PartnerBatch в список.
+
+    Возвращает True, если URL обработан без ошибок.
+    """
+    context = context or RunContext()
+    metrics = context.metrics.url(normal_partner.id, url)
     try:
-        text = await normal_partner.request_data(url)
+        records = await fetch_records(normal_partner, url, context)
+        started = time.perf_counter()
         dsp_id = 0
         ssp = ''
         if normal_partner.id.isdigit():
             dsp_id = int(normal_partner.id)
         else:
             ssp = normal_partner.id
-        for record in normal_partner.norm_parse(text):
-            partner_data = PartnerData(
-                ssp=ssp,
-                dsp_id=dsp_id,
-                date=pd.to_datetime(record.date),
-                imps=record.imps,
-                spent=record.spent,
-                currency=normal_partner.currency,
-            )
-            partner_data_list.append(partner_data)
-    except Exception:
+        dates = normalize_date_array((record.date for record in records), normal_partner.date_format)
+        url_batch = PartnerBatch.from_records(records, dates, ssp=ssp, dsp_id=dsp_id, currency=normal_partner.currency)
+        metrics.convert_seconds += time.perf_counter() - started
+    except Exception as e:
+        metrics.record_error(e)
         traceback.print_exc()
+        return False
+    metrics.rows += len(url_batch)
+    partner_data_list.append(url_batch)
+    return True
 
 
-def agg_list_2keys_2values(partner_data_list):  # [ssp/dsp,date,sum(imps),sum(spent)]
-    """Агрегирует PartnerData по ключам (ssp/dsp_id + дата), суммируя показатели и затраты."""
-    aggregated_data = {}
+async def fetch_records(normal_partner, url, context):
+    """Загружает записи URL, склеивая одинаковые одновременные запросы.
+
+    Слот context.scheduler партнёр занимает сам на каждую попытку (см. bind_scheduler),
+    так что паузы между повторами и ожидание rate limit слотов не держат.
+
+    Запросы с одинаковыми партнёром, методом, URL и заголовками разделяют один ответ
+    и один разбор; партнёр может отключить это через coalesce_requests=False.
+    В режиме повтора тело берётся из архива context.replay, а не из сети.
+    """
+    if context.replay is not None:
+        body = context.replay.load(normal_partner.id, url)
+        started = time.perf_counter()
+        records = list(normal_partner.norm_parse(body))
+        metrics = context.metrics.url(normal_partner.id, url)
+        metrics.bytes += len(body)
+        metrics.parse_seconds += time.perf_counter() - started
+        metrics.records += len(records)
+        return records
+
+    if not normal_partner.coalesce_requests:
+        return await normal_partner.fetch_records(url)
+    key = (normal_partner.id, 'GET', url, tuple(sorted(normal_partner._headers.items())))
+    return await context.single_flight.do(key, lambda: normal_partner.fetch_records(url))
 
-    for partner_data in partner_data_list:
-        key = str(partner_data.ssp) + str(partner_data.dsp_id) + str(partner_data.date)
-        if key in aggregated_data:
-            aggregated_data[key].imps += partner_data.imps
-            aggregated_data[key].spent += partner_data.spent
-        else:
-            aggregated_data[key] = partner_data
 
-    return list(aggregated_data.values())
+def agg_list_2keys_2values(partner_data_list):  # [ssp/dsp,date,currency,sum(imps),sum(spent)]
+    """Агрегирует PartnerData по ключу (ssp, dsp_id, дата, валюта), суммируя показатели и затраты."""
+    return aggregate(partner_data_list)
 
 
 def insert(data):
-    """Вставляет список PartnerData в таблицу ClickHouse."""
-    query = "INSERT INTO dbname.partner_data (*) VALUES"
-    client = Client(CLICKHOUSE_CONFIG_RO['host'])
-    client.execute(query, (asdict(row) for row in data))
+    """Вставляет PartnerBatch в таблицу ClickHouse (см. CLICKHOUSE_INSERT_CONFIG)."""
+    with ClickHouseWriter() as writer:
+        writer.insert(data)
@@ -0,0 +1,125 @@
+from collections.abc import Sequence
+from typing import Any, Dict, Iterable, Iterator, List
+
+import numpy as np
+import pandas as pd
+
+from legacy.partner_data.data import PartnerData
+
+COLUMNS = ('date', 'dsp_id', 'ssp', 'imps', 'spent', 'currency')
+DTYPES = {
+    'date': 'datetime64[ns]',
+    'dsp_id': np.int64,
+    'ssp': object,
+    'imps': np.int64,
+    'spent': np.float64,
+    'currency': object,
+}
+
+
+def _repeat(value: str, count: int) -> np.ndarray:
+    """Колонка из count ссылок на одну строку (np.full создал бы по копии строки на элемент)."""
+    column = np.empty(count, dtype=object)
+    column.fill(value)
+    return column
+
+
+class PartnerBatch(Sequence):
+    """Строки PartnerData в колонках: по numpy-массиву на поле.
+
+    Строка занимает несколько машинных слов вместо отдельного объекта с Timestamp,
+    int и float внутри, а агрегация и вставка работают с массивами целиком.
+    Для совместимости пачка ведёт себя как последовательность PartnerData:
+    batch[i] и итерация собирают PartnerData на лету, срезы и маски дают PartnerBatch.
+    """
+
+    __slots__ = COLUMNS
+
+    def __init__(self, date, dsp_id, ssp, imps, spent, currency):
+        self.date = np.asarray(date, dtype=DTYPES['date'])
+        self.dsp_id = np.asarray(dsp_id, dtype=DTYPES['dsp_id'])
+        self.ssp = np.asarray(ssp, dtype=DTYPES['ssp'])
+        self.imps = np.asarray(imps, dtype=DTYPES['imps'])
+        self.spent = np.asarray(spent, dtype=DTYPES['spent'])
+        self.currency = np.asarray(currency, dtype=DTYPES['currency'])
+
+    @classmethod
+    def empty(cls) -> 'PartnerBatch':
+        return cls(*([] for _ in COLUMNS))
+
+    @classmethod
+    def from_records(cls, records: List[Any], dates: np.ndarray, ssp: str = '', dsp_id: int = 0,
+                     currency: str = 'usd') -> 'PartnerBatch':
+        """Пачка одного URL: записи norm_parse, их разобранные даты и общие для партнёра поля."""
+        count = len(records)
+        return cls(
+            date=dates,
+            dsp_id=np.full(count, dsp_id, dtype=DTYPES['dsp_id']),
+            ssp=_repeat(ssp, count),
+            imps=np.fromiter((record.imps for record in records), DTYPES['imps'], count),
+            spent=np.fromiter((record.spent for record in records), DTYPES['spent'], count),
+            currency=_repeat(currency, count),
+        )
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[PartnerData]) -> 'PartnerBatch':
+        if isinstance(rows, PartnerBatch):
+            return rows
+        rows = list(rows)
+        if not rows:
+            return cls.empty()
+        return cls(
+            date=pd.to_datetime([row.date for row in rows]).to_numpy(DTYPES['date']),
+            **{column: [getattr(row, column) for row in rows] for column in COLUMNS[1:]},
+        )
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame) -> 'PartnerBatch':
+        return cls(**{column: frame[column].to_numpy() for column in COLUMNS})
+
+    @classmethod
+    def concat(cls, batches: Iterable['PartnerBatch']) -> 'PartnerBatch':
+        batches = [batch for batch in batches if len(batch)]
+        if not batches:
+            return cls.empty()
+        if len(batches) == 1:
+            return batches[0]
+        return cls(*(np.concatenate([getattr(batch, column) for batch in batches]) for column in COLUMNS))
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame({column: getattr(self, column) for column in COLUMNS}, copy=False)
+
+    def to_dicts(self) -> Iterator[Dict[str, Any]]:
+        """Строки словарями с питоновскими значениями, собранные прямо из колонок."""
+        return (dict(zip(COLUMNS, values)) for values in self._row_values())
+
+    def _row_values(self) -> Iterator[tuple]:
+        return zip(pd.DatetimeIndex(self.date), self.dsp_id.tolist(), self.ssp.tolist(),
+                   self.imps.tolist(), self.spent.tolist(), self.currency.tolist())
+
+    def __len__(self) -> int:
+        return len(self.date)
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            return PartnerData(date=pd.Timestamp(self.date[index]), dsp_id=int(self.dsp_id[index]),
+                               ssp=self.ssp[index], imps=int(self.imps[index]), spent=float(self.spent[index]),
+                               currency=self.currency[index])
+        return PartnerBatch(*(getattr(self, column)[index] for column in COLUMNS))
+
+    def __iter__(self) -> Iterator[PartnerData]:
+        for date, dsp_id, ssp, imps, spent, currency in self._row_values():
+            yield PartnerData(date=date, dsp_id=dsp_id, ssp=ssp, imps=imps, spent=spent, currency=currency)
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, PartnerBatch):
+            return len(self) == len(other) and all(
+                np.array_equal(getattr(self, column), getattr(other, column)) for column in COLUMNS)
+        if isinstance(other, (list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f'PartnerBatch({len(self)} rows)'
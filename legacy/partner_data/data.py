@@ -2,7 +2,7 @@ from dataclasses import dataclass
 import datetime
 
 
-@dataclass
+@dataclass(slots=True)
 class PartnerData:
     date: datetime.date
     dsp_id: int = 0
@@ -3,12 +3,10 @@ import datetime
 from itertools import chain
 import json
 from typing import Dict
-import xml.etree.cElementTree as ET
-
-import httpx
 
 from legacy.abstract_partners import AbstractPartner, PartnerRecord
 from legacy.config import PARTNER_B_DSP_LOGIN_DATA, PARTNER_M_DSP_ACCESS_TOKEN
+from legacy.incremental import XMLRowParser, parse_chunks
 
 
 @dataclass
@@ -42,6 +40,7 @@ class DSPPartnerO(AbstractPartner):
     urltype: str = 'json'
     id: str = '65'
     currency: str = 'rub'
+    date_format: str = '%Y-%m-%d'
 
     def get_urls(self, start_date, finish_date):
         return [f'https://dsp-partner-o.example/v1/reporting?start={start_date}&end={finish_date}&group=day',
@@ -65,6 +64,8 @@ class DSPPartnerM(AbstractPartner):
     urltype: str = 'json'
     id: str = '27'
     currency: str = 'rub'
+    rate_limit: float = 5.0
+    rate_burst: int = 5
     _headers: Dict[str, str] = field(default_factory=lambda: {'Authorization': f'Bearer {PARTNER_M_DSP_ACCESS_TOKEN}'})
 
     def get_urls(self, start_date, finish_date):
@@ -94,19 +95,19 @@ class DSPPartnerB(AbstractPartner):
     urltype: str = 'json'
     id: str = '35'
     currency: str = 'rub'
-
-    async def authentificate(self):
-        """Получаем токен и сохраняем его в headers."""
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                'https://dsp-partner-b.example/token',
-                data={
-                    'login': PARTNER_B_DSP_LOGIN_DATA['login'],
-                    'password': PARTNER_B_DSP_LOGIN_DATA['password']
-                }
-            )
-            token = response.json()['data']
-            self._headers['Authorization'] = f'Token {token}'
+    auth_scheme: str = 'Token'
+
+    async def request_token(self, client):
+        """Получаем токен; срок жизни партнёр не сообщает."""
+        response = await client.post(
+            'https://dsp-partner-b.example/token',
+            data={
+                'login': PARTNER_B_DSP_LOGIN_DATA['login'],
+                'password': PARTNER_B_DSP_LOGIN_DATA['password']
+            }
+        )
+        response.raise_for_status()
+        return response.json()['data'], None
 
     def get_urls(self, start_date, finish_date):
         return [f'https://dsp-partner-b.example/users/{PARTNER_B_DSP_LOGIN_DATA["user_id"]}/sites/chart?start_date={start_date}&end_date={finish_date}',
@@ -129,6 +130,7 @@ class DSPPartnerB(AbstractPartner):
 class DSPPartnerF(AbstractPartner):
     urltype: str = 'xml'
     id: str = '110'
+    stream_response: bool = True
 
     def get_urls(self, start_date, finish_date):
         return [f'https://dsp-partner-f.example/ssp_xml?start={start_date}&end={finish_date}',
@@ -136,12 +138,13 @@ class DSPPartnerF(AbstractPartner):
                 ]
 
     def norm_parse(self, text):
-        _xml = ET.fromstring(text)
+        return parse_chunks(self.incremental_parser(), (text,))
 
+    def incremental_parser(self):
         def extract_data(data):
             date = data.find('date').text
             impressions = int(float(data.find('impressions').text))
             revenue = float(data.find('revenue').text)
             return PartnerRecord(date, impressions, revenue)
 
-        return map(extract_data, _xml)
+        return XMLRowParser(extract_data)
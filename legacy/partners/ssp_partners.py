@@ -3,12 +3,10 @@ from dataclasses import dataclass, field
 import datetime
 import json
 from typing import Dict
-import xml.etree.cElementTree as ET
-
-import httpx
 
 from legacy.abstract_partners import AbstractPartner, PartnerRecord
 from legacy.config import PARTNER_A_SSP_LOGIN, PARTNER_B_SSP_LOGIN_DATA, PARTNER_M_SSP_ACCESS_TOKEN
+from legacy.incremental import XMLRowParser, parse_chunks
 
 
 @dataclass
@@ -40,19 +38,19 @@ class SSPPartnerB(AbstractPartner):
     urltype: str = 'json'
     id: str = 'ssp-partner-b'
     currency: str = 'rub'
-
-    async def authentificate(self):
-        """Получаем токен и сохраняем его в headers."""
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                'https://ssp-partner-b.example/auth',
-                data={
-                    'login': PARTNER_B_SSP_LOGIN_DATA['login'],
-                    'password': PARTNER_B_SSP_LOGIN_DATA['password']
-                }
-            )
-            token = response.json()['data']
-            self._headers['Authorization'] = f'Token {token}'
+    auth_scheme: str = 'Token'
+
+    async def request_token(self, client):
+        """Получаем токен; срок жизни партнёр не сообщает."""
+        response = await client.post(
+            'https://ssp-partner-b.example/auth',
+            data={
+                'login': PARTNER_B_SSP_LOGIN_DATA['login'],
+                'password': PARTNER_B_SSP_LOGIN_DATA['password']
+            }
+        )
+        response.raise_for_status()
+        return response.json()['data'], None
 
     def get_urls(self, start_date, finish_date):
         return [f'https://ssp-partner-b.example/users/{PARTNER_B_SSP_LOGIN_DATA["user_id"]}/report?start_date={start_date}&end_date={finish_date}',
@@ -121,27 +119,30 @@ class SSPPartnerS(AbstractPartner):
 class SSPPartnerC(AbstractPartner):
     urltype: str = 'xml'
     id: str = 'ssp-partner-c'
+    stream_response: bool = True
 
     def get_urls(self, start_date, finish_date):
         return [f'https://ssp-partner-c.example/dsp-report.xml?start={start_date}&end={finish_date}',
                 ]
 
     def norm_parse(self, text):
-        _xml = ET.fromstring(text)
+        return parse_chunks(self.incremental_parser(), (text,))
 
+    def incremental_parser(self):
         def extract_data(element):
             date = element.attrib['date']
             impressions = int(float(element.find('impressions').text))
             revenue = float(element.find('revenue').text)
             return PartnerRecord(date, impressions, revenue)
 
-        return map(extract_data, _xml)
+        return XMLRowParser(extract_data)
 
 
 @dataclass
 class SSPPartnerD(AbstractPartner):
     urltype: str = 'xml'
     id: str = 'ssp-partner-d'
+    stream_response: bool = True
 
     def get_urls(self, start_date, finish_date):
         return [f'https://ssp-partner-d.example/xml-report?format=xml&start={start_date}&end={finish_date}',
@@ -150,36 +151,41 @@ class SSPPartnerD(AbstractPartner):
                 ]
 
     def norm_parse(self, text):
-        _xml = ET.fromstring(text)
+        return parse_chunks(self.incremental_parser(), (text,))
 
+    def incremental_parser(self):
         def extract_data(data):
             date = data.attrib['date']
             impressions = int(float(data.find('impressions').text))
             revenue = float(data.find('revenue').text)
             return PartnerRecord(date, impressions, revenue)
 
-        return map(extract_data, _xml)
+        return XMLRowParser(extract_data)
 
 
 @dataclass
 class SSPPartnerA(AbstractPartner):
     urltype: str = 'json'
     id: str = 'superpartner'
-
-    async def authentificate(self):
-        """Получаем токен и сохраняем его в headers."""
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://ssp-partner-a.example/oauth2/token",
-                data={
-                    'grant_type': PARTNER_A_SSP_LOGIN['grant_type'],
-                    'client_id': PARTNER_A_SSP_LOGIN['client_id'],
-                    'username': PARTNER_A_SSP_LOGIN['username'],
-                    'password': PARTNER_A_SSP_LOGIN['password'],
-                }
-            )
-            token = response.json()['access_token']
-            self._headers['Authorization'] = f'Bearer {token}'
+    date_format: str = '%Y%m%d'
+    rate_limit: float = 2.0
+    rate_burst: int = 2
+    auth_scheme: str = 'Bearer'
+
+    async def request_token(self, client):
+        """Получаем OAuth2 токен и его срок жизни (expires_in)."""
+        response = await client.post(
+            "https://ssp-partner-a.example/oauth2/token",
+            data={
+                'grant_type': PARTNER_A_SSP_LOGIN['grant_type'],
+                'client_id': PARTNER_A_SSP_LOGIN['client_id'],
+                'username': PARTNER_A_SSP_LOGIN['username'],
+                'password': PARTNER_A_SSP_LOGIN['password'],
+            }
+        )
+        response.raise_for_status()
+        _json = response.json()
+        return _json['access_token'], _json.get('expires_in')
 
     def format_date(self, date: datetime):
         date_str = date.strftime("%Y%m%d")
@@ -0,0 +1,100 @@
+import asyncio
+from itertools import chain
+from typing import Callable, List, Optional
+
+from legacy.config import PIPELINE_CONFIG
+from legacy.partner_data.batch import PartnerBatch
+
+_STOP = object()
+
+
+def _concat(pieces: List):
+    """Склеивает накопленные куски: PartnerBatch — по колонкам, списки — в один список."""
+    if len(pieces) == 1:
+        return pieces[0]
+    if isinstance(pieces[0], PartnerBatch):
+        return PartnerBatch.concat(pieces)
+    return list(chain.from_iterable(pieces))
+
+
+class BatchInserter:
+    """Ограниченная очередь вставки между загрузкой партнёров и базой.
+
+    Производители кладут готовые строки через put(); фоновая задача копит их и
+    вызывает insert_func пачками по insert_batch_size строк или раз в flush_interval
+    секунд. Строки приходят PartnerBatch (или списками) и уходят во вставку тем же
+    типом, без разбора на отдельные объекты. Очередь ограничена queue_size, поэтому при медленной базе загрузка
+    притормаживает, а не копит данные в памяти.
+    """
+
+    def __init__(self, insert_func: Callable[[List], None], insert_batch_size: Optional[int] = None,
+                 flush_interval: Optional[float] = None, queue_size: Optional[int] = None):
+        self._insert_func = insert_func
+        self.insert_batch_size = insert_batch_size or PIPELINE_CONFIG['insert_batch_size']
+        self.flush_interval = flush_interval or PIPELINE_CONFIG['flush_interval']
+        self._queue = asyncio.Queue(maxsize=queue_size or PIPELINE_CONFIG['queue_size'])
+        self._consumer: Optional[asyncio.Task] = None
+        self.inserted_rows = 0
+
+    async def __aenter__(self) -> 'BatchInserter':
+        self._consumer = asyncio.create_task(self._consume())
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None:
+            self._consumer.cancel()
+            await asyncio.gather(self._consumer, return_exceptions=True)
+            return
+        await self._put(_STOP)
+        await self._consumer
+
+    async def put(self, rows: List) -> None:
+        """Кладёт строки в очередь вставки, ожидая места при заполненной очереди."""
+        if rows:
+            await self._put(rows)
+
+    async def _put(self, item) -> None:
+        if self._consumer.done():
+            # вставка уже упала — отдаём её ошибку производителю
+            self._consumer.result()
+        put_task = asyncio.ensure_future(self._queue.put(item))
+        await asyncio.wait({put_task, self._consumer}, return_when=asyncio.FIRST_COMPLETED)
+        if not put_task.done():
+            put_task.cancel()
+            self._consumer.result()
+
+    async def _consume(self) -> None:
+        loop = asyncio.get_running_loop()
+        # куски, пришедшие после последней вставки, и сколько в них строк
+        buffer = []
+        buffered = 0
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - loop.time())
+            try:
+                item = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                await self._flush(buffer)
+                buffer, buffered, deadline = [], 0, None
+                continue
+            if item is _STOP:
+                break
+            if not buffer:
+                deadline = loop.time() + self.flush_interval
+            buffer.append(item)
+            buffered += len(item)
+            while buffered >= self.insert_batch_size:
+                rows = _concat(buffer)
+                await self._flush([rows[:self.insert_batch_size]])
+                rest = rows[self.insert_batch_size:]
+                buffer, buffered = ([rest], len(rest)) if len(rest) else ([], 0)
+                deadline = loop.time() + self.flush_interval if buffer else None
+        await self._flush(buffer)
+
+    async def _flush(self, pieces: List) -> None:
+        if not pieces:
+            return
+        rows = _concat(pieces)
+        if len(rows):
+            await asyncio.to_thread(self._insert_func, rows)
+            self.inserted_rows += len(rows)
@@ -0,0 +1,263 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import logging
+import math
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from legacy.config import PROMETHEUS_CONFIG
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+BATCH_ROWS_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value))
+
+
+class Counter:
+    type = 'counter'
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> List[Tuple[str, Labels, float]]:
+        return [(self.name, labels, value) for labels, value in self._values.items()]
+
+
+class Gauge(Counter):
+    type = 'gauge'
+
+    def set(self, value: float, **labels: str) -> None:
+        self._values[tuple(sorted(labels.items()))] = value
+
+
+class Histogram:
+    type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float]):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets) + (math.inf,)
+        # на каждый набор меток: счётчики по корзинам (не накопительные), сумма и число наблюдений
+        self._values: Dict[Labels, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        if key not in self._values:
+            self._values[key] = ([0] * len(self.buckets), [0.0, 0])
+        counts, total = self._values[key]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        total[0] += value
+        total[1] += 1
+
+    def samples(self) -> List[Tuple[str, Labels, float]]:
+        samples = []
+        for labels, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                samples.append((f'{self.name}_bucket', labels + (('le', _format_value(bound)),), cumulative))
+            samples.append((f'{self.name}_sum', labels, total[0]))
+            samples.append((f'{self.name}_count', labels, total[1]))
+        return samples
+
+
+class Registry:
+    """Набор метрик процесса в текстовом формате Prometheus.
+
+    Воркер очереди выполняет много задач подряд, поэтому счётчики копятся за всё
+    время жизни процесса. Обновление и отрисовка идут под одной блокировкой:
+    HTTP-эндпоинт читает их из своего потока. const_labels добавляются ко всем
+    рядам — так ряды разных воркеров одного хоста не совпадают.
+    """
+
+    def __init__(self, const_labels: Optional[Dict[str, str]] = None):
+        self.lock = threading.Lock()
+        self.const_labels: Labels = tuple(sorted((const_labels or {}).items()))
+        self._metrics: List[Any] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        with self.lock:
+            for metric in self._metrics:
+                lines.append(f'# HELP {metric.name} {metric.documentation}')
+                lines.append(f'# TYPE {metric.name} {metric.type}')
+                for name, labels, value in metric.samples():
+                    lines.append(f'{name}{_format_labels(self.const_labels + labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+class ParserMetrics:
+    """Метрики парсера партнёров, которые пополняются отчётом RunMetrics после каждого запуска."""
+
+    def __init__(self, const_labels: Optional[Dict[str, str]] = None):
+        self.registry = Registry(const_labels)
+        register = self.registry.register
+        self.runs = register(Counter('partner_parser_runs_total', 'Завершённые запуски load_insert_data.'))
+        self.last_run = register(Gauge('partner_parser_last_run_timestamp_seconds', 'Время окончания последнего запуска.'))
+        self.run_duration = register(Gauge('partner_parser_last_run_duration_seconds', 'Длительность последнего запуска.'))
+        self.requests = register(Counter('partner_parser_requests_total', 'HTTP-запросы к API партнёров.'))
+        self.bytes = register(Counter('partner_parser_response_bytes_total', 'Скачанные байты ответов партнёров.'))
+        self.rows = register(Counter('partner_parser_rows_total', 'Строки PartnerData, разобранные из ответов.'))
+        self.errors = register(Counter(
+            'partner_parser_errors_total', 'Ошибки обработки URL (partner="insert" — вставки) по типу исключения.'))
+        self.retries = register(Counter('partner_parser_retries_total', 'Повторы запросов после временных ошибок.'))
+        self.hedges = register(Counter('partner_parser_hedged_requests_total', 'Дублирующие запросы, запущенные хеджированием.'))
+        self.failures = register(Counter('partner_parser_partner_failures_total', 'Запуски, в которых партнёр загрузился не целиком.'))
+        self.request_duration = register(Histogram(
+            'partner_parser_request_duration_seconds', 'Время запроса от отправки до конца тела.', LATENCY_BUCKETS))
+        self.ttfb = register(Histogram(
+            'partner_parser_ttfb_seconds', 'Время до первого байта ответа.', LATENCY_BUCKETS))
+        self.parse_duration = register(Histogram(
+            'partner_parser_parse_duration_seconds', 'Время разбора ответа.', LATENCY_BUCKETS))
+        self.auth_duration = register(Counter('partner_parser_auth_seconds_total', 'Время авторизации партнёра.'))
+        self.insert_batches = register(Histogram(
+            'partner_parser_insert_batch_rows', 'Размер пачек вставки в строках.', BATCH_ROWS_BUCKETS))
+        self.insert_duration = register(Counter('partner_parser_insert_seconds_total', 'Время вставки в базу.'))
+        self.insert_skipped = register(Counter(
+            'partner_parser_insert_skipped_rows_total', 'Строки, не вставленные повторно: итоги не изменились.'))
+        self.insert_spooled = register(Counter(
+            'partner_parser_insert_spooled_rows_total', 'Строки, оставшиеся в спуле из-за сбоя вставки.'))
+        self.insert_replayed = register(Counter(
+            'partner_parser_insert_replayed_rows_total', 'Строки, досланные из спула прошлых запусков.'))
+
+    def observe_run(self, report: Dict[str, Any]) -> None:
+        with self.registry.lock:
+            self.runs.inc()
+            self.last_run.set(time.time())
+            self.run_duration.set(report['total_seconds'])
+            for partner_id, partner in report['partners'].items():
+                self.auth_duration.inc(partner['auth_seconds'], partner=partner_id)
+                if partner['failed']:
+                    self.failures.inc(partner=partner_id)
+                for url in partner['urls']:
+                    self.requests.inc(url['requests'], partner=partner_id)
+                    self.bytes.inc(url['bytes'], partner=partner_id)
+                    self.rows.inc(url['rows'], partner=partner_id)
+                    self.retries.inc(url['retries'], partner=partner_id)
+                    self.hedges.inc(url['hedges'], partner=partner_id)
+                    for error_type, count in url['error_types'].items():
+                        self.errors.inc(count, partner=partner_id, type=error_type)
+                    if url['requests']:
+                        # склеенные запросы одного URL копятся в одной записи — берём среднее
+                        self.request_duration.observe(url['fetch_seconds'] / url['requests'], partner=partner_id)
+                        self.ttfb.observe(url['ttfb_seconds'] / url['requests'], partner=partner_id)
+                        self.parse_duration.observe(url['parse_seconds'] / url['requests'], partner=partner_id)
+            for batch_rows in report['insert']['batch_rows']:
+                self.insert_batches.observe(batch_rows)
+            for error_type, count in report['insert']['error_types'].items():
+                self.errors.inc(count, partner='insert', type=error_type)
+            self.insert_duration.inc(report['insert']['seconds'])
+            self.insert_skipped.inc(report['insert']['skipped_rows'])
+            self.insert_spooled.inc(report['insert']['spooled_rows'])
+            self.insert_replayed.inc(report['insert']['replayed_rows'])
+
+    def render(self) -> str:
+        return self.registry.render()
+
+    def write_textfile(self, path: str) -> None:
+        """Атомарно пишет метрики в файл для textfile collector node_exporter."""
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as file:
+                file.write(self.render())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+def start_http_server(metrics: ParserMetrics, port: int, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+    """Поднимает в фоновом потоке эндпоинт /metrics."""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = metrics.render().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+_parser_metrics: Optional[ParserMetrics] = None
+_http_server: Optional[ThreadingHTTPServer] = None
+
+
+def worker_slot() -> int:
+    """Слот воркера на хосте: PROMETHEUS_CONFIG['worker'] или PARTNER_PARSER_WORKER, по умолчанию 0."""
+    worker = PROMETHEUS_CONFIG['worker']
+    if worker is None:
+        worker = os.environ.get('PARTNER_PARSER_WORKER', 0)
+    return int(worker)
+
+
+def default_parser_metrics() -> ParserMetrics:
+    """Метрики процесса с меткой worker; при заданном PROMETHEUS_CONFIG['port'] заодно поднимает эндпоинт.
+
+    Эндпоинт слушает port + слот воркера, поэтому воркеры одного хоста не делят порт.
+    Если порт занят, метрики копятся без эндпоинта: запуск из-за этого не падает.
+    """
+    global _parser_metrics, _http_server
+    if _parser_metrics is None:
+        worker = worker_slot()
+        _parser_metrics = ParserMetrics({'worker': str(worker)})
+        if PROMETHEUS_CONFIG['port'] is not None:
+            port = PROMETHEUS_CONFIG['port'] + worker
+            try:
+                _http_server = start_http_server(_parser_metrics, port, PROMETHEUS_CONFIG['host'])
+            except OSError as e:
+                logger.error('cannot serve /metrics on %s:%s: %s', PROMETHEUS_CONFIG['host'], port, e)
+    return _parser_metrics
+
+
+def export_run(report: Dict[str, Any]) -> None:
+    """Добавляет отчёт запуска в метрики процесса и обновляет textfile воркера, если он настроен."""
+    metrics = default_parser_metrics()
+    metrics.observe_run(report)
+    if PROMETHEUS_CONFIG['textfile_path']:
+        metrics.write_textfile(PROMETHEUS_CONFIG['textfile_path'].format(worker=worker_slot()))
@@ -0,0 +1,53 @@
+import asyncio
+import time
+from typing import Dict, Tuple
+
+
+class TokenBucket:
+    """Асинхронный token bucket: rate запросов в секунду с запасом burst.
+
+    acquire() ждёт ровно столько, сколько нужно до появления токена, поэтому партнёр
+    идёт с максимально разрешённой скоростью, но не быстрее.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        """Забирает один токен, при необходимости дожидаясь его.
+
+        Токен резервируется сразу (баланс может уйти в минус), а ожидание равно
+        времени до его появления. Блокировка не нужна, поэтому bucket можно
+        использовать из разных event loop'ов одного процесса.
+        """
+        self._refill()
+        self._tokens -= 1
+        if self._tokens < 0:
+            await asyncio.sleep(-self._tokens / self.rate)
+
+    def try_acquire(self) -> bool:
+        """Забирает токен без ожидания; False, если токена сейчас нет."""
+        self._refill()
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+
+_buckets: Dict[Tuple[str, float, int], TokenBucket] = {}
+
+
+def get_bucket(partner_id: str, rate: float, burst: int) -> TokenBucket:
+    """Возвращает общий на процесс bucket партнёра, чтобы квота не множилась между запусками."""
+    key = (partner_id, rate, burst)
+    if key not in _buckets:
+        _buckets[key] = TokenBucket(rate, burst)
+    return _buckets[key]
@@ -0,0 +1,87 @@
+import datetime
+import json
+import os
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from legacy.aggregation import aggregate
+from legacy.partner_data.batch import PartnerBatch
+from legacy.partner_data.data import PartnerData
+
+
+def as_day(value) -> datetime.date:
+    """Приводит дату запуска (date, datetime или pd.Timestamp) к datetime.date."""
+    return pd.Timestamp(value).date()
+
+
+class ResultCache:
+    """Кэш агрегированных PartnerData по (партнёр, день) для закрытых дней.
+
+    После окна финализации (finalization_lag партнёра) цифры за день больше не меняются,
+    поэтому их можно не запрашивать повторно. Каждый день партнёра хранится отдельным
+    JSON-файлом; пустой список тоже сохраняется — это значит «день закрыт, данных нет».
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, partner_id: str, day: datetime.date) -> str:
+        return os.path.join(self.root, partner_id, f'{day.isoformat()}.json')
+
+    def get(self, partner_id: str, day: datetime.date) -> Optional[PartnerBatch]:
+        """Строки партнёра за день или None, если день не закэширован."""
+        try:
+            with open(self._path(partner_id, day)) as file:
+                rows = json.load(file)
+        except FileNotFoundError:
+            return None
+        return PartnerBatch.from_rows(PartnerData(**row) for row in rows)
+
+    def put(self, partner_id: str, day: datetime.date, rows: Iterable[PartnerData]) -> None:
+        path = self._path(partner_id, day)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        payload = [
+            {'date': day.isoformat(), 'dsp_id': row.dsp_id, 'ssp': row.ssp,
+             'imps': row.imps, 'spent': row.spent, 'currency': row.currency}
+            for row in aggregate(rows)
+        ]
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as file:
+            json.dump(payload, file)
+        os.replace(tmp_path, path)
+
+
+def finalized_until(finalization_lag: int, today: Optional[datetime.date] = None) -> datetime.date:
+    """Последний закрытый день: сегодня минус finalization_lag дней."""
+    return (today or datetime.date.today()) - datetime.timedelta(days=finalization_lag)
+
+
+def read_finalized_prefix(cache: ResultCache, partner, start_date, finish_date):
+    """Читает из кэша закрытые дни с начала периода подряд.
+
+    Возвращает строки из кэша и первый день, который нужно загрузить. Загрузка всегда
+    идёт одним непрерывным диапазоном, поэтому пропускаются только дни в начале периода.
+    """
+    day = as_day(start_date)
+    last_day = min(as_day(finish_date), finalized_until(partner.finalization_lag))
+    batches = []
+    while day <= last_day:
+        cached = cache.get(partner.id, day)
+        if cached is None:
+            break
+        batches.append(cached)
+        day += datetime.timedelta(days=1)
+    return PartnerBatch.concat(batches), day
+
+
+def store_finalized_days(cache: ResultCache, partner, start_date, finish_date, rows: Iterable[PartnerData]) -> None:
+    """Сохраняет в кэш загруженные строки за закрытые дни периода, включая дни без данных."""
+    last_day = min(as_day(finish_date), finalized_until(partner.finalization_lag))
+    batch = PartnerBatch.from_rows(rows)
+    days = batch.date.astype('datetime64[D]')
+    day = as_day(start_date)
+    while day <= last_day:
+        cache.put(partner.id, day, batch[days == np.datetime64(day, 'D')])
+        day += datetime.timedelta(days=1)
@@ -0,0 +1,55 @@
+import asyncio
+import random
+from typing import Awaitable, Callable, Optional, Sequence, TypeVar
+
+import httpx
+
+from legacy.config import RETRY_CONFIG
+
+T = TypeVar('T')
+
+
+def is_retryable(error: BaseException, retry_statuses: Sequence[int] = RETRY_CONFIG['retry_statuses']) -> bool:
+    """Сетевые ошибки и таймауты повторяем всегда, ответы — только с retry_statuses."""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in retry_statuses
+    return isinstance(error, httpx.TransportError)
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Retry-After в секундах из ответа партнёра, если он его прислал."""
+    if not isinstance(error, httpx.HTTPStatusError):
+        return None
+    try:
+        return float(error.response.headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, base: float, cap: float, rng: random.Random = random) -> float:
+    """Экспоненциальная задержка с полным джиттером: случайно от 0 до min(cap, base * 2**attempt)."""
+    return rng.uniform(0, min(cap, base * 2 ** attempt))
+
+
+async def retry_async(func: Callable[[], Awaitable[T]], max_attempts: Optional[int] = None,
+                      backoff_base: Optional[float] = None, backoff_max: Optional[float] = None,
+                      retry_statuses: Optional[Sequence[int]] = None,
+                      on_retry: Optional[Callable[[BaseException], None]] = None) -> T:
+    """Вызывает func, повторяя её при временных ошибках с экспоненциальной задержкой.
+
+    Ошибка последней попытки (или неповторяемая ошибка) пробрасывается как есть.
+    """
+    max_attempts = max_attempts or RETRY_CONFIG['max_attempts']
+    backoff_base = RETRY_CONFIG['backoff_base'] if backoff_base is None else backoff_base
+    backoff_max = RETRY_CONFIG['backoff_max'] if backoff_max is None else backoff_max
+    retry_statuses = RETRY_CONFIG['retry_statuses'] if retry_statuses is None else retry_statuses
+    for attempt in range(max_attempts):
+        try:
+            return await func()
+        except Exception as e:
+            if attempt + 1 >= max_attempts or not is_retryable(e, retry_statuses):
+                raise
+            if on_retry is not None:
+                on_retry(e)
+            delay = backoff_delay(attempt, backoff_base, backoff_max)
+            await asyncio.sleep(min(backoff_max, max(delay, retry_after(e) or 0)))
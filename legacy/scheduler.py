@@ -0,0 +1,117 @@
+import asyncio
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+from legacy.config import SCHEDULER_CONFIG
+
+
+@dataclass
+class PartnerWaits:
+    requests: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+
+class SlotStats:
+    """Счётчики ожидания слотов: глубина очереди и время ожидания по партнёрам.
+
+    Хранятся только суммы и максимумы, поэтому объём не растёт с числом запросов.
+    """
+
+    def __init__(self):
+        self.max_waiting = 0
+        self.partners: Dict[str, PartnerWaits] = {}
+
+    def observe_queue(self, waiting: int) -> None:
+        self.max_waiting = max(self.max_waiting, waiting)
+
+    def observe_wait(self, partner_id: str, seconds: float) -> None:
+        waits = self.partners.setdefault(partner_id, PartnerWaits())
+        waits.requests += 1
+        waits.total_wait += seconds
+        waits.max_wait = max(waits.max_wait, seconds)
+
+    def report(self) -> Dict:
+        return {
+            'max_waiting': self.max_waiting,
+            'partners': {partner_id: asdict(waits) for partner_id, waits in self.partners.items()},
+        }
+
+
+class FetchScheduler:
+    """Ограничивает одновременные запросы запуска: глобально, на партнёра и на хост.
+
+    Лимиты партнёра берутся из его полей max_concurrency и max_concurrency_per_host,
+    глобальный лимит и лимит хоста по умолчанию — из SCHEDULER_CONFIG. Слоты берутся
+    всегда в одном порядке (партнёр → хост → глобальный), поэтому взаимных блокировок нет.
+    """
+
+    def __init__(self, max_in_flight: Optional[int] = None, max_per_host: Optional[int] = None):
+        self.max_in_flight = max_in_flight or SCHEDULER_CONFIG['max_in_flight']
+        self.max_per_host = max_per_host or SCHEDULER_CONFIG['max_per_host']
+        self._global = asyncio.Semaphore(self.max_in_flight)
+        self._partners: Dict[str, asyncio.Semaphore] = {}
+        self._hosts: Dict[str, asyncio.Semaphore] = {}
+        self.waiting = 0
+        self.in_flight = 0
+        # за всё время жизни планировщика (у ParserSession — за все задания сессии)
+        self.totals = SlotStats()
+
+    def _semaphores(self, partner, url) -> List[asyncio.Semaphore]:
+        semaphores = []
+        if partner.max_concurrency:
+            if partner.id not in self._partners:
+                self._partners[partner.id] = asyncio.Semaphore(partner.max_concurrency)
+            semaphores.append(self._partners[partner.id])
+        host_limit = partner.max_concurrency_per_host or self.max_per_host
+        if host_limit:
+            host = urlsplit(url).netloc
+            if host not in self._hosts:
+                self._hosts[host] = asyncio.Semaphore(host_limit)
+            semaphores.append(self._hosts[host])
+        semaphores.append(self._global)
+        return semaphores
+
+    @asynccontextmanager
+    async def slot(self, partner, url, run_stats: Optional[SlotStats] = None):
+        """Ждёт свободный слот для запроса партнёра к url; ожидание пишется и в run_stats запуска."""
+        loop = asyncio.get_running_loop()
+        acquired = []
+        started = loop.time()
+        self.waiting += 1
+        recorders = [self.totals] if run_stats is None else [self.totals, run_stats]
+        for stats in recorders:
+            stats.observe_queue(self.waiting)
+        try:
+            for semaphore in self._semaphores(partner, url):
+                await semaphore.acquire()
+                acquired.append(semaphore)
+        except BaseException:
+            for semaphore in reversed(acquired):
+                semaphore.release()
+            raise
+        finally:
+            self.waiting -= 1
+        waited = loop.time() - started
+        for stats in recorders:
+            stats.observe_wait(partner.id, waited)
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            for semaphore in reversed(acquired):
+                semaphore.release()
+
+    def stats(self, run_stats: Optional[SlotStats] = None) -> Dict:
+        """Глубина очереди и время ожидания слота по партнёрам — для подбора лимитов.
+
+        С run_stats — максимум очереди и ожидания одного запуска, без него — за всё время.
+        """
+        return {
+            'waiting': self.waiting,
+            'in_flight': self.in_flight,
+            **(run_stats or self.totals).report(),
+        }
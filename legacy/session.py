@@ -0,0 +1,38 @@
+from typing import Dict, Optional
+
+import httpx
+
+from legacy.config import INSERT_SNAPSHOT_CONFIG
+from legacy.http_client import HttpClientManager
+from legacy.insert_snapshot import InsertSnapshot
+from legacy.scheduler import FetchScheduler
+
+
+class ParserSession:
+    """Общие ресурсы для многих запусков парсера в одном event loop.
+
+    Долгоживущий async-сервис открывает сессию один раз и передаёт её в
+    aload_insert_data: все задания идут через один пул соединений httpx (keep-alive
+    между заданиями) и один FetchScheduler (лимиты одновременных запросов на хост
+    и глобально — общие, а не на каждое задание). Снимок вставленных итогов тоже
+    один на сессию. Кэш токенов (default_token_store), bucket'ы rate limit (get_bucket)
+    и SingleFlight и так общие на процесс.
+    """
+
+    def __init__(self, config: Optional[Dict] = None, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self._http = HttpClientManager(config, transport)
+        self.client: Optional[httpx.AsyncClient] = None
+        self.scheduler = FetchScheduler()
+        self.insert_snapshot: Optional[InsertSnapshot] = None
+        if INSERT_SNAPSHOT_CONFIG['path']:
+            self.insert_snapshot = InsertSnapshot(INSERT_SNAPSHOT_CONFIG['path'], INSERT_SNAPSHOT_CONFIG['retention_days'])
+
+    async def __aenter__(self) -> 'ParserSession':
+        self.client = await self._http.__aenter__()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        try:
+            await self._http.__aexit__(exc_type, exc, tb)
+        finally:
+            self.client = None
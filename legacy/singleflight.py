@@ -0,0 +1,50 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """Склеивает одинаковые одновременные запросы в один.
+
+    Первый вызов do() с ключом запускает func в отдельной задаче, остальные вызовы
+    с тем же ключом, пришедшие до её завершения, ждут ту же задачу и получают тот же
+    результат (или то же исключение). Отмена одного из ожидающих не отменяет запрос
+    для остальных; когда отменены все ожидающие, запрос отменяется. Ключи разведены
+    по event loop, так как задачи к нему привязаны.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Tuple[int, Hashable], asyncio.Task] = {}
+        self._waiters: Dict[asyncio.Task, int] = {}
+        self.calls = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable]):
+        loop_key = (id(asyncio.get_running_loop()), key)
+        task = self._calls.get(loop_key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(func())
+            self._calls[loop_key] = task
+            task.add_done_callback(lambda _: self._calls.pop(loop_key, None))
+        else:
+            self.shared += 1
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._waiters[task] == 1:
+                # больше никто не ждёт результат — не оставляем запрос висеть в фоне
+                task.cancel()
+            raise
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+
+
+_default_single_flight = SingleFlight()
+
+
+def default_single_flight() -> SingleFlight:
+    """Общий на процесс SingleFlight: склеивает запросы и между параллельными заданиями."""
+    return _default_single_flight
@@ -0,0 +1,246 @@
+from abc import ABC, abstractmethod
+from contextlib import ExitStack
+import logging
+import os
+import shutil
+import tempfile
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from legacy.clickhouse import ClickHouseWriter
+from legacy.config import SINKS_CONFIG
+from legacy.context import RunContext
+from legacy.insert_snapshot import delta_insert
+from legacy.metrics import RunMetrics
+from legacy.partner_data.batch import PartnerBatch
+from legacy.spool import InsertSpool, SpooledInsert
+
+logger = logging.getLogger(__name__)
+
+FILE_FORMATS = {'parquet': '.parquet', 'arrow': '.arrow'}
+
+
+class Sink(ABC):
+    """Приёмник агрегированных данных запуска.
+
+    open() и close() вызываются один раз на запуск, write() — для каждой пачки
+    BatchInserter, по очереди и в отдельном от event loop потоке. Если запуск
+    упал, вместо close() вызывается abort().
+    """
+
+    def open(self) -> None:
+        pass
+
+    @abstractmethod
+    def write(self, batch: PartnerBatch) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def abort(self) -> None:
+        """Закрывает приёмник после ошибки запуска; по умолчанию — как close()."""
+        self.close()
+
+    def __enter__(self) -> 'Sink':
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def replay_spool(spool: InsertSpool, insert_func: Callable[[PartnerBatch], None], metrics: RunMetrics) -> None:
+    """Досылает пачки из спула прошлых запусков; при ошибке базы они остаются там до следующего раза."""
+    def insert(batch):
+        insert_func(batch)
+        metrics.replay_insert_rows(len(batch))
+
+    try:
+        spool.drain(insert)
+    except Exception as e:
+        logger.error('spool replay failed, will retry on the next run: %s', e)
+
+
+class InsertSink(Sink):
+    """Вставка в базу: ClickHouseWriter на весь запуск или переданная insert_func.
+
+    Вокруг вставки — замеры context.metrics, спул context.spool (при открытии из него
+    досылаются пачки прошлых запусков, см. SpooledInsert) и запись только изменившихся
+    строк по context.insert_snapshot.
+    """
+
+    def __init__(self, insert_func: Optional[Callable[[PartnerBatch], None]] = None, context: Optional[RunContext] = None):
+        self._insert_func = insert_func
+        self.context = context or RunContext()
+        self._stack: Optional[ExitStack] = None
+        self._spooled: Optional[SpooledInsert] = None
+        self._write: Optional[Callable[[PartnerBatch], None]] = None
+
+    def open(self) -> None:
+        context = self.context
+        self._stack = ExitStack()
+        try:
+            insert_func = self._insert_func
+            if insert_func is None:
+                insert_func = self._stack.enter_context(ClickHouseWriter()).insert
+            insert_func = context.metrics.timed_insert(insert_func)
+            if context.spool is not None:
+                self._stack.enter_context(context.spool)
+                replay_spool(context.spool, insert_func, context.metrics)
+                insert_func = self._spooled = SpooledInsert(context.spool, insert_func, context.metrics.spool_insert_rows)
+            if context.insert_snapshot is not None:
+                insert_func = delta_insert(context.insert_snapshot, insert_func, context.metrics.skip_insert_rows)
+        except BaseException:
+            self._stack.close()
+            raise
+        self._write = insert_func
+
+    def write(self, batch: PartnerBatch) -> None:
+        self._write(batch)
+
+    def close(self) -> None:
+        if self._spooled is not None and self._spooled.error is not None:
+            self.context.metrics.insert.record_error(self._spooled.error)
+        self._stack.close()
+
+
+def _move(source: str, destination: str) -> None:
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    os.replace(source, destination)
+
+
+def partner_keys(batch: PartnerBatch) -> np.ndarray:
+    """Идентификатор партнёра строки: ssp для SSP, dsp_id строкой для DSP."""
+    return np.where(batch.ssp != '', batch.ssp, batch.dsp_id.astype(str).astype(object))
+
+
+class FileSink(Sink):
+    """Колоночные файлы Parquet или Arrow IPC, разбитые по дню и партнёру.
+
+    Строки копятся по разделам day=ГГГГ-ММ-ДД/partner=<id>; как только в буферах
+    набирается row_group_rows строк, каждый раздел дописывается отдельным файлом
+    part-NNNNN, который сразу закрывается. Так в памяти не больше row_group_rows строк
+    (плюс последняя пачка), а открыт не больше одного файла. Файлы пишутся во временный
+    каталог .staging-* в root и при close() заменяют разделы целиком, поэтому повторный
+    запуск за тот же период перезаписывает разделы, а не дублирует их. При ошибке
+    запуска (abort) временный каталог удаляется, а прежние разделы остаются как были.
+    Нужен pyarrow; он импортируется только при открытии приёмника.
+    """
+
+    def __init__(self, root: str, file_format: Optional[str] = None, row_group_rows: Optional[int] = None):
+        self.root = root
+        self.file_format = file_format or SINKS_CONFIG['file_format']
+        if self.file_format not in FILE_FORMATS:
+            raise ValueError(f'unknown file format {self.file_format!r}, expected one of {list(FILE_FORMATS)}')
+        self.row_group_rows = row_group_rows or SINKS_CONFIG['row_group_rows']
+        self._buffers: Dict[Tuple[str, str], List[PartnerBatch]] = {}
+        self._buffered_rows = 0
+        # сколько файлов уже записано в раздел за этот запуск
+        self._parts: Dict[Tuple[str, str], int] = {}
+        self._staging: Optional[str] = None
+        self.written_rows = 0
+
+    def open(self) -> None:
+        try:
+            import pyarrow
+        except ImportError as e:
+            raise ImportError('FileSink requires pyarrow: pip install pyarrow') from e
+        self._pa = pyarrow
+        self._schema = pyarrow.schema([
+            ('date', pyarrow.date32()), ('dsp_id', pyarrow.int64()), ('ssp', pyarrow.string()),
+            ('imps', pyarrow.int64()), ('spent', pyarrow.float64()), ('currency', pyarrow.string()),
+        ])
+        os.makedirs(self.root, exist_ok=True)
+        self._staging = tempfile.mkdtemp(prefix='.staging-', dir=self.root)
+
+    def partition_dir(self, day: str, partner: str, root: Optional[str] = None) -> str:
+        return os.path.join(root or self.root, f'day={day}', f'partner={partner}')
+
+    def write(self, batch: PartnerBatch) -> None:
+        days = batch.date.astype('datetime64[D]').astype(str)
+        frame = pd.DataFrame({'day': days, 'partner': partner_keys(batch)})
+        for key, index in frame.groupby(['day', 'partner'], sort=False).indices.items():
+            self._buffers.setdefault(key, []).append(batch[index])
+        self._buffered_rows += len(batch)
+        if self._buffered_rows >= self.row_group_rows:
+            self._flush()
+
+    def _flush(self) -> None:
+        for key in list(self._buffers):
+            self._write_part(key, PartnerBatch.concat(self._buffers.pop(key)))
+        self._buffered_rows = 0
+
+    def _write_part(self, key: Tuple[str, str], rows: PartnerBatch) -> None:
+        if not len(rows):
+            return
+        part = self._parts.get(key, 0)
+        directory = self.partition_dir(*key, root=self._staging)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'part-{part:05d}{FILE_FORMATS[self.file_format]}')
+        table = self._table(rows)
+        if self.file_format == 'parquet':
+            import pyarrow.parquet
+            pyarrow.parquet.write_table(table, path, row_group_size=self.row_group_rows, compression='zstd')
+        else:
+            import pyarrow.ipc
+            with pyarrow.ipc.new_file(path, self._schema) as writer:
+                writer.write_table(table, max_chunksize=self.row_group_rows)
+        self._parts[key] = part + 1
+        self.written_rows += len(rows)
+
+    def _table(self, batch: PartnerBatch):
+        pa = self._pa
+        return pa.Table.from_arrays([
+            pa.array(batch.date.astype('datetime64[D]'), pa.date32()),
+            pa.array(batch.dsp_id, pa.int64()),
+            pa.array(batch.ssp, pa.string()),
+            pa.array(batch.imps, pa.int64()),
+            pa.array(batch.spent, pa.float64()),
+            pa.array(batch.currency, pa.string()),
+        ], schema=self._schema)
+
+    def close(self) -> None:
+        try:
+            self._flush()
+            replaced = os.path.join(self._staging, 'replaced')
+            for key in self._parts:
+                target = self.partition_dir(*key)
+                if os.path.exists(target):
+                    _move(target, self.partition_dir(*key, root=replaced))
+                _move(self.partition_dir(*key, root=self._staging), target)
+        finally:
+            self.abort()
+
+    def abort(self) -> None:
+        self._buffers = {}
+        self._buffered_rows = 0
+        self._parts = {}
+        if self._staging is not None:
+            shutil.rmtree(self._staging, ignore_errors=True)
+            self._staging = None
+
+
+def default_sinks(insert_func: Optional[Callable[[PartnerBatch], None]] = None,
+                  context: Optional[RunContext] = None) -> List[Sink]:
+    """Приёмники по SINKS_CONFIG: база (или insert_func вместо неё) и, если задан file_path, файлы."""
+    sinks: List[Sink] = []
+    if insert_func is not None or SINKS_CONFIG['database']:
+        sinks.append(InsertSink(insert_func, context))
+    if SINKS_CONFIG['file_path']:
+        sinks.append(FileSink(SINKS_CONFIG['file_path']))
+    return sinks
+
+
+def write_all(sinks: List[Sink]) -> Callable[[PartnerBatch], None]:
+    """Функция вставки для BatchInserter: отдаёт пачку каждому приёмнику по очереди."""
+    def write(rows):
+        batch = PartnerBatch.from_rows(rows)
+        for sink in sinks:
+            sink.write(batch)
+    return write
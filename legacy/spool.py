@@ -0,0 +1,201 @@
+import argparse
+import fcntl
+import glob
+import logging
+import os
+import struct
+import time
+import zlib
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+from legacy.clickhouse import ClickHouseWriter, encode_native, native_to_batch
+from legacy.config import SPOOL_CONFIG
+from legacy.partner_data.batch import PartnerBatch
+
+logger = logging.getLogger(__name__)
+
+# запись сегмента: метка, вид (B — пачка, A — подтверждение), id пачки, длина и crc32 данных
+_HEADER = struct.Struct('<2scQII')
+_MAGIC = b'SP'
+_BATCH = b'B'
+_ACK = b'A'
+SEGMENT_SUFFIX = '.spool'
+
+
+class SpoolSegment:
+    """Один файл спула: только дописывается, записи — сжатые блоки Native и подтверждения."""
+
+    def __init__(self, path: str, fsync: bool = True):
+        self.path = path
+        self.fsync = fsync
+        self._file = open(path, 'ab+')
+
+    def lock(self, blocking: bool = True) -> bool:
+        """Берёт flock на сегмент; без blocking возвращает False, если сегмент занят другим процессом."""
+        try:
+            fcntl.flock(self._file, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            return False
+        return True
+
+    def close(self) -> None:
+        self._file.close()
+
+    def _append(self, kind: bytes, batch_id: int, payload: bytes = b'') -> None:
+        self._file.write(_HEADER.pack(_MAGIC, kind, batch_id, len(payload), zlib.crc32(payload)) + payload)
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def append_batch(self, batch_id: int, batch: PartnerBatch, compress_level: int) -> None:
+        self._append(_BATCH, batch_id, zlib.compress(encode_native(batch), compress_level))
+
+    def ack(self, batch_id: int) -> None:
+        self._append(_ACK, batch_id)
+
+    def records(self) -> Iterator[Tuple[bytes, int, bytes]]:
+        """Читает записи по порядку; недописанный хвост (падение во время записи) пропускается."""
+        self._file.seek(0)
+        data = self._file.read()
+        offset = 0
+        while offset + _HEADER.size <= len(data):
+            magic, kind, batch_id, length, crc = _HEADER.unpack_from(data, offset)
+            payload = data[offset + _HEADER.size:offset + _HEADER.size + length]
+            if magic != _MAGIC or len(payload) != length or zlib.crc32(payload) != crc:
+                logger.warning('spool %s: broken record at offset %d, ignoring the rest', self.path, offset)
+                return
+            yield kind, batch_id, payload
+            offset += _HEADER.size + length
+
+    def pending(self) -> Dict[int, bytes]:
+        """Неподтверждённые пачки сегмента: id → сжатый блок Native."""
+        pending = {}
+        for kind, batch_id, payload in self.records():
+            if kind == _BATCH:
+                pending[batch_id] = payload
+            else:
+                pending.pop(batch_id, None)
+        return pending
+
+
+class InsertSpool:
+    """Локальный спул пачек вставки, которые ещё не подтверждены базой.
+
+    Пачка пишется в сегмент текущего процесса до отправки и подтверждается после
+    успешной вставки; если база недоступна, она остаётся в спуле и досылается
+    drain() в следующем запуске. Каждый процесс пишет свой сегмент и держит на нём
+    flock, поэтому drain() пропускает сегменты живых воркеров. Полностью подтверждённые
+    сегменты удаляются.
+    """
+
+    def __init__(self, directory: str, fsync: Optional[bool] = None, compress_level: Optional[int] = None):
+        self.directory = directory
+        self.fsync = SPOOL_CONFIG['fsync'] if fsync is None else fsync
+        self.compress_level = SPOOL_CONFIG['compress_level'] if compress_level is None else compress_level
+        self._segment: Optional[SpoolSegment] = None
+        self._next_id = 0
+        self._pending = 0
+
+    def __enter__(self) -> 'InsertSpool':
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f'{time.time_ns()}-{os.getpid()}{SEGMENT_SUFFIX}')
+        self._segment = SpoolSegment(path, self.fsync)
+        self._segment.lock()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        segment, self._segment = self._segment, None
+        segment.close()
+        if not self._pending:
+            os.remove(segment.path)
+
+    def append(self, batch: PartnerBatch) -> int:
+        """Сохраняет пачку до отправки и возвращает её id для ack()."""
+        batch_id = self._next_id
+        self._next_id += 1
+        self._segment.append_batch(batch_id, batch, self.compress_level)
+        self._pending += 1
+        return batch_id
+
+    def ack(self, batch_id: int) -> None:
+        self._segment.ack(batch_id)
+        self._pending -= 1
+
+    def _segment_paths(self):
+        own = self._segment.path if self._segment is not None else None
+        return [path for path in sorted(glob.glob(os.path.join(self.directory, f'*{SEGMENT_SUFFIX}'))) if path != own]
+
+    def drain(self, insert_func: Callable[[PartnerBatch], None]) -> int:
+        """Досылает неподтверждённые пачки из сегментов прошлых запусков и возвращает число строк.
+
+        Ошибка вставки пробрасывается; уже досланные пачки подтверждены, остальные ждут следующего раза.
+        """
+        rows = 0
+        for path in self._segment_paths():
+            segment = SpoolSegment(path, self.fsync)
+            try:
+                if not segment.lock(blocking=False):
+                    continue
+                for batch_id, payload in sorted(segment.pending().items()):
+                    batch = native_to_batch(zlib.decompress(payload))
+                    insert_func(batch)
+                    segment.ack(batch_id)
+                    rows += len(batch)
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    # сегмент уже дослал и удалил другой процесс
+                    pass
+            finally:
+                segment.close()
+        return rows
+
+
+class SpooledInsert:
+    """Вставка через спул: пачка сохраняется, отправляется и подтверждается.
+
+    Если отправка упала, пачка остаётся в спуле, а все следующие пачки запуска
+    только сохраняются, без новых попыток: загрузка партнёров не ждёт таймаутов
+    недоступной базы, и данные не теряются.
+    """
+
+    def __init__(self, spool: InsertSpool, insert_func: Callable[[PartnerBatch], None],
+                 on_spooled: Optional[Callable[[int], None]] = None):
+        self.spool = spool
+        self._insert_func = insert_func
+        self._on_spooled = on_spooled
+        self.error: Optional[BaseException] = None
+
+    def __call__(self, rows) -> None:
+        batch = PartnerBatch.from_rows(rows)
+        batch_id = self.spool.append(batch)
+        if self.error is None:
+            try:
+                self._insert_func(batch)
+            except Exception as e:
+                logger.error('insert failed, keeping batches in spool %s: %s', self.spool.directory, e)
+                self.error = e
+            else:
+                self.spool.ack(batch_id)
+                return
+        if self._on_spooled is not None:
+            self._on_spooled(len(batch))
+
+
+def replay(directory: Optional[str] = None) -> int:
+    """Досылает спул в ClickHouse вне обычного запуска и возвращает число строк."""
+    with ClickHouseWriter() as writer, InsertSpool(directory or SPOOL_CONFIG['path']) as spool:
+        return spool.drain(writer.insert)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Досылает в ClickHouse пачки, оставшиеся в спуле вставки.')
+    arg_parser.add_argument('--path', help="каталог спула; по умолчанию SPOOL_CONFIG['path']")
+    args = arg_parser.parse_args()
+    if not (args.path or SPOOL_CONFIG['path']):
+        arg_parser.error("spool path is not configured")
+    print(f'replayed {replay(args.path)} rows')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+from contextlib import contextmanager
+import fcntl
+import json
+import os
+import time
+from typing import Dict, Optional
+
+from legacy.config import TOKEN_STORE_CONFIG
+
+
+class TokenStore:
+    """Кэш токенов авторизации партнёров в памяти процесса.
+
+    Токен считается живым до expires_at минус expiry_margin; токены без срока
+    действия живут, пока партнёр не ответит 401.
+    """
+
+    def __init__(self, expiry_margin: Optional[float] = None):
+        self.expiry_margin = TOKEN_STORE_CONFIG['expiry_margin'] if expiry_margin is None else expiry_margin
+        self._tokens: Dict[str, Dict] = {}
+
+    def _is_alive(self, entry: Optional[Dict]) -> bool:
+        if entry is None:
+            return False
+        return entry['expires_at'] is None or time.time() < entry['expires_at'] - self.expiry_margin
+
+    @staticmethod
+    def _entry(token: str, expires_in: Optional[float]) -> Dict:
+        expires_at = time.time() + float(expires_in) if expires_in else None
+        return {'token': token, 'expires_at': expires_at}
+
+    def get(self, partner_id: str) -> Optional[str]:
+        """Возвращает живой токен партнёра или None."""
+        entry = self._tokens.get(partner_id)
+        return entry['token'] if self._is_alive(entry) else None
+
+    def set(self, partner_id: str, token: str, expires_in: Optional[float] = None) -> None:
+        """Сохраняет токен; expires_in — срок жизни в секундах из ответа партнёра."""
+        self._tokens[partner_id] = self._entry(token, expires_in)
+
+    def invalidate(self, partner_id: str) -> None:
+        """Забывает токен партнёра (например, после 401)."""
+        self._tokens.pop(partner_id, None)
+
+    def clear(self) -> None:
+        self._tokens.clear()
+
+
+def _open_private(path: str, flags: int) -> int:
+    """Открывает файл с правами только для владельца, даже если он уже был создан с другими."""
+    fd = os.open(path, flags, 0o600)
+    os.fchmod(fd, 0o600)
+    return fd
+
+
+class FileTokenStore(TokenStore):
+    """Кэш токенов в JSON-файле, общий для нескольких процессов-воркеров.
+
+    Доступ сериализуется flock на соседнем .lock файле, запись атомарна (os.replace).
+    Найденные в файле токены дополнительно кэшируются в памяти процесса. Файлы
+    создаются с правами 0o600: токены читает только владелец процесса.
+    """
+
+    def __init__(self, path: str, expiry_margin: Optional[float] = None):
+        super().__init__(expiry_margin)
+        self.path = path
+
+    @contextmanager
+    def _locked(self):
+        with os.fdopen(_open_private(f'{self.path}.lock', os.O_RDWR | os.O_CREAT), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read(self) -> Dict[str, Dict]:
+        try:
+            with open(self.path) as file:
+                return json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _write(self, tokens: Dict[str, Dict]) -> None:
+        tmp_path = f'{self.path}.{os.getpid()}.tmp'
+        with os.fdopen(_open_private(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC), 'w') as file:
+            json.dump(tokens, file)
+        os.replace(tmp_path, self.path)
+
+    def get(self, partner_id: str) -> Optional[str]:
+        token = super().get(partner_id)
+        if token is not None:
+            return token
+        with self._locked():
+            entry = self._read().get(partner_id)
+        if not self._is_alive(entry):
+            return None
+        self._tokens[partner_id] = entry
+        return entry['token']
+
+    def set(self, partner_id: str, token: str, expires_in: Optional[float] = None) -> None:
+        super().set(partner_id, token, expires_in)
+        with self._locked():
+            tokens = self._read()
+            tokens[partner_id] = self._tokens[partner_id]
+            self._write(tokens)
+
+    def invalidate(self, partner_id: str) -> None:
+        super().invalidate(partner_id)
+        with self._locked():
+            tokens = self._read()
+            if tokens.pop(partner_id, None) is not None:
+                self._write(tokens)
+
+
+_default_store: Optional[TokenStore] = None
+
+
+def default_token_store() -> TokenStore:
+    """Общее хранилище токенов процесса: файловое, если задан TOKEN_STORE_CONFIG['path']."""
+    global _default_store
+    if _default_store is None:
+        path = TOKEN_STORE_CONFIG['path']
+        _default_store = FileTokenStore(path) if path else TokenStore()
+    return _default_store
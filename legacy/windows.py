@@ -0,0 +1,31 @@
+import datetime
+from typing import List, Optional, Tuple
+
+WINDOWS = ('day', 'week', 'month')
+
+
+def _window_end(start, window: str):
+    if window == 'day':
+        return start
+    if window == 'week':
+        return start + datetime.timedelta(days=6 - start.weekday())
+    if window == 'month':
+        next_month = (start.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+        return next_month - datetime.timedelta(days=1)
+    raise ValueError(f'unknown date window {window!r}, expected one of {WINDOWS}')
+
+
+def split_date_range(start_date, finish_date, window: Optional[str] = None) -> List[Tuple]:
+    """Делит [start_date, finish_date] на окна: день, календарную неделю (пн–вс) или месяц.
+
+    Крайние окна обрезаются по границам диапазона. Без window возвращается весь диапазон.
+    """
+    if window is None:
+        return [(start_date, finish_date)]
+    windows = []
+    window_start = start_date
+    while window_start <= finish_date:
+        window_finish = min(_window_end(window_start, window), finish_date)
+        windows.append((window_start, window_finish))
+        window_start = window_finish + datetime.timedelta(days=1)
+    return windows
@@ -1,6 +1,8 @@
 import sys
 import types
 
+import pytest
+
 
 try:
     import common
@@ -19,3 +21,13 @@ fake_queue_module.queue = fake_queue
 sys.modules["common.queue"] = fake_queue_module
 
 setattr(common, "queue", fake_queue_module)
+
+from legacy.token_store import default_token_store  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def clear_token_store():
+    """Сбрасывает общий на процесс кэш токенов, чтобы тесты не видели чужих токенов."""
+    default_token_store().clear()
+    yield
+    default_token_store().clear()
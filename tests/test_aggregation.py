@@ -0,0 +1,80 @@
+import pandas as pd
+import pytest
+
+import legacy.aggregation as aggregation
+from legacy.aggregation import aggregate
+from legacy.partner_data.data import PartnerData
+
+
+@pytest.fixture(params=["rows", "frame"])
+def small_threshold(request, monkeypatch):
+    """Прогоняет тесты и через словарь, и через колоночный путь."""
+    if request.param == "frame":
+        monkeypatch.setattr(aggregation, "SMALL_INPUT_THRESHOLD", 0)
+    return request.param
+
+
+def test_aggregate_sums_rows_with_same_key(small_threshold):
+    """Проверяет суммирование imps и spent для одинакового ключа."""
+    # ----------------- Arrange -----------------
+    date = pd.Timestamp("2025-01-01")
+    rows = [
+        PartnerData(date=date, ssp="ssp-partner-s", imps=1000, spent=10.0),
+        PartnerData(date=date, ssp="ssp-partner-s", imps=800, spent=9.0),
+        PartnerData(date=pd.Timestamp("2025-01-02"), ssp="ssp-partner-s", imps=1, spent=1.0),
+    ]
+
+    # ----------------- Act -----------------
+    result = aggregate(rows)
+
+    # ----------------- Assert -----------------
+    assert result == [
+        PartnerData(date=date, ssp="ssp-partner-s", imps=1800, spent=19.0),
+        PartnerData(date=pd.Timestamp("2025-01-02"), ssp="ssp-partner-s", imps=1, spent=1.0),
+    ]
+
+
+def test_aggregate_does_not_confuse_ambiguous_keys(small_threshold):
+    """Проверяет, что dsp_id 1 и 11 не склеиваются, как при строковом ключе."""
+    # ----------------- Arrange -----------------
+    rows = [
+        PartnerData(date=pd.Timestamp("2025-01-01"), dsp_id=1, imps=1, spent=1.0),
+        PartnerData(date=pd.Timestamp("2025-01-01"), dsp_id=11, imps=2, spent=2.0),
+    ]
+
+    # ----------------- Act -----------------
+    result = aggregate(rows)
+
+    # ----------------- Assert -----------------
+    assert len(result) == 2
+
+
+def test_aggregate_separates_currencies(small_threshold):
+    """Проверяет, что валюта входит в ключ агрегации."""
+    # ----------------- Arrange -----------------
+    date = pd.Timestamp("2025-01-01")
+    rows = [
+        PartnerData(date=date, dsp_id=27, imps=1, spent=1.0, currency="rub"),
+        PartnerData(date=date, dsp_id=27, imps=1, spent=1.0, currency="usd"),
+    ]
+
+    # ----------------- Act -----------------
+    result = aggregate(rows)
+
+    # ----------------- Assert -----------------
+    assert sorted(row.currency for row in result) == ["rub", "usd"]
+
+
+def test_aggregate_does_not_mutate_input():
+    """Проверяет, что исходные PartnerData не изменяются."""
+    # ----------------- Arrange -----------------
+    date = pd.Timestamp("2025-01-01")
+    first = PartnerData(date=date, dsp_id=27, imps=1, spent=1.0)
+    rows = [first, PartnerData(date=date, dsp_id=27, imps=2, spent=2.0)]
+
+    # ----------------- Act -----------------
+    aggregate(rows)
+
+    # ----------------- Assert -----------------
+    assert first.imps == 1
+    assert first.spent == 1.0
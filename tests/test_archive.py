@@ -0,0 +1,123 @@
+import asyncio
+import datetime
+import json
+import os
+
+import httpx
+import pytest
+
+from legacy.archive import ArchiveMissError, ResponseArchive
+from legacy.context import RunContext
+from legacy.parser import load
+from legacy.partners.dsp_partners import DSPPartnerF
+from legacy.partners.ssp_partners import SSPPartnerO
+
+O_URL = "https://ssp-partner-o.example/reporting/dsp?start_date=2025-01-01&end_date=2025-01-02"
+O_BODY = json.dumps({"data": [{"date": "2025-01-01", "impressionCount": 2000, "spent": 20.5}]})
+F_URL = "https://dsp-partner-f.example/ssp_xml?start=2025-01-01&end=2025-01-02"
+F_BODY = "<root><report><date>2025-01-01</date><impressions>900</impressions><revenue>9.9</revenue></report></root>"
+
+
+def test_store_and_load_roundtrip(tmp_path):
+    """Проверяет, что сохранённое тело читается обратно без изменений."""
+    # ----------------- Arrange -----------------
+    archive = ResponseArchive(str(tmp_path))
+
+    # ----------------- Act -----------------
+    archive.store("ssp-partner-o", O_URL, b"body")
+
+    # ----------------- Assert -----------------
+    assert ResponseArchive(str(tmp_path)).load("ssp-partner-o", O_URL) == b"body"
+
+
+def test_identical_bodies_are_stored_once(tmp_path):
+    """Проверяет адресацию по содержимому: одинаковые тела хранятся одним объектом."""
+    # ----------------- Arrange -----------------
+    archive = ResponseArchive(str(tmp_path))
+
+    # ----------------- Act -----------------
+    first = archive.store("ssp-partner-d", "https://d.example/1", b"same")
+    second = archive.store("ssp-partner-d", "https://d.example/2", b"same")
+
+    # ----------------- Assert -----------------
+    objects = [name for _, _, names in os.walk(archive.objects_dir) for name in names]
+    assert first == second
+    assert len(objects) == 1
+
+
+def test_load_by_fetch_date(tmp_path):
+    """Проверяет выбор ответа по дате загрузки и по умолчанию — последнего."""
+    # ----------------- Arrange -----------------
+    archive = ResponseArchive(str(tmp_path))
+    archive.store("ssp-partner-o", O_URL, b"old", fetched=datetime.date(2025, 1, 2))
+    archive.store("ssp-partner-o", O_URL, b"new", fetched=datetime.date(2025, 1, 3))
+
+    # ----------------- Act & Assert -----------------
+    assert archive.load("ssp-partner-o", O_URL) == b"new"
+    assert archive.load("ssp-partner-o", O_URL, fetched=datetime.date(2025, 1, 2)) == b"old"
+    with pytest.raises(ArchiveMissError):
+        archive.load("ssp-partner-o", O_URL, fetched=datetime.date(2025, 1, 4))
+
+
+def test_replay_reproduces_live_run_without_network(tmp_path):
+    """Проверяет, что повтор по архиву даёт те же данные, что и живой запуск, не ходя в сеть."""
+    # ----------------- Arrange -----------------
+    bodies = {O_URL: O_BODY, F_URL: F_BODY}
+    live_transport = httpx.MockTransport(lambda request: httpx.Response(200, text=bodies[str(request.url)]))
+    dead_transport = httpx.MockTransport(lambda request: pytest.fail(f"unexpected request {request.url}"))
+    start, finish = datetime.date(2025, 1, 1), datetime.date(2025, 1, 2)
+
+    # ----------------- Act -----------------
+    live = asyncio.run(load([SSPPartnerO(), DSPPartnerF()], start, finish, live_transport,
+                            RunContext(archive=ResponseArchive(str(tmp_path)))))
+    replayed = asyncio.run(load([SSPPartnerO(), DSPPartnerF()], start, finish, dead_transport,
+                                RunContext(replay=ResponseArchive(str(tmp_path)))))
+
+    # ----------------- Assert -----------------
+    assert len(live) == 2
+    assert sorted(replayed, key=str) == sorted(live, key=str)
+
+
+def fetch_with_archive(partner, archive, handler, fetch):
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            partner.bind_client(client)
+            partner.bind_archive(archive)
+            return await fetch(partner)
+    return asyncio.run(run())
+
+
+def test_streamed_body_is_archived_even_if_parsing_fails(tmp_path):
+    """Проверяет, что тело потокового партнёра с ошибкой разбора всё равно сохраняется для повтора."""
+    # ----------------- Arrange -----------------
+    archive = ResponseArchive(str(tmp_path))
+    body = F_BODY.replace("<impressions>900</impressions>", "<impressions>n/a</impressions>")
+    partner = DSPPartnerF()
+
+    # ----------------- Act -----------------
+    with pytest.raises(ValueError):
+        fetch_with_archive(partner, archive, lambda request: httpx.Response(200, text=body),
+                           lambda partner: partner.fetch_records(F_URL))
+
+    # ----------------- Assert -----------------
+    assert partner.stream_response
+    assert archive.load(partner.id, F_URL) == body.encode()
+
+
+def test_error_responses_are_not_archived(tmp_path):
+    """Проверяет, что страница ошибки не попадает в архив и не заслоняет прежний хороший ответ."""
+    # ----------------- Arrange -----------------
+    archive = ResponseArchive(str(tmp_path))
+    archive.store("ssp-partner-o", O_URL, O_BODY.encode(), fetched=datetime.date(2025, 1, 1))
+
+    def not_found(request):
+        return httpx.Response(404, text="<html>not found</html>")
+
+    # ----------------- Act -----------------
+    fetch_with_archive(SSPPartnerO(), archive, not_found, lambda partner: partner.request_data(O_URL))
+    fetch_with_archive(DSPPartnerF(), archive, not_found, lambda partner: partner.fetch_records(F_URL))
+
+    # ----------------- Assert -----------------
+    assert archive.load("ssp-partner-o", O_URL) == O_BODY.encode()
+    with pytest.raises(ArchiveMissError):
+        archive.load("dsp-partner-f", F_URL)
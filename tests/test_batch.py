@@ -0,0 +1,83 @@
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from legacy.abstract_partners import PartnerRecord
+from legacy.dates import normalize_date_array
+from legacy.partner_data.batch import PartnerBatch
+from legacy.partner_data.data import PartnerData
+
+
+def make_batch(records, **fields):
+    return PartnerBatch.from_records(records, normalize_date_array(record.date for record in records), **fields)
+
+
+def test_batch_rows_are_partner_data_views():
+    """Проверяет, что строки пачки читаются как PartnerData с питоновскими значениями."""
+    # ----------------- Arrange -----------------
+    records = [PartnerRecord("2025-01-01", 10, 1.5), PartnerRecord("2025-01-02", 20, 2.5)]
+
+    # ----------------- Act -----------------
+    batch = make_batch(records, dsp_id=27, currency="rub")
+
+    # ----------------- Assert -----------------
+    assert len(batch) == 2
+    assert batch[1] == PartnerData(date=pd.Timestamp("2025-01-02"), dsp_id=27, imps=20, spent=2.5, currency="rub")
+    assert list(batch) == [batch[0], batch[1]]
+    assert type(list(batch)[0].imps) is int
+
+
+def test_slices_masks_and_concat_stay_columnar():
+    """Проверяет, что срезы, маски и склейка дают PartnerBatch."""
+    # ----------------- Arrange -----------------
+    first = make_batch([PartnerRecord("2025-01-01", 1, 1.0)], ssp="ssp-partner-o")
+    second = make_batch([PartnerRecord("2025-01-02", 2, 2.0), PartnerRecord("2025-01-03", 3, 3.0)], dsp_id=71)
+
+    # ----------------- Act -----------------
+    batch = PartnerBatch.concat([first, PartnerBatch.empty(), second])
+
+    # ----------------- Assert -----------------
+    assert isinstance(batch[1:], PartnerBatch)
+    assert batch[1:] == second
+    assert batch[batch.imps > 1].imps.tolist() == [2, 3]
+    assert batch.ssp.tolist() == ["ssp-partner-o", "", ""]
+
+
+def test_from_rows_roundtrip_and_dicts():
+    """Проверяет, что PartnerData превращаются в пачку и обратно, а to_dicts совпадает с asdict."""
+    # ----------------- Arrange -----------------
+    rows = [PartnerData(date=pd.Timestamp("2025-01-01"), ssp="ssp-partner-s", imps=5, spent=0.5)]
+
+    # ----------------- Act -----------------
+    batch = PartnerBatch.from_rows(rows)
+
+    # ----------------- Assert -----------------
+    assert batch == rows
+    assert list(batch.to_dicts()) == [
+        {"date": pd.Timestamp("2025-01-01"), "dsp_id": 0, "ssp": "ssp-partner-s", "imps": 5, "spent": 0.5, "currency": "usd"}
+    ]
+
+
+def test_batch_uses_several_times_less_memory_than_rows():
+    """Проверяет, что пачка занимает в разы меньше памяти, чем список PartnerData."""
+    # ----------------- Arrange -----------------
+    count = 20_000
+    records = [PartnerRecord(f"2025-01-{i % 28 + 1:02d}", i, i / 10) for i in range(count)]
+    dates = normalize_date_array(record.date for record in records)
+
+    def allocated(build):
+        tracemalloc.start()
+        result = build()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return size, result
+
+    # ----------------- Act -----------------
+    batch_size, batch = allocated(lambda: PartnerBatch.from_records(records, dates, ssp="ssp-partner-o"))
+    rows_size, rows = allocated(lambda: list(batch))
+
+    # ----------------- Assert -----------------
+    assert len(rows) == count
+    assert batch_size * 3 < rows_size
+    assert batch.date.dtype == np.dtype("datetime64[ns]")
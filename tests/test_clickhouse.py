@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.clickhouse_standin import ClickHouseStandin
+from common.config import CLICKHOUSE_CONFIG_RO, CLICKHOUSE_CONFIG_RW
+from legacy.clickhouse import (
+    ClickHouseError, ClickHouseWriter, decode_native, deduplication_token, encode_native, native_to_batch,
+)
+from legacy.partner_data.batch import PartnerBatch
+
+
+def make_batch(count):
+    return PartnerBatch(
+        date=pd.date_range("2025-01-01", periods=count).to_numpy(),
+        dsp_id=np.arange(count),
+        ssp=["ssp-partner-m" if i % 2 else "" for i in range(count)],
+        imps=np.arange(count) * 100,
+        spent=np.arange(count) * 1.5,
+        currency=["rub"] * count,
+    )
+
+
+def writer_for(standin, **config):
+    return ClickHouseWriter({"host": standin.host, "port": standin.port, **config})
+
+
+def test_encode_native_roundtrip():
+    """Проверяет, что блок Native содержит колонки с типами и разбирается в ту же пачку."""
+    # ----------------- Arrange -----------------
+    batch = make_batch(5)
+
+    # ----------------- Act -----------------
+    data = encode_native(batch)
+    block = next(decode_native(data))
+
+    # ----------------- Assert -----------------
+    assert data[:2] == bytes([6, 5])
+    assert {name: type_name for name, (type_name, _) in block.items()} == {
+        "date": "Date", "dsp_id": "Int64", "ssp": "String", "imps": "Int64", "spent": "Float64", "currency": "String",
+    }
+    assert block["date"][1][0] == np.datetime64("2025-01-01")
+    assert native_to_batch(data) == batch
+
+
+def test_writer_sends_blocks_to_clickhouse_http():
+    """Проверяет, что строки уходят блоками по block_rows с запросом INSERT ... FORMAT Native."""
+    # ----------------- Arrange -----------------
+    batch = make_batch(7)
+
+    # ----------------- Act -----------------
+    with ClickHouseStandin() as standin:
+        with writer_for(standin, block_rows=3, max_connections=2, user="writer") as writer:
+            writer.insert(batch)
+
+    # ----------------- Assert -----------------
+    assert sorted(received.rows for received in standin.stats.inserts) == [1, 3, 3]
+    assert {received.query for received in standin.stats.inserts} == {
+        "INSERT INTO dbname.partner_data (date, dsp_id, ssp, imps, spent, currency) FORMAT Native"}
+    assert {received.user for received in standin.stats.inserts} == {"writer"}
+    assert sorted(standin.rows(), key=lambda row: row.dsp_id) == list(batch)
+
+
+def test_writer_uses_write_credentials_by_default():
+    """Проверяет, что вставка идёт от пользователя CLICKHOUSE_CONFIG_RW, а не от читающего."""
+    # ----------------- Act -----------------
+    with ClickHouseStandin() as standin:
+        with writer_for(standin) as writer:
+            writer.insert(make_batch(1))
+
+    # ----------------- Assert -----------------
+    assert [received.user for received in standin.stats.inserts] == [CLICKHOUSE_CONFIG_RW["user"]]
+    assert CLICKHOUSE_CONFIG_RW["user"] != CLICKHOUSE_CONFIG_RO["user"]
+
+
+def test_writer_sends_blocks_in_parallel():
+    """Проверяет, что блоки одной вставки отправляются параллельно в пределах max_connections."""
+    # ----------------- Arrange -----------------
+    batch = make_batch(8)
+
+    # ----------------- Act -----------------
+    with ClickHouseStandin(latency=0.2) as standin:
+        with writer_for(standin, block_rows=2, max_connections=4) as writer:
+            writer.insert(batch)
+
+    # ----------------- Assert -----------------
+    assert standin.stats.requests == 4
+    assert 1 < standin.stats.max_in_flight <= 4
+
+
+def test_writer_raises_on_clickhouse_error():
+    """Проверяет, что отказ ClickHouse пробрасывается как ClickHouseError со статусом и текстом."""
+    # ----------------- Arrange -----------------
+    batch = make_batch(2)
+
+    # ----------------- Act & Assert -----------------
+    with ClickHouseStandin(error_rate=1.0) as standin:
+        with writer_for(standin) as writer:
+            with pytest.raises(ClickHouseError, match="Memory limit exceeded") as error:
+                writer.insert(batch)
+
+    assert error.value.status_code == 500
+
+
+def test_writer_sends_stable_deduplication_token():
+    """Проверяет, что повтор того же блока несёт тот же insert_deduplication_token, а другой блок — другой."""
+    # ----------------- Arrange -----------------
+    batch = make_batch(4)
+
+    # ----------------- Act -----------------
+    with ClickHouseStandin() as standin:
+        with writer_for(standin) as writer:
+            writer.insert(batch)
+            writer.insert(batch)
+            writer.insert(batch[:3])
+
+    # ----------------- Assert -----------------
+    tokens = [received.deduplication_token for received in standin.stats.inserts]
+    assert tokens[0] == tokens[1] == deduplication_token(encode_native(batch))
+    assert tokens[2] != tokens[0]
+    assert standin.stats.deduplicated == 1
+    assert len(standin.rows()) == 7
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+from legacy.dates import normalize_date_array
+
+
+def test_normalize_date_array_matches_scalar_to_datetime():
+    """Проверяет, что пакетное преобразование совпадает с поштучным pd.to_datetime."""
+    # ----------------- Arrange -----------------
+    values = ["2025-01-02", "2025-01-01", "2025-01-02", "2025-01-03"]
+
+    # ----------------- Act -----------------
+    result = normalize_date_array(values)
+
+    # ----------------- Assert -----------------
+    assert list(pd.DatetimeIndex(result)) == [pd.to_datetime(value) for value in values]
+
+
+def test_normalize_date_array_uses_explicit_format():
+    """Проверяет разбор дат по заданному формату партнёра."""
+    # ----------------- Act -----------------
+    result = normalize_date_array(["20250731", "20250801"], "%Y%m%d")
+
+    # ----------------- Assert -----------------
+    assert list(pd.DatetimeIndex(result)) == [pd.Timestamp("2025-07-31"), pd.Timestamp("2025-08-01")]
+
+
+def test_normalize_date_array_falls_back_for_mixed_formats():
+    """Проверяет, что значения в разных форматах разбираются поштучно."""
+    # ----------------- Arrange -----------------
+    values = ["2025-01-01", "20250102"]
+
+    # ----------------- Act -----------------
+    result = normalize_date_array(values)
+
+    # ----------------- Assert -----------------
+    assert list(pd.DatetimeIndex(result)) == [pd.Timestamp("2025-01-01"), pd.Timestamp("2025-01-02")]
+
+
+def test_normalize_date_array_empty_input_returns_empty_array():
+    """Проверяет, что пустой вход даёт пустой массив datetime64[ns]."""
+    result = normalize_date_array([])
+    assert result.dtype == np.dtype("datetime64[ns]")
+    assert len(result) == 0
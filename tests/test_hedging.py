@@ -0,0 +1,177 @@
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+from legacy.hedging import hedged
+from legacy.http_client import HttpClientManager
+from legacy.metrics import RunMetrics
+from legacy.partners.ssp_partners import SSPPartnerO
+from legacy.scheduler import FetchScheduler
+
+O_BODY = json.dumps({"data": [{"date": "2025-01-01", "impressionCount": 10, "spent": 1.0}]}).encode()
+
+
+def make_func(*delays, error=None):
+    """func, i-й вызов которой спит delays[i] и возвращает i (или бросает error)."""
+    calls = []
+
+    async def func():
+        index = len(calls)
+        calls.append(index)
+        await asyncio.sleep(delays[index])
+        if error is not None:
+            raise error
+        return index
+    return func, calls
+
+
+def test_fast_call_is_not_hedged():
+    """Проверяет, что быстрый вызов не дублируется."""
+    # ----------------- Arrange -----------------
+    func, calls = make_func(0)
+
+    # ----------------- Act -----------------
+    result = asyncio.run(hedged(func, 0.5))
+
+    # ----------------- Assert -----------------
+    assert result == 0
+    assert calls == [0]
+
+
+def test_slow_call_is_hedged_and_loser_cancelled():
+    """Проверяет, что медленный вызов дублируется, побеждает быстрый, а медленный отменяется."""
+    # ----------------- Arrange -----------------
+    func, calls = make_func(5, 0)
+    hedges = []
+
+    # ----------------- Act -----------------
+    started = time.monotonic()
+    result = asyncio.run(hedged(func, 0.01, on_hedge=lambda: hedges.append(1)))
+    seconds = time.monotonic() - started
+
+    # ----------------- Assert -----------------
+    assert result == 1
+    assert hedges == [1]
+    assert seconds < 1
+
+
+def test_error_is_raised_only_when_both_copies_fail():
+    """Проверяет, что ошибка пробрасывается, если упали обе копии."""
+    # ----------------- Arrange -----------------
+    func, calls = make_func(0.05, 0, error=ConnectionError("boom"))
+
+    # ----------------- Act & Assert -----------------
+    with pytest.raises(ConnectionError):
+        asyncio.run(hedged(func, 0.01))
+    assert calls == [0, 1]
+
+
+def test_latency_percentile_needs_min_samples():
+    """Проверяет, что перцентиль считается только после min_samples замеров."""
+    # ----------------- Arrange -----------------
+    metrics = RunMetrics()
+
+    # ----------------- Act -----------------
+    for seconds in (0.1, 0.2, 0.3):
+        metrics.observe_latency("ssp-partner-o", seconds)
+
+    # ----------------- Assert -----------------
+    assert metrics.latency_percentile("ssp-partner-o", 50, min_samples=4) is None
+    assert metrics.latency_percentile("ssp-partner-o", 50, min_samples=3) == pytest.approx(0.2)
+
+
+def test_partner_hedges_request_slower_than_observed_percentile():
+    """Проверяет, что партнёр с hedge_percentile дублирует запрос дольше перцентиля запуска."""
+    # ----------------- Arrange -----------------
+    partner = SSPPartnerO(hedge_percentile=90, hedge_min_samples=2)
+    metrics = RunMetrics()
+    metrics.observe_latency(partner.id, 0.01)
+    metrics.observe_latency(partner.id, 0.02)
+    calls = []
+
+    async def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            await asyncio.sleep(5)
+        return httpx.Response(200, content=O_BODY)
+
+    async def run():
+        async with HttpClientManager(transport=httpx.MockTransport(handler)) as client:
+            partner.bind_client(client)
+            partner.bind_metrics(metrics)
+            return await partner.fetch_records("https://partner.example/report")
+
+    # ----------------- Act -----------------
+    started = time.monotonic()
+    records = asyncio.run(run())
+    seconds = time.monotonic() - started
+
+    # ----------------- Assert -----------------
+    assert len(records) == 1
+    assert len(calls) == 2
+    assert seconds < 1
+    assert metrics.url(partner.id, "https://partner.example/report").hedges == 1
+    assert len(metrics.latencies[partner.id]) == 3
+
+
+def test_rate_limit_wait_does_not_trigger_hedge():
+    """Проверяет, что ожидание токена rate limit не считается в задержку хеджирования."""
+    # ----------------- Arrange -----------------
+    partner = SSPPartnerO(id="hedged-rate-limited-partner", rate_limit=5, rate_burst=1,
+                          hedge_percentile=90, hedge_min_samples=2)
+    metrics = RunMetrics()
+    metrics.observe_latency(partner.id, 0.01)
+    metrics.observe_latency(partner.id, 0.02)
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, content=O_BODY))
+
+    async def run():
+        async with HttpClientManager(transport=transport) as client:
+            partner.bind_client(client)
+            partner.bind_metrics(metrics)
+            # второй запрос ждёт токен ~0.2 с — много дольше порога хеджирования
+            return await asyncio.gather(*(partner.fetch_records(f"https://partner.example/{i}") for i in range(2)))
+
+    # ----------------- Act -----------------
+    results = asyncio.run(run())
+
+    # ----------------- Assert -----------------
+    assert [len(records) for records in results] == [1, 1]
+    assert [metrics.url(partner.id, f"https://partner.example/{i}").hedges for i in range(2)] == [0, 0]
+
+
+def test_hedge_copy_takes_its_own_scheduler_slot():
+    """Проверяет, что дубль ждёт свой слот планировщика и не превышает лимит хоста."""
+    # ----------------- Arrange -----------------
+    partner = SSPPartnerO(id="hedged-per-host-partner", max_concurrency_per_host=1,
+                          hedge_percentile=90, hedge_min_samples=2)
+    metrics = RunMetrics()
+    metrics.observe_latency(partner.id, 0.01)
+    metrics.observe_latency(partner.id, 0.02)
+    scheduler = FetchScheduler()
+    in_flight = []
+    max_in_flight = []
+
+    async def handler(request):
+        in_flight.append(request)
+        max_in_flight.append(len(in_flight))
+        await asyncio.sleep(0.2)
+        in_flight.remove(request)
+        return httpx.Response(200, content=O_BODY)
+
+    async def run():
+        async with HttpClientManager(transport=httpx.MockTransport(handler)) as client:
+            partner.bind_client(client)
+            partner.bind_metrics(metrics)
+            partner.bind_scheduler(scheduler)
+            return await partner.fetch_records("https://partner.example/report")
+
+    # ----------------- Act -----------------
+    records = asyncio.run(run())
+
+    # ----------------- Assert -----------------
+    assert len(records) == 1
+    assert metrics.url(partner.id, "https://partner.example/report").hedges == 1
+    assert max(max_in_flight) == 1
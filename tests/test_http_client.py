@@ -0,0 +1,52 @@
+import asyncio
+
+import httpx
+
+from legacy.http_client import HttpClientManager
+from legacy.partners.ssp_partners import SSPPartnerO, SSPPartnerS
+
+
+def test_partners_share_one_client_during_run():
+    """Проверяет, что все партнёры запуска получают один и тот же клиент."""
+    # ----------------- Arrange -----------------
+    seen_clients = []
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, text="{}"))
+    partners = [SSPPartnerO(), SSPPartnerS()]
+
+    async def run():
+        async with HttpClientManager(transport=transport) as client:
+            for partner in partners:
+                partner.bind_client(client)
+                async with partner.http_client() as partner_client:
+                    seen_clients.append(partner_client)
+            return client
+
+    # ----------------- Act -----------------
+    client = asyncio.run(run())
+
+    # ----------------- Assert -----------------
+    assert seen_clients == [client, client]
+
+
+def test_request_data_reuses_bound_client():
+    """Проверяет, что request_data ходит через привязанный клиент, а не создаёт новый."""
+    # ----------------- Arrange -----------------
+    requested_urls = []
+
+    def handler(request):
+        requested_urls.append(str(request.url))
+        return httpx.Response(200, text="ok")
+
+    partner = SSPPartnerS()
+
+    async def run():
+        async with HttpClientManager(transport=httpx.MockTransport(handler)) as client:
+            partner.bind_client(client)
+            return await asyncio.gather(*(partner.request_data(url) for url in partner.get_urls("a", "b")))
+
+    # ----------------- Act -----------------
+    result = asyncio.run(run())
+
+    # ----------------- Assert -----------------
+    assert result == ["ok", "ok", "ok"]
+    assert len(requested_urls) == 3
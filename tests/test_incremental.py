@@ -0,0 +1,54 @@
+from legacy.abstract_partners import PartnerRecord
+from legacy.incremental import XMLRowParser, parse_chunks
+from legacy.partners.ssp_partners import SSPPartnerC
+
+XML_REPORT = b"""<root>
+    <day date="2025-01-01"><impressions>1000</impressions><revenue>8.5</revenue></day>
+    <day date="2025-01-02"><impressions>1500</impressions><revenue>12.0</revenue></day>
+    <day date="2025-01-03"><impressions>700</impressions><revenue>3.25</revenue></day>
+</root>"""
+
+
+def test_chunked_feed_matches_whole_document():
+    """Проверяет, что разбор по маленьким кускам даёт тот же результат, что и целиком."""
+    # ----------------- Arrange -----------------
+    partner = SSPPartnerC()
+    chunks = [XML_REPORT[i:i + 7] for i in range(0, len(XML_REPORT), 7)]
+
+    # ----------------- Act -----------------
+    result = list(parse_chunks(partner.incremental_parser(), chunks))
+
+    # ----------------- Assert -----------------
+    assert result == list(partner.norm_parse(XML_REPORT.decode()))
+    assert result == [
+        PartnerRecord("2025-01-01", 1000, 8.5),
+        PartnerRecord("2025-01-02", 1500, 12.0),
+        PartnerRecord("2025-01-03", 700, 3.25),
+    ]
+
+
+def test_rows_are_returned_as_soon_as_they_close():
+    """Проверяет, что строка отдаётся сразу после закрытия её элемента, до конца документа."""
+    # ----------------- Arrange -----------------
+    parser = SSPPartnerC().incremental_parser()
+    first_row_end = XML_REPORT.index(b"</day>") + len(b"</day>")
+
+    # ----------------- Act -----------------
+    first = parser.feed(XML_REPORT[:first_row_end])
+    rest = parser.feed(XML_REPORT[first_row_end:]) + parser.close()
+
+    # ----------------- Assert -----------------
+    assert first == [PartnerRecord("2025-01-01", 1000, 8.5)]
+    assert len(rest) == 2
+
+
+def test_processed_rows_are_removed_from_tree():
+    """Проверяет, что обработанные элементы не накапливаются в дереве."""
+    # ----------------- Arrange -----------------
+    parser = XMLRowParser(lambda element: element.attrib['date'])
+
+    # ----------------- Act -----------------
+    parser.feed(XML_REPORT)
+
+    # ----------------- Assert -----------------
+    assert len(parser._root) == 0
@@ -0,0 +1,72 @@
+import datetime
+
+import pytest
+from pandas import Timestamp
+
+from legacy.insert_snapshot import InsertSnapshot, delta_insert
+from legacy.partner_data.batch import PartnerBatch
+from legacy.partner_data.data import PartnerData
+
+
+def row(day, imps, spent, ssp="ssp-partner-o"):
+    return PartnerData(date=Timestamp(day), dsp_id=0, ssp=ssp, imps=imps, spent=spent, currency="usd")
+
+
+def test_snapshot_keeps_only_new_and_changed_rows(tmp_path):
+    """Проверяет, что после сохранения и загрузки снимка остаются только новые и изменившиеся строки."""
+    # ----------------- Arrange -----------------
+    path = str(tmp_path / "snapshot.json")
+    snapshot = InsertSnapshot(path)
+    snapshot.update([row("2025-01-01", 100, 1.0), row("2025-01-02", 200, 2.0)])
+    snapshot.save()
+
+    rerun = [
+        row("2025-01-01", 100, 1.0 + 1e-9),
+        row("2025-01-02", 250, 2.5),
+        row("2025-01-03", 300, 3.0),
+        row("2025-01-01", 100, 1.0, ssp="ssp-partner-c"),
+    ]
+
+    # ----------------- Act -----------------
+    changed = InsertSnapshot(path).changed(rerun)
+
+    # ----------------- Assert -----------------
+    assert changed == rerun[1:]
+
+
+def test_snapshot_drops_days_older_than_retention(tmp_path):
+    """Проверяет, что при сохранении дни старше retention_days выбрасываются из снимка."""
+    # ----------------- Arrange -----------------
+    path = str(tmp_path / "snapshot.json")
+    snapshot = InsertSnapshot(path, retention_days=7)
+    snapshot.update([row("2025-01-01", 100, 1.0), row("2025-01-20", 200, 2.0)])
+
+    # ----------------- Act -----------------
+    snapshot.save(today=datetime.date(2025, 1, 21))
+
+    # ----------------- Assert -----------------
+    reloaded = InsertSnapshot(path)
+    assert len(reloaded) == 1
+    assert reloaded.changed([row("2025-01-20", 200, 2.0)]) == []
+
+
+def test_delta_insert_writes_changes_and_records_them_only_after_success(tmp_path):
+    """Проверяет, что повтор вставки ничего не пишет, а упавшая вставка не попадает в снимок."""
+    # ----------------- Arrange -----------------
+    snapshot = InsertSnapshot(str(tmp_path / "snapshot.json"))
+    inserted, skipped = [], []
+    insert = delta_insert(snapshot, inserted.append, skipped.append)
+
+    def failing_insert(rows):
+        raise ConnectionError("database is down")
+
+    # ----------------- Act -----------------
+    insert(PartnerBatch.from_rows([row("2025-01-01", 100, 1.0)]))
+    insert(PartnerBatch.from_rows([row("2025-01-01", 100, 1.0), row("2025-01-02", 200, 2.0)]))
+    with pytest.raises(ConnectionError):
+        delta_insert(snapshot, failing_insert)([row("2025-01-03", 300, 3.0)])
+
+    # ----------------- Assert -----------------
+    assert [list(batch) for batch in inserted] == [[row("2025-01-01", 100, 1.0)], [row("2025-01-02", 200, 2.0)]]
+    assert skipped == [0, 1]
+    assert len(InsertSnapshot(str(tmp_path / "snapshot.json"))) == 2
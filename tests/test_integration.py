@@ -1,8 +1,10 @@
-from dataclasses import asdict
+from contextlib import asynccontextmanager
 from unittest.mock import AsyncMock
 from pandas import Timestamp
 import json
 
+from benchmarks.clickhouse_standin import ClickHouseStandin
+from legacy.config import CLICKHOUSE_INSERT_CONFIG
 from legacy.partner_data.data import PartnerData
 from legacy.parser import load_insert_data
 import legacy.parser as parser
@@ -221,8 +223,8 @@ def test_load_insert_data_with_insert(mocker):
     mock_post = AsyncMock()
     mock_get = AsyncMock()
 
-    mock_client = mocker.Mock()
-    mocker.patch("legacy.parser.Client", return_value=mock_client)
+    standin = ClickHouseStandin()
+    mocker.patch.dict(CLICKHOUSE_INSERT_CONFIG, {"host": standin.host, "port": standin.port})
 
     def mock_side_effect(url, TEST_RESPONSE):
         '''Функция, которая решает, какой ответ вернуть в зависимости от URL.'''
@@ -233,31 +235,41 @@ def test_load_insert_data_with_insert(mocker):
         elif isinstance(data, dict):
             mock_response.text = json.dumps(data)
             mock_response.json = lambda: data
+        mock_response.content = mock_response.text.encode() if data is not None else b""
         return mock_response
 
     mock_post.side_effect = lambda url, *_args, **_kwargs: mock_side_effect(url, TEST_POST_RESPONSES)
     mock_get.side_effect = lambda url, *_args, **_kwargs: mock_side_effect(url, TEST_GET_RESPONSES)
 
+    @asynccontextmanager
+    async def mock_stream(method, url, *_args, **_kwargs):
+        '''Потоковый ответ для партнёров с stream_response: тело отдаётся кусками.'''
+        body = TEST_GET_RESPONSES[url].encode()
+
+        async def aiter_bytes():
+            for i in range(0, len(body), 64):
+                yield body[i:i + 64]
+
+        yield mocker.Mock(headers={}, aiter_bytes=aiter_bytes)
+
     mock_instance.post = mock_post
     mock_instance.get = mock_get
+    mock_instance.stream = mock_stream
 
     # ----------------- Act -----------------
-    load_insert_data("01.01.2025", "03.01.2025")
+    with standin:
+        load_insert_data("01.01.2025", "03.01.2025")
 
     # ----------------- Assert -----------------
-    mock_client.execute.assert_called_once()
-
-    called_args, _ = mock_client.execute.call_args
-    query_arg = called_args[0]
-    values_arg_gen = called_args[1]
-
-    assert query_arg == "INSERT INTO dbname.partner_data (*) VALUES"
+    assert standin.stats.requests == 1
+    assert standin.stats.inserts[0].query == (
+        "INSERT INTO dbname.partner_data (date, dsp_id, ssp, imps, spent, currency) FORMAT Native")
 
-    values_list = list(values_arg_gen)
+    values_list = list(standin.rows())
     assert len(values_list) == len(EXPECTED_RESULT)
 
     for result in EXPECTED_RESULT:
-        assert asdict(result) in values_list
+        assert result in values_list
 
 
 # @pytest.mark.only
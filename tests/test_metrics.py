@@ -0,0 +1,90 @@
+import asyncio
+import datetime
+import json
+
+import httpx
+
+from benchmarks.standin_server import LocalRedirectTransport, StandinConfig, StandinServer
+from legacy.context import RunContext
+from legacy.parser import load_and_insert
+from legacy.partners.dsp_partners import DSPPartnerF
+from legacy.partners.ssp_partners import SSPPartnerO
+
+DAY = datetime.date(2025, 1, 1)
+O_BODY = json.dumps({"data": [
+    {"date": "2025-01-01", "impressionCount": 10, "spent": 1.0},
+    {"date": "2025-01-01", "impressionCount": 20, "spent": 2.0},
+]}).encode()
+F_BODY = b"<root><report><date>2025-01-01</date><impressions>5</impressions><revenue>0.5</revenue></report></root>"
+
+
+def run_load_and_insert(partners, transport):
+    context = RunContext()
+    inserted = []
+    asyncio.run(load_and_insert(partners, DAY, DAY, inserted.extend, transport, context))
+    return context.metrics.report(), inserted
+
+
+def test_run_report_counts_bytes_rows_and_insert():
+    """Проверяет, что отчёт запуска содержит объём, строки, агрегацию и вставку по партнёрам."""
+    # ----------------- Arrange -----------------
+    bodies = {"ssp-partner-o.example": O_BODY, "dsp-partner-f.example": F_BODY}
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, content=bodies[request.url.host]))
+
+    # ----------------- Act -----------------
+    report, inserted = run_load_and_insert([SSPPartnerO(), DSPPartnerF()], transport)
+
+    # ----------------- Assert -----------------
+    partner_o = report["partners"]["ssp-partner-o"]
+    assert partner_o["bytes"] == len(O_BODY)
+    assert partner_o["rows"] == 2
+    assert partner_o["aggregated_rows"] == 1
+    assert partner_o["urls"][0]["records"] == 2
+    assert partner_o["urls"][0]["requests"] == 1
+    # два одинаковых URL партнёра F склеиваются в одну запись
+    partner_f = report["partners"]["110"]
+    assert partner_f["urls"][0]["requests"] == 1
+    assert partner_f["bytes"] == len(F_BODY)
+    assert partner_f["rows"] == 2
+    assert report["insert"]["rows"] == len(inserted) == 2
+    assert report["insert"]["batches"] == 1
+
+
+def test_run_report_records_url_errors():
+    """Проверяет, что ошибка URL попадает в отчёт, а не только в traceback."""
+    # ----------------- Arrange -----------------
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, content=b"not json"))
+
+    # ----------------- Act -----------------
+    report, inserted = run_load_and_insert([SSPPartnerO()], transport)
+
+    # ----------------- Assert -----------------
+    url_metrics = report["partners"]["ssp-partner-o"]["urls"][0]
+    assert url_metrics["errors"] == 1
+    assert url_metrics["last_error"].startswith("JSONDecodeError")
+    assert inserted == []
+
+
+def test_ttfb_is_measured_over_real_http():
+    """Проверяет, что TTFB замеряется для обычных и потоковых запросов по настоящему HTTP."""
+    # ----------------- Arrange -----------------
+    partners = [SSPPartnerO(), DSPPartnerF()]
+
+    async def run():
+        server = StandinServer(partners, StandinConfig(rows=10, latency=0.02))
+        port = await server.start()
+        context = RunContext()
+        try:
+            await load_and_insert(partners, DAY, DAY, lambda rows: None, LocalRedirectTransport(port), context)
+        finally:
+            await server.stop()
+        return context.metrics.report()
+
+    # ----------------- Act -----------------
+    report = asyncio.run(run())
+
+    # ----------------- Assert -----------------
+    for partner_id in ("ssp-partner-o", "110"):
+        url_metrics = report["partners"][partner_id]["urls"][0]
+        assert url_metrics["ttfb_seconds"] >= 0.02
+        assert url_metrics["fetch_seconds"] >= url_metrics["ttfb_seconds"]
@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+from legacy.pipeline import BatchInserter
+
+
+def test_batch_inserter_flushes_by_size():
+    """Проверяет, что строки уходят пачками не больше insert_batch_size."""
+    # ----------------- Arrange -----------------
+    batches = []
+
+    async def run():
+        async with BatchInserter(batches.append, insert_batch_size=3, flush_interval=60) as inserter:
+            await inserter.put([1, 2])
+            await inserter.put([3, 4, 5, 6, 7])
+
+    # ----------------- Act -----------------
+    asyncio.run(run())
+
+    # ----------------- Assert -----------------
+    assert batches == [[1, 2, 3], [4, 5, 6], [7]]
+
+
+def test_batch_inserter_flushes_by_time():
+    """Проверяет, что неполная пачка сбрасывается по истечении flush_interval."""
+    # ----------------- Arrange -----------------
+    batches = []
+
+    async def run():
+        async with BatchInserter(batches.append, insert_batch_size=100, flush_interval=0.01) as inserter:
+            await inserter.put([1])
+            await asyncio.sleep(0.05)
+            flushed_before_exit = list(batches)
+            await inserter.put([2])
+        return flushed_before_exit
+
+    # ----------------- Act -----------------
+    flushed_before_exit = asyncio.run(run())
+
+    # ----------------- Assert -----------------
+    assert flushed_before_exit == [[1]]
+    assert batches == [[1], [2]]
+
+
+def test_batch_inserter_propagates_insert_error_to_producer():
+    """Проверяет, что ошибка вставки не подвешивает производителя, а пробрасывается ему."""
+    # ----------------- Arrange -----------------
+    def failing_insert(rows):
+        raise ConnectionError("database is down")
+
+    async def run():
+        async with BatchInserter(failing_insert, insert_batch_size=1, flush_interval=60, queue_size=1) as inserter:
+            for i in range(10):
+                await inserter.put([i])
+
+    # ----------------- Act & Assert -----------------
+    with pytest.raises(ConnectionError):
+        asyncio.run(run())
@@ -0,0 +1,139 @@
+import os
+import socket
+import urllib.request
+
+import legacy.prometheus as prometheus
+from legacy.config import PROMETHEUS_CONFIG
+from legacy.metrics import RunMetrics
+from legacy.prometheus import Counter, Histogram, ParserMetrics, Registry, start_http_server
+
+
+def make_report():
+    metrics = RunMetrics()
+    url_metrics = metrics.url("ssp-partner-o", "https://ssp-partner-o.example/report")
+    url_metrics.requests = 1
+    url_metrics.fetch_seconds = 0.3
+    url_metrics.bytes = 1000
+    url_metrics.rows = 10
+    url_metrics.record_error(ValueError("bad"))
+    metrics.timed_insert(lambda rows: None)([1] * 10)
+    metrics.insert.record_error(ConnectionError("down"))
+    return metrics.report()
+
+
+def test_counter_and_histogram_render_text_format():
+    """Проверяет текстовый формат счётчика и гистограммы с накопительными корзинами."""
+    # ----------------- Arrange -----------------
+    registry = Registry()
+    counter = registry.register(Counter("requests_total", "Запросы."))
+    histogram = registry.register(Histogram("latency_seconds", "Задержка.", (0.1, 1.0)))
+
+    # ----------------- Act -----------------
+    counter.inc(2, partner='a"b')
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+    text = registry.render()
+
+    # ----------------- Assert -----------------
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{partner="a\\"b"} 2.0' in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1.0"} 2' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in text
+    assert "latency_seconds_count 3" in text
+
+
+def test_observe_run_accumulates_between_runs():
+    """Проверяет, что отчёты запусков копятся в счётчиках процесса."""
+    # ----------------- Arrange -----------------
+    metrics = ParserMetrics()
+
+    # ----------------- Act -----------------
+    metrics.observe_run(make_report())
+    metrics.observe_run(make_report())
+    text = metrics.render()
+
+    # ----------------- Assert -----------------
+    assert "partner_parser_runs_total 2.0" in text
+    assert 'partner_parser_requests_total{partner="ssp-partner-o"} 2.0' in text
+    assert 'partner_parser_response_bytes_total{partner="ssp-partner-o"} 2000.0' in text
+    assert 'partner_parser_errors_total{partner="ssp-partner-o",type="ValueError"} 2.0' in text
+    assert 'partner_parser_errors_total{partner="insert",type="ConnectionError"} 2.0' in text
+    assert 'partner_parser_request_duration_seconds_bucket{partner="ssp-partner-o",le="0.5"} 2' in text
+    assert 'partner_parser_insert_batch_rows_bucket{le="100.0"} 2' in text
+
+
+def test_write_textfile_replaces_file(tmp_path):
+    """Проверяет, что textfile пишется целиком и без временных файлов рядом."""
+    # ----------------- Arrange -----------------
+    metrics = ParserMetrics()
+    metrics.observe_run(make_report())
+    path = tmp_path / "partner_parser.prom"
+
+    # ----------------- Act -----------------
+    metrics.write_textfile(str(path))
+
+    # ----------------- Assert -----------------
+    assert path.read_text() == metrics.render()
+    assert [p.name for p in tmp_path.iterdir()] == ["partner_parser.prom"]
+
+
+def test_http_endpoint_serves_metrics():
+    """Проверяет, что эндпоинт /metrics отдаёт текущие метрики."""
+    # ----------------- Arrange -----------------
+    metrics = ParserMetrics()
+    metrics.observe_run(make_report())
+    server = start_http_server(metrics, 0, "127.0.0.1")
+
+    # ----------------- Act -----------------
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.server_port}/metrics") as response:
+            body = response.read().decode()
+            content_type = response.headers["Content-Type"]
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    # ----------------- Assert -----------------
+    assert body == metrics.render()
+    assert content_type.startswith("text/plain; version=0.0.4")
+
+
+def test_worker_label_and_textfile_per_worker_slot(mocker, tmp_path):
+    """Проверяет, что ряды помечены слотом воркера, а textfile пишется в файл слота, а не процесса."""
+    # ----------------- Arrange -----------------
+    mocker.patch.object(prometheus, "_parser_metrics", None)
+    mocker.patch.dict(PROMETHEUS_CONFIG, {"worker": None, "port": None,
+                                          "textfile_path": str(tmp_path / "partner_parser_{worker}.prom")})
+    mocker.patch.dict(os.environ, {"PARTNER_PARSER_WORKER": "2"})
+
+    # ----------------- Act -----------------
+    prometheus.export_run(make_report())
+
+    # ----------------- Assert -----------------
+    text = (tmp_path / "partner_parser_2.prom").read_text()
+    assert 'partner_parser_runs_total{worker="2"} 1.0' in text
+    assert 'partner_parser_requests_total{worker="2",partner="ssp-partner-o"} 1.0' in text
+
+
+def test_busy_metrics_port_does_not_fail_the_run(mocker):
+    """Проверяет, что занятый порт эндпоинта только логируется, а метрики продолжают копиться."""
+    # ----------------- Arrange -----------------
+    busy = socket.socket()
+    busy.bind(("127.0.0.1", 0))
+    busy.listen()
+    port = busy.getsockname()[1]
+    mocker.patch.object(prometheus, "_parser_metrics", None)
+    mocker.patch.object(prometheus, "_http_server", None)
+    mocker.patch.dict(PROMETHEUS_CONFIG, {"worker": 1, "port": port - 1, "host": "127.0.0.1", "textfile_path": None})
+
+    # ----------------- Act -----------------
+    try:
+        prometheus.export_run(make_report())
+    finally:
+        busy.close()
+
+    # ----------------- Assert -----------------
+    assert prometheus._http_server is None
+    assert 'partner_parser_runs_total{worker="1"} 1.0' in prometheus.default_parser_metrics().render()
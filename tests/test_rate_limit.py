@@ -0,0 +1,84 @@
+import asyncio
+import time
+
+import httpx
+
+from legacy.http_client import HttpClientManager
+from legacy.partners.ssp_partners import SSPPartnerO
+from legacy.rate_limit import TokenBucket, get_bucket
+
+
+def test_token_bucket_allows_burst_then_paces():
+    """Проверяет, что bucket пропускает burst сразу, а остальные запросы — со скоростью rate."""
+    # ----------------- Arrange -----------------
+    bucket = TokenBucket(rate=50, burst=2)
+
+    async def run():
+        started = time.monotonic()
+        burst_done = None
+        for i in range(6):
+            await bucket.acquire()
+            if i == 1:
+                burst_done = time.monotonic() - started
+        return burst_done, time.monotonic() - started
+
+    # ----------------- Act -----------------
+    burst_seconds, total_seconds = asyncio.run(run())
+
+    # ----------------- Assert -----------------
+    assert burst_seconds < 0.01
+    assert total_seconds >= 4 / 50 * 0.9
+
+
+def test_concurrent_acquires_are_paced():
+    """Проверяет, что одновременные запросы тоже не превышают rate."""
+    # ----------------- Arrange -----------------
+    bucket = TokenBucket(rate=100, burst=1)
+
+    async def run():
+        started = time.monotonic()
+        await asyncio.gather(*(bucket.acquire() for _ in range(5)))
+        return time.monotonic() - started
+
+    # ----------------- Act -----------------
+    total_seconds = asyncio.run(run())
+
+    # ----------------- Assert -----------------
+    assert total_seconds >= 4 / 100 * 0.9
+
+
+def test_try_acquire_does_not_wait():
+    """Проверяет, что try_acquire отдаёт burst токенов и дальше отказывает без ожидания."""
+    # ----------------- Arrange -----------------
+    bucket = TokenBucket(rate=1, burst=2)
+
+    # ----------------- Act -----------------
+    results = [bucket.try_acquire() for _ in range(3)]
+
+    # ----------------- Assert -----------------
+    assert results == [True, True, False]
+
+
+def test_get_bucket_is_shared_per_partner():
+    """Проверяет, что у партнёра один bucket на процесс."""
+    assert get_bucket("ssp-partner-x", 1.0, 1) is get_bucket("ssp-partner-x", 1.0, 1)
+
+
+def test_request_data_respects_partner_rate_limit():
+    """Проверяет, что request_data партнёра с rate_limit ограничен по скорости."""
+    # ----------------- Arrange -----------------
+    partner = SSPPartnerO(id="rate-limited-partner", rate_limit=50, rate_burst=1)
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, text="ok"))
+
+    async def run():
+        async with HttpClientManager(transport=transport) as client:
+            partner.bind_client(client)
+            started = time.monotonic()
+            await asyncio.gather(*(partner.request_data(f"https://o.example/{i}") for i in range(4)))
+            return time.monotonic() - started
+
+    # ----------------- Act -----------------
+    total_seconds = asyncio.run(run())
+
+    # ----------------- Assert -----------------
+    assert total_seconds >= 3 / 50 * 0.9
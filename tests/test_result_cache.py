@@ -0,0 +1,89 @@
+import asyncio
+import datetime
+from unittest.mock import AsyncMock
+
+import pandas as pd
+
+from legacy.abstract_partners import PartnerRecord
+from legacy.context import RunContext
+from legacy.parser import ok_parser
+from legacy.partner_data.data import PartnerData
+from legacy.partners.ssp_partners import SSPPartnerO
+from legacy.result_cache import ResultCache
+
+
+def records_for(url):
+    """Одна запись на каждый день периода из URL партнёра O."""
+    start = url.split("start_date=")[1].split("&")[0]
+    finish = url.split("end_date=")[1]
+    return [PartnerRecord(str(day.date()), 1, 1.0) for day in pd.date_range(start, finish)]
+
+
+def make_partner(lag=3):
+    partner = SSPPartnerO(finalization_lag=lag)
+    partner.fetch_records = AsyncMock(side_effect=records_for)
+    return partner
+
+
+def test_put_get_roundtrip(tmp_path):
+    """Проверяет, что строки дня сохраняются и читаются обратно агрегированными."""
+    # ----------------- Arrange -----------------
+    cache = ResultCache(str(tmp_path))
+    day = datetime.date(2025, 1, 1)
+    rows = [PartnerData(date=pd.Timestamp(day), ssp="ssp-partner-o", imps=1, spent=1.5)] * 2
+
+    # ----------------- Act -----------------
+    cache.put("ssp-partner-o", day, rows)
+
+    # ----------------- Assert -----------------
+    assert cache.get("ssp-partner-o", day) == [PartnerData(date=pd.Timestamp(day), ssp="ssp-partner-o", imps=2, spent=3.0)]
+    assert cache.get("ssp-partner-o", datetime.date(2025, 1, 2)) is None
+
+
+def test_closed_days_are_served_from_cache(tmp_path):
+    """Проверяет, что повторный запуск по закрытым дням не ходит к партнёру."""
+    # ----------------- Arrange -----------------
+    context = RunContext(result_cache=ResultCache(str(tmp_path)))
+    start, finish = datetime.date(2025, 1, 1), datetime.date(2025, 1, 5)
+    first_partner, second_partner = make_partner(), make_partner()
+
+    # ----------------- Act -----------------
+    first = asyncio.run(ok_parser(first_partner, start, finish, context))
+    second = asyncio.run(ok_parser(second_partner, pd.Timestamp(start), pd.Timestamp(finish), context))
+
+    # ----------------- Assert -----------------
+    assert first_partner.fetch_records.await_count == 1
+    assert second_partner.fetch_records.await_count == 0
+    assert sorted(row.date for row in second) == sorted(row.date for row in first)
+
+
+def test_only_mutable_window_is_refetched(tmp_path):
+    """Проверяет, что загружаются только дни внутри окна финализации."""
+    # ----------------- Arrange -----------------
+    context = RunContext(result_cache=ResultCache(str(tmp_path)))
+    today = datetime.date.today()
+    start = today - datetime.timedelta(days=10)
+    asyncio.run(ok_parser(make_partner(lag=3), start, today, context))
+    partner = make_partner(lag=3)
+
+    # ----------------- Act -----------------
+    result = asyncio.run(ok_parser(partner, start, today, context))
+
+    # ----------------- Assert -----------------
+    fetched_url = partner.fetch_records.call_args.args[0]
+    assert f"start_date={today - datetime.timedelta(days=2)}" in fetched_url
+    assert len(result) == 11
+
+
+def test_failed_url_is_not_cached(tmp_path):
+    """Проверяет, что при ошибке загрузки дни не закрепляются в кэше."""
+    # ----------------- Arrange -----------------
+    cache = ResultCache(str(tmp_path))
+    partner = SSPPartnerO(finalization_lag=3)
+    partner.fetch_records = AsyncMock(side_effect=ConnectionError("boom"))
+
+    # ----------------- Act -----------------
+    asyncio.run(ok_parser(partner, datetime.date(2025, 1, 1), datetime.date(2025, 1, 2), RunContext(result_cache=cache)))
+
+    # ----------------- Assert -----------------
+    assert cache.get("ssp-partner-o", datetime.date(2025, 1, 1)) is None
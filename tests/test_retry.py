@@ -0,0 +1,149 @@
+import asyncio
+import datetime
+import json
+import random
+
+import httpx
+import pytest
+
+from legacy.config import RETRY_CONFIG
+from legacy.context import RunContext
+from legacy.http_client import HttpClientManager
+from legacy.parser import load_and_insert
+from legacy.partners.dsp_partners import DSPPartnerF
+from legacy.partners.ssp_partners import SSPPartnerO
+from legacy.retry import backoff_delay
+
+O_BODY = json.dumps({"data": [{"date": "2025-01-01", "impressionCount": 10, "spent": 1.0}]}).encode()
+F_BODY = b"<root><report><date>2025-01-01</date><impressions>5</impressions><revenue>0.5</revenue></report></root>"
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(mocker):
+    mocker.patch.dict(RETRY_CONFIG, {"backoff_base": 0.001, "backoff_max": 0.01})
+
+
+def flaky_handler(failures, body, status=502):
+    """Первые failures ответов — status, потом 200 с body."""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) <= failures:
+            return httpx.Response(status)
+        return httpx.Response(200, content=body)
+    return handler, calls
+
+
+def fetch(partner, handler):
+    async def run():
+        async with HttpClientManager(transport=httpx.MockTransport(handler)) as client:
+            partner.bind_client(client)
+            return await partner.fetch_records("https://partner.example/report")
+    return asyncio.run(run())
+
+
+def test_backoff_delay_is_jittered_and_capped():
+    """Проверяет, что задержка случайна в пределах экспоненты и не больше потолка."""
+    # ----------------- Arrange -----------------
+    rng = random.Random(0)
+
+    # ----------------- Act -----------------
+    delays = [backoff_delay(attempt, 1.0, 5.0, rng) for attempt in range(6)]
+
+    # ----------------- Assert -----------------
+    assert all(0 <= delay <= min(5.0, 2 ** attempt) for attempt, delay in enumerate(delays))
+    assert len(set(delays)) == len(delays)
+
+
+@pytest.mark.parametrize("partner", [SSPPartnerO(), DSPPartnerF()], ids=["buffered", "streaming"])
+def test_retryable_status_is_retried(partner):
+    """Проверяет, что 502 повторяется и данные загружаются со следующей попытки."""
+    # ----------------- Arrange -----------------
+    body = F_BODY if partner.stream_response else O_BODY
+    handler, calls = flaky_handler(2, body)
+
+    # ----------------- Act -----------------
+    records = fetch(partner, handler)
+
+    # ----------------- Assert -----------------
+    assert len(records) == 1
+    assert len(calls) == 3
+
+
+def test_transport_error_is_retried():
+    """Проверяет, что сетевая ошибка тоже повторяется."""
+    # ----------------- Arrange -----------------
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            raise httpx.ReadTimeout("slow", request=request)
+        return httpx.Response(200, content=O_BODY)
+
+    # ----------------- Act -----------------
+    records = fetch(SSPPartnerO(), handler)
+
+    # ----------------- Assert -----------------
+    assert len(records) == 1
+    assert len(calls) == 2
+
+
+def test_retries_stop_after_max_attempts():
+    """Проверяет, что после max_attempts попыток ошибка пробрасывается."""
+    # ----------------- Arrange -----------------
+    handler, calls = flaky_handler(10, O_BODY, status=503)
+
+    # ----------------- Act & Assert -----------------
+    with pytest.raises(httpx.HTTPStatusError):
+        fetch(SSPPartnerO(max_attempts=3), handler)
+    assert len(calls) == 3
+
+
+def test_non_retryable_status_is_not_retried():
+    """Проверяет, что статус вне retry_statuses не повторяется."""
+    # ----------------- Arrange -----------------
+    handler, calls = flaky_handler(10, O_BODY, status=404)
+
+    # ----------------- Act & Assert -----------------
+    with pytest.raises(ValueError):
+        fetch(SSPPartnerO(), handler)
+    assert len(calls) == 1
+
+
+def test_client_uses_configured_timeouts():
+    """Проверяет, что общий клиент запуска получает таймауты из конфига."""
+    # ----------------- Act -----------------
+    async def run():
+        async with HttpClientManager({"connect_timeout": 3.0, "read_timeout": 7.0}) as client:
+            return client.timeout
+
+    timeout = asyncio.run(run())
+
+    # ----------------- Assert -----------------
+    assert timeout.connect == 3.0
+    assert timeout.read == 7.0
+
+
+def test_partner_over_time_budget_fails_alone():
+    """Проверяет, что партнёр сверх time_budget отмечается упавшим, а остальные вставляются."""
+    # ----------------- Arrange -----------------
+    async def handler(request):
+        if request.url.host == "dsp-partner-f.example":
+            await asyncio.sleep(10)
+        return httpx.Response(200, content=O_BODY)
+
+    context = RunContext()
+    inserted = []
+    partners = [SSPPartnerO(), DSPPartnerF(time_budget=0.1)]
+    day = datetime.date(2025, 1, 1)
+
+    # ----------------- Act -----------------
+    asyncio.run(load_and_insert(partners, day, day, inserted.extend, httpx.MockTransport(handler), context))
+    report = context.metrics.report()
+
+    # ----------------- Assert -----------------
+    assert [row.ssp for row in inserted] == ["ssp-partner-o"]
+    assert report["failed_partners"] == ["110"]
+    assert report["partners"]["110"]["error"].startswith("TimeoutError")
@@ -0,0 +1,154 @@
+import asyncio
+import time
+
+import httpx
+
+from legacy.config import RETRY_CONFIG
+from legacy.partners.ssp_partners import SSPPartnerO, SSPPartnerS
+from legacy.scheduler import FetchScheduler, SlotStats
+
+
+def run_requests(scheduler, requests):
+    """Запускает запросы через планировщик и возвращает максимум одновременных по ключу."""
+    in_flight = {}
+    max_in_flight = {}
+
+    async def one(partner, url, key):
+        async with scheduler.slot(partner, url):
+            in_flight[key] = in_flight.get(key, 0) + 1
+            max_in_flight[key] = max(max_in_flight.get(key, 0), in_flight[key])
+            await asyncio.sleep(0.01)
+            in_flight[key] -= 1
+
+    async def run():
+        await asyncio.gather(*(one(*request) for request in requests))
+
+    asyncio.run(run())
+    return max_in_flight
+
+
+def test_global_limit_caps_all_requests():
+    """Проверяет глобальный лимит одновременных запросов."""
+    # ----------------- Arrange -----------------
+    scheduler = FetchScheduler(max_in_flight=3, max_per_host=100)
+    partner = SSPPartnerO()
+    requests = [(partner, f"https://host-{i}.example/", "all") for i in range(10)]
+
+    # ----------------- Act -----------------
+    result = run_requests(scheduler, requests)
+
+    # ----------------- Assert -----------------
+    assert result["all"] == 3
+
+
+def test_partner_limit_does_not_block_other_partners():
+    """Проверяет, что лимит партнёра действует только на его запросы."""
+    # ----------------- Arrange -----------------
+    scheduler = FetchScheduler(max_in_flight=100, max_per_host=100)
+    slow = SSPPartnerS(max_concurrency=1)
+    fast = SSPPartnerO()
+    requests = [(slow, f"https://s.example/{i}", "slow") for i in range(5)]
+    requests += [(fast, f"https://o.example/{i}", "fast") for i in range(5)]
+
+    # ----------------- Act -----------------
+    result = run_requests(scheduler, requests)
+
+    # ----------------- Assert -----------------
+    assert result == {"slow": 1, "fast": 5}
+
+
+def test_host_limit_from_partner_overrides_default():
+    """Проверяет лимит на хост, заданный на партнёре."""
+    # ----------------- Arrange -----------------
+    scheduler = FetchScheduler(max_in_flight=100, max_per_host=100)
+    partner = SSPPartnerS(max_concurrency_per_host=2)
+    requests = [(partner, f"https://s.example/{i}", "host") for i in range(6)]
+
+    # ----------------- Act -----------------
+    result = run_requests(scheduler, requests)
+
+    # ----------------- Assert -----------------
+    assert result["host"] == 2
+
+
+def test_stats_report_queue_depth_and_waits():
+    """Проверяет, что статистика содержит глубину очереди и время ожидания по партнёрам."""
+    # ----------------- Arrange -----------------
+    scheduler = FetchScheduler(max_in_flight=1, max_per_host=100)
+    partner = SSPPartnerO()
+    requests = [(partner, f"https://o.example/{i}", "o") for i in range(4)]
+
+    # ----------------- Act -----------------
+    run_requests(scheduler, requests)
+    stats = scheduler.stats()
+
+    # ----------------- Assert -----------------
+    assert stats["waiting"] == 0
+    assert stats["in_flight"] == 0
+    assert stats["max_waiting"] == 3
+    assert stats["partners"]["ssp-partner-o"]["requests"] == 4
+    assert stats["partners"]["ssp-partner-o"]["max_wait"] > 0
+
+
+def test_run_stats_are_kept_per_run_and_totals_stay_bounded():
+    """Проверяет, что у каждого запуска свои счётчики ожидания, а общие — только суммы без списков замеров."""
+    # ----------------- Arrange -----------------
+    scheduler = FetchScheduler(max_in_flight=1, max_per_host=100)
+    partner = SSPPartnerO()
+    first, second = SlotStats(), SlotStats()
+
+    async def one(url, run_stats):
+        async with scheduler.slot(partner, url, run_stats):
+            await asyncio.sleep(0.01)
+
+    async def run():
+        await asyncio.gather(*(one(f"https://o.example/{i}", first) for i in range(3)))
+        await asyncio.gather(*(one(f"https://o.example/{i}", second) for i in range(2)))
+
+    # ----------------- Act -----------------
+    asyncio.run(run())
+
+    # ----------------- Assert -----------------
+    assert scheduler.stats(first)["partners"]["ssp-partner-o"]["requests"] == 3
+    assert scheduler.stats(first)["max_waiting"] == 2
+    assert scheduler.stats(second)["partners"]["ssp-partner-o"]["requests"] == 2
+    assert scheduler.stats(second)["max_waiting"] == 1
+    assert scheduler.stats()["partners"]["ssp-partner-o"]["requests"] == 5
+    assert vars(scheduler.totals.partners["ssp-partner-o"]).keys() == {"requests", "total_wait", "max_wait"}
+
+
+def test_retry_backoff_does_not_hold_scheduler_slot(mocker):
+    """Проверяет, что партнёр, ждущий повтора после 503 с Retry-After, не держит слот и не тормозит других."""
+    # ----------------- Arrange -----------------
+    mocker.patch.dict(RETRY_CONFIG, {"backoff_base": 0.001, "backoff_max": 5.0})
+    scheduler = FetchScheduler(max_in_flight=1, max_per_host=100)
+    throttled, other = SSPPartnerO(), SSPPartnerS()
+    finished = []
+
+    def handler(request):
+        if request.url.host == "throttled.example" and not finished:
+            return httpx.Response(503, headers={"Retry-After": "0.5"})
+        return httpx.Response(200, text="ok")
+
+    async def fetch(partner, url, delay=0.0):
+        await asyncio.sleep(delay)
+        await partner.request_data(url)
+        finished.append((partner.id, time.monotonic()))
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            for partner in (throttled, other):
+                partner.bind_client(client)
+                partner.bind_scheduler(scheduler)
+            started = time.monotonic()
+            # второй партнёр приходит, когда первый уже спит до повтора
+            await asyncio.gather(fetch(throttled, "https://throttled.example/"),
+                                 fetch(other, "https://other.example/", delay=0.05))
+            return started
+
+    # ----------------- Act -----------------
+    started = asyncio.run(run())
+
+    # ----------------- Assert -----------------
+    assert [partner_id for partner_id, _ in finished] == ["ssp-partner-s", "ssp-partner-o"]
+    assert finished[0][1] - started < 0.4
@@ -0,0 +1,113 @@
+import asyncio
+import datetime
+import json
+
+import httpx
+import pytest
+
+import legacy.parser as parser
+from legacy.parser import aload_insert_data
+from legacy.partners.ssp_partners import SSPPartnerO
+from legacy.session import ParserSession
+
+O_BODIES = {
+    "2025-01-01": json.dumps({"data": [{"date": "2025-01-01", "impressionCount": 10, "spent": 1.0}]}).encode(),
+    "2025-01-02": json.dumps({"data": [{"date": "2025-01-02", "impressionCount": 20, "spent": 2.0}]}).encode(),
+}
+
+
+def handler(request):
+    return httpx.Response(200, content=O_BODIES[request.url.params["start_date"]])
+
+
+def test_concurrent_jobs_share_session_client(mocker):
+    """Проверяет, что задания в одном event loop идут через клиент сессии, не открывая свои пулы."""
+    # ----------------- Arrange -----------------
+    client_manager = mocker.spy(parser, "HttpClientManager")
+    new_run_context = mocker.spy(parser, "new_run_context")
+    inserted = {"2025-01-01": [], "2025-01-02": []}
+
+    async def run():
+        async with ParserSession(transport=httpx.MockTransport(handler)) as session:
+            reports = await asyncio.gather(*(
+                aload_insert_data(day, day, insert_func=inserted[day].extend, partners=[SSPPartnerO()], session=session)
+                for day in inserted
+            ))
+        return reports, session
+
+    # ----------------- Act -----------------
+    reports, session = asyncio.run(run())
+    contexts = new_run_context.spy_return_list
+
+    # ----------------- Assert -----------------
+    client_manager.assert_not_called()
+    assert session.client is None
+    assert [report["insert"]["rows"] for report in reports] == [1, 1]
+    assert [row.imps for row in inserted["2025-01-01"]] == [10]
+    assert [row.imps for row in inserted["2025-01-02"]] == [20]
+    assert session.scheduler.stats()["partners"]["ssp-partner-o"]["requests"] == 2
+    assert [session.scheduler.stats(context.scheduler_stats)["partners"]["ssp-partner-o"]["requests"]
+            for context in contexts] == [1, 1]
+
+
+def test_aload_insert_data_runs_inside_existing_loop():
+    """Проверяет, что асинхронный вход работает без сессии внутри уже запущенного event loop."""
+    # ----------------- Arrange -----------------
+    inserted = []
+    day = datetime.date(2025, 1, 1)
+
+    async def run():
+        # в работающем loop синхронный load_insert_data упал бы на asyncio.run
+        return await aload_insert_data(day, day, transport=httpx.MockTransport(handler),
+                                       insert_func=inserted.extend, partners=[SSPPartnerO()])
+
+    # ----------------- Act -----------------
+    report = asyncio.run(run())
+
+    # ----------------- Assert -----------------
+    assert report["partners"]["ssp-partner-o"]["rows"] == 1
+    assert [row.imps for row in inserted] == [10]
+
+
+def test_aload_insert_data_reports_failed_insert(mocker):
+    """Проверяет, что при упавшей вставке отчёт с типом ошибки всё равно уходит в метрики."""
+    # ----------------- Arrange -----------------
+    export_run = mocker.patch.object(parser, "export_run")
+    day = datetime.date(2025, 1, 1)
+
+    def insert_func(rows):
+        raise ConnectionError("clickhouse is down")
+
+    # ----------------- Act -----------------
+    with pytest.raises(ConnectionError):
+        asyncio.run(aload_insert_data(day, day, transport=httpx.MockTransport(handler),
+                                      insert_func=insert_func, partners=[SSPPartnerO()]))
+
+    # ----------------- Assert -----------------
+    report = export_run.call_args.args[0]
+    assert report["insert"]["error"] == "ConnectionError: clickhouse is down"
+    assert report["insert"]["error_types"] == {"ConnectionError": 1}
+
+
+def test_metrics_export_failure_does_not_fail_or_hide_insert_error(mocker):
+    """Проверяет, что сбой экспорта метрик логируется, не роняет запуск и не заслоняет ошибку вставки."""
+    # ----------------- Arrange -----------------
+    mocker.patch.object(parser, "export_run", side_effect=FileNotFoundError("no textfile directory"))
+    day = datetime.date(2025, 1, 1)
+    inserted = []
+
+    def failing_insert(rows):
+        raise ConnectionError("clickhouse is down")
+
+    def run(insert_func):
+        return asyncio.run(aload_insert_data(day, day, transport=httpx.MockTransport(handler),
+                                             insert_func=insert_func, partners=[SSPPartnerO()]))
+
+    # ----------------- Act -----------------
+    report = run(inserted.extend)
+    with pytest.raises(ConnectionError):
+        run(failing_insert)
+
+    # ----------------- Assert -----------------
+    assert report["insert"]["rows"] == 1
+    assert [row.imps for row in inserted] == [10]
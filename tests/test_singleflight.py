@@ -0,0 +1,121 @@
+import asyncio
+import datetime
+from unittest.mock import AsyncMock
+
+import pytest
+
+from legacy.abstract_partners import PartnerRecord
+from legacy.context import RunContext
+from legacy.parser import ok_parser
+from legacy.partners.ssp_partners import SSPPartnerD
+from legacy.singleflight import SingleFlight
+
+
+def test_concurrent_calls_with_same_key_share_one_call():
+    """Проверяет, что одновременные вызовы с одним ключом выполняются один раз."""
+    # ----------------- Arrange -----------------
+    single_flight = SingleFlight()
+    calls = 0
+
+    async def func():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "body"
+
+    async def run():
+        return await asyncio.gather(*(single_flight.do("key", func) for _ in range(3)))
+
+    # ----------------- Act -----------------
+    result = asyncio.run(run())
+
+    # ----------------- Assert -----------------
+    assert result == ["body", "body", "body"]
+    assert calls == 1
+    assert single_flight.shared == 2
+
+
+def test_exception_is_shared_by_all_waiters():
+    """Проверяет, что ошибка запроса получают все ожидающие."""
+    # ----------------- Arrange -----------------
+    single_flight = SingleFlight()
+
+    async def func():
+        await asyncio.sleep(0.01)
+        raise ConnectionError("boom")
+
+    async def run():
+        return await asyncio.gather(*(single_flight.do("key", func) for _ in range(2)), return_exceptions=True)
+
+    # ----------------- Act -----------------
+    result = asyncio.run(run())
+
+    # ----------------- Assert -----------------
+    assert all(isinstance(error, ConnectionError) for error in result)
+
+
+def test_finished_call_is_not_reused():
+    """Проверяет, что после завершения запроса следующий вызов идёт заново."""
+    # ----------------- Arrange -----------------
+    single_flight = SingleFlight()
+    func = AsyncMock(return_value="body")
+
+    async def run():
+        await single_flight.do("key", func)
+        await single_flight.do("key", func)
+
+    # ----------------- Act -----------------
+    asyncio.run(run())
+
+    # ----------------- Assert -----------------
+    assert func.await_count == 2
+
+
+def test_request_is_cancelled_only_with_last_waiter():
+    """Проверяет, что запрос живёт, пока его ждёт хоть кто-то, и отменяется с последним ожидающим."""
+    # ----------------- Arrange -----------------
+    single_flight = SingleFlight()
+
+    async def func():
+        await asyncio.sleep(10)
+
+    async def run():
+        first = asyncio.create_task(single_flight.do("key", func))
+        second = asyncio.create_task(single_flight.do("key", func))
+        await asyncio.sleep(0)
+        shared = next(iter(single_flight._calls.values()))
+        first.cancel()
+        await asyncio.gather(first, return_exceptions=True)
+        alive_after_first = not shared.done()
+        second.cancel()
+        await asyncio.gather(second, return_exceptions=True)
+        await asyncio.sleep(0)
+        return alive_after_first, shared.cancelled()
+
+    # ----------------- Act -----------------
+    alive_after_first, cancelled_after_last = asyncio.run(run())
+
+    # ----------------- Assert -----------------
+    assert alive_after_first
+    assert cancelled_after_last
+
+
+@pytest.mark.parametrize("coalesce, expected_fetches", [(True, 1), (False, 3)])
+def test_duplicate_partner_urls_are_fetched_once(coalesce, expected_fetches):
+    """Проверяет, что повторяющиеся URL партнёра загружаются один раз, а данные учитываются по каждому URL."""
+    # ----------------- Arrange -----------------
+    partner = SSPPartnerD(coalesce_requests=coalesce)
+
+    async def slow_fetch(url):
+        await asyncio.sleep(0.01)
+        return [PartnerRecord("2025-01-01", 2000, 18.0)]
+
+    partner.fetch_records = AsyncMock(side_effect=slow_fetch)
+    context = RunContext(single_flight=SingleFlight())
+
+    # ----------------- Act -----------------
+    result = asyncio.run(ok_parser(partner, datetime.date(2025, 1, 1), datetime.date(2025, 1, 1), context))
+
+    # ----------------- Assert -----------------
+    assert partner.fetch_records.await_count == expected_fetches
+    assert sum(row.imps for row in result) == 6000
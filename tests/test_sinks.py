@@ -0,0 +1,182 @@
+import asyncio
+import datetime
+import json
+import os
+import sys
+
+import httpx
+import pytest
+from pandas import Timestamp
+
+from legacy.context import RunContext
+from legacy.parser import load_and_insert
+from legacy.partner_data.batch import PartnerBatch
+from legacy.partner_data.data import PartnerData
+from legacy.partners.dsp_partners import DSPPartnerF
+from legacy.partners.ssp_partners import SSPPartnerO
+from legacy.sinks import FileSink, InsertSink, Sink, default_sinks
+
+DAY = datetime.date(2025, 1, 1)
+O_BODY = json.dumps({"data": [{"date": "2025-01-01", "impressionCount": 10, "spent": 1.0}]}).encode()
+F_BODY = b"<root><report><date>2025-01-01</date><impressions>5</impressions><revenue>0.5</revenue></report></root>"
+
+
+class RecordingSink(Sink):
+    def __init__(self):
+        self.events = []
+        self.batches = []
+
+    def open(self):
+        self.events.append("open")
+
+    def write(self, batch):
+        self.batches.append(batch)
+
+    def close(self):
+        self.events.append("close")
+
+    def abort(self):
+        self.events.append("abort")
+
+
+def rows():
+    return PartnerBatch.from_rows([
+        PartnerData(date=Timestamp("2025-01-01"), dsp_id=0, ssp="ssp-partner-o", imps=10, spent=1.0, currency="usd"),
+        PartnerData(date=Timestamp("2025-01-02"), dsp_id=0, ssp="ssp-partner-o", imps=20, spent=2.0, currency="usd"),
+        PartnerData(date=Timestamp("2025-01-01"), dsp_id=110, ssp="", imps=5, spent=0.5, currency="usd"),
+        PartnerData(date=Timestamp("2025-01-01"), dsp_id=110, ssp="", imps=7, spent=0.7, currency="eur"),
+    ])
+
+
+def test_load_and_insert_writes_every_batch_to_every_sink():
+    """Проверяет, что все приёмники открываются один раз и получают одни и те же пачки."""
+    # ----------------- Arrange -----------------
+    bodies = {"ssp-partner-o.example": O_BODY, "dsp-partner-f.example": F_BODY}
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, content=bodies[request.url.host]))
+    first, second = RecordingSink(), RecordingSink()
+
+    # ----------------- Act -----------------
+    asyncio.run(load_and_insert([SSPPartnerO(), DSPPartnerF()], DAY, DAY, transport=transport, sinks=[first, second]))
+
+    # ----------------- Assert -----------------
+    assert first.events == second.events == ["open", "close"]
+    assert first.batches == second.batches
+    assert sum(len(batch) for batch in first.batches) == 2
+
+
+def test_sinks_are_aborted_when_a_sink_fails():
+    """Проверяет, что при упавшей записи приёмники получают abort() вместо close()."""
+    # ----------------- Arrange -----------------
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, content=O_BODY))
+    recording = RecordingSink()
+
+    class FailingSink(Sink):
+        def write(self, batch):
+            raise OSError("disk full")
+
+    # ----------------- Act & Assert -----------------
+    with pytest.raises(OSError):
+        asyncio.run(load_and_insert([SSPPartnerO()], DAY, DAY, transport=transport, sinks=[recording, FailingSink()]))
+    assert recording.events == ["open", "abort"]
+
+
+def test_sink_without_write_cannot_be_created():
+    """Проверяет, что приёмник без write() падает при создании, а не посреди запуска."""
+    # ----------------- Arrange -----------------
+    class IncompleteSink(Sink):
+        def close(self):
+            pass
+
+    # ----------------- Act & Assert -----------------
+    with pytest.raises(TypeError, match="write"):
+        IncompleteSink()
+
+
+def test_default_sinks_follow_config(mocker):
+    """Проверяет, что без базы и с file_path приёмником остаётся только FileSink."""
+    # ----------------- Arrange -----------------
+    mocker.patch.dict("legacy.sinks.SINKS_CONFIG", {"database": False, "file_path": "/tmp/partner-data"})
+
+    # ----------------- Act -----------------
+    sinks = default_sinks()
+    with_insert_func = default_sinks(insert_func=print, context=RunContext())
+
+    # ----------------- Assert -----------------
+    assert [type(sink) for sink in sinks] == [FileSink]
+    assert [type(sink) for sink in with_insert_func] == [InsertSink, FileSink]
+
+
+def test_file_sink_requires_pyarrow(mocker, tmp_path):
+    """Проверяет понятную ошибку, если pyarrow не установлен."""
+    # ----------------- Arrange -----------------
+    mocker.patch.dict(sys.modules, {"pyarrow": None})
+
+    # ----------------- Act & Assert -----------------
+    with pytest.raises(ImportError, match="pip install pyarrow"):
+        FileSink(str(tmp_path)).open()
+
+
+def files_under(root):
+    return sorted(os.path.relpath(os.path.join(directory, name), root)
+                  for directory, _, names in os.walk(root) for name in names)
+
+
+def test_parquet_sink_partitions_by_day_and_partner(tmp_path):
+    """Проверяет, что Parquet пишется по разделам день/партнёр файлами не больше row_group_rows и читается обратно."""
+    # ----------------- Arrange -----------------
+    pq = pytest.importorskip("pyarrow.parquet")
+    sink = FileSink(str(tmp_path), "parquet", row_group_rows=4)
+
+    # ----------------- Act -----------------
+    with sink:
+        sink.write(rows())
+        sink.write(rows()[2:3])
+
+    # ----------------- Assert -----------------
+    assert files_under(tmp_path) == [
+        "day=2025-01-01/partner=110/part-00000.parquet", "day=2025-01-01/partner=110/part-00001.parquet",
+        "day=2025-01-01/partner=ssp-partner-o/part-00000.parquet", "day=2025-01-02/partner=ssp-partner-o/part-00000.parquet",
+    ]
+    table = pq.read_table(sink.partition_dir("2025-01-01", "110"))
+    assert table.column("imps").to_pylist() == [5, 7, 5]
+    assert table.column("date").to_pylist() == [datetime.date(2025, 1, 1)] * 3
+    assert sink.written_rows == 5
+
+
+def test_arrow_sink_rewrites_partition_on_rerun(tmp_path):
+    """Проверяет, что повторный запуск заменяет раздел Arrow IPC целиком, а не дописывает его."""
+    # ----------------- Arrange -----------------
+    ipc = pytest.importorskip("pyarrow.ipc")
+    with FileSink(str(tmp_path), "arrow", row_group_rows=1) as sink:
+        sink.write(rows())
+        sink.write(rows())
+
+    # ----------------- Act -----------------
+    with FileSink(str(tmp_path), "arrow") as sink:
+        sink.write(rows())
+
+    # ----------------- Assert -----------------
+    directory = sink.partition_dir("2025-01-01", "ssp-partner-o")
+    assert os.listdir(directory) == ["part-00000.arrow"]
+    table = ipc.open_file(os.path.join(directory, "part-00000.arrow")).read_all()
+    assert table.to_pydict()["imps"] == [10]
+    assert len(files_under(tmp_path)) == 3
+
+
+def test_file_sink_abort_keeps_previous_partitions(tmp_path):
+    """Проверяет, что после ошибки запуска временные файлы удалены, а прежние разделы не тронуты."""
+    # ----------------- Arrange -----------------
+    pytest.importorskip("pyarrow")
+    with FileSink(str(tmp_path)) as sink:
+        sink.write(rows())
+    before = files_under(tmp_path)
+
+    # ----------------- Act -----------------
+    with pytest.raises(OSError):
+        with FileSink(str(tmp_path), row_group_rows=1) as sink:
+            sink.write(rows()[2:3])
+            raise OSError("disk full")
+
+    # ----------------- Assert -----------------
+    assert files_under(tmp_path) == before
+    assert sorted(os.listdir(tmp_path)) == ["day=2025-01-01", "day=2025-01-02"]
@@ -0,0 +1,118 @@
+import asyncio
+import datetime
+import json
+import os
+
+import httpx
+from pandas import Timestamp
+
+from legacy.context import RunContext
+from legacy.parser import load_and_insert
+from legacy.partner_data.batch import PartnerBatch
+from legacy.partner_data.data import PartnerData
+from legacy.partners.ssp_partners import SSPPartnerO
+from legacy.spool import InsertSpool, SpooledInsert
+
+DAY = datetime.date(2025, 1, 1)
+O_BODY = json.dumps({"data": [{"date": "2025-01-01", "impressionCount": 10, "spent": 1.0}]}).encode()
+
+
+def batch(imps):
+    return PartnerBatch.from_rows([
+        PartnerData(date=Timestamp("2025-01-01"), dsp_id=0, ssp="ssp-partner-o", imps=imps, spent=1.5, currency="usd"),
+    ])
+
+
+def segments(directory):
+    return sorted(os.listdir(directory))
+
+
+def test_spool_keeps_unacknowledged_batches_for_next_run(tmp_path):
+    """Проверяет, что неподтверждённая пачка переживает запуск и досылается следующим, а сегмент удаляется."""
+    # ----------------- Arrange -----------------
+    directory = str(tmp_path / "spool")
+    with InsertSpool(directory) as spool:
+        spool.ack(spool.append(batch(1)))
+        spool.append(batch(2))
+    left_after_run = segments(directory)
+    replayed = []
+
+    # ----------------- Act -----------------
+    with InsertSpool(directory) as spool:
+        rows = spool.drain(replayed.append)
+
+    # ----------------- Assert -----------------
+    assert len(left_after_run) == 1
+    assert rows == 1
+    assert replayed == [batch(2)]
+    assert segments(directory) == []
+
+
+def test_spool_ignores_torn_tail_record(tmp_path):
+    """Проверяет, что недописанная при падении запись не мешает дослать целые пачки."""
+    # ----------------- Arrange -----------------
+    directory = str(tmp_path / "spool")
+    with InsertSpool(directory) as spool:
+        spool.append(batch(3))
+    path = os.path.join(directory, segments(directory)[0])
+    with open(path, "ab") as file:
+        file.write(b"SPB\x01\x00")
+    replayed = []
+
+    # ----------------- Act -----------------
+    with InsertSpool(directory) as spool:
+        spool.drain(replayed.append)
+
+    # ----------------- Assert -----------------
+    assert replayed == [batch(3)]
+
+
+def test_spooled_insert_stops_shipping_after_first_failure(tmp_path):
+    """Проверяет, что после сбоя вставки следующие пачки только сохраняются в спул."""
+    # ----------------- Arrange -----------------
+    calls, spooled = [], []
+
+    def failing_insert(rows):
+        calls.append(rows)
+        raise ConnectionError("database is down")
+
+    # ----------------- Act -----------------
+    with InsertSpool(str(tmp_path / "spool")) as spool:
+        insert = SpooledInsert(spool, failing_insert, spooled.append)
+        insert(batch(1))
+        insert(batch(2))
+
+    # ----------------- Assert -----------------
+    assert len(calls) == 1
+    assert spooled == [1, 1]
+    assert isinstance(insert.error, ConnectionError)
+
+
+def test_load_and_insert_replays_spool_after_database_outage(tmp_path):
+    """Проверяет, что данные запуска при недоступной базе не теряются и вставляются следующим запуском."""
+    # ----------------- Arrange -----------------
+    directory = str(tmp_path / "spool")
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, content=O_BODY))
+
+    def failing_insert(rows):
+        raise ConnectionError("database is down")
+
+    def run(insert_func):
+        context = RunContext(spool=InsertSpool(directory))
+        asyncio.run(load_and_insert([SSPPartnerO()], DAY, DAY, insert_func, transport, context))
+        return context.metrics.report()["insert"]
+
+    inserted = []
+
+    # ----------------- Act -----------------
+    outage = run(failing_insert)
+    recovery = run(inserted.append)
+
+    # ----------------- Assert -----------------
+    assert outage["spooled_rows"] == 1
+    assert outage["error"] == "ConnectionError: database is down"
+    assert recovery["replayed_rows"] == 1
+    assert recovery["spooled_rows"] == 0
+    # досланная пачка из спула и свежая пачка этого запуска
+    assert len(inserted) == 2
+    assert segments(directory) == []
@@ -0,0 +1,75 @@
+import asyncio
+import datetime
+
+import httpx
+
+from benchmarks.payloads import generate_payload
+from benchmarks.standin_server import LocalRedirectTransport, StandinConfig, StandinServer
+from legacy.parser import get_all_partners, load
+
+
+def run_against_standin(config, func):
+    """Поднимает стенд, выполняет func(transport) и возвращает результат и статистику сервера."""
+    async def run():
+        server = StandinServer(get_all_partners(), config)
+        port = await server.start()
+        try:
+            return await func(LocalRedirectTransport(port)), server.stats
+        finally:
+            await server.stop()
+
+    return asyncio.run(run())
+
+
+def test_standin_serves_partner_payload_by_host():
+    """Проверяет, что стенд отдаёт синтетический ответ партнёра по его Host."""
+    # ----------------- Arrange -----------------
+    config = StandinConfig(rows=10)
+
+    async def get(transport):
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await client.get("https://ssp-partner-o.example/reporting/dsp?start_date=a&end_date=b")
+
+    # ----------------- Act -----------------
+    response, stats = run_against_standin(config, get)
+
+    # ----------------- Assert -----------------
+    assert response.status_code == 200
+    assert response.content == generate_payload("ssp-partner-o", 10)
+    assert stats.by_host == {"ssp-partner-o.example": 1}
+
+
+def test_standin_injects_errors_and_rate_limits():
+    """Проверяет, что стенд отвечает 502 с заданной долей ошибок и 429 сверх лимита."""
+    # ----------------- Arrange -----------------
+    url = "https://dsp-partner-i.example/sspReport?start=a&end=b"
+
+    async def get_three(transport):
+        async with httpx.AsyncClient(transport=transport) as client:
+            return [(await client.get(url)).status_code for _ in range(3)]
+
+    # ----------------- Act -----------------
+    errors, _ = run_against_standin(StandinConfig(rows=1, error_rate=1.0), get_three)
+    limited, stats = run_against_standin(StandinConfig(rows=1, rate_limit=0.01, rate_burst=2), get_three)
+
+    # ----------------- Assert -----------------
+    assert errors == [502, 502, 502]
+    assert limited == [200, 200, 429]
+    assert stats.throttled == 1
+
+
+def test_load_runs_end_to_end_against_standin():
+    """Проверяет, что load() проходит по всем партнёрам, включая авторизацию, через стенд."""
+    # ----------------- Arrange -----------------
+    config = StandinConfig(rows=20)
+
+    async def run_load(transport):
+        return await load(get_all_partners(), datetime.date(2025, 1, 1), datetime.date(2025, 1, 1), transport)
+
+    # ----------------- Act -----------------
+    data, stats = run_against_standin(config, run_load)
+
+    # ----------------- Assert -----------------
+    assert {row.ssp for row in data} >= {"ssp-partner-m", "ssp-partner-b", "superpartner"}
+    assert stats.errors == 0
+    assert stats.requests >= 12
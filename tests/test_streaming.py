@@ -0,0 +1,72 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from legacy.abstract_partners import PartnerRecord, ResponseTooLargeError
+from legacy.http_client import HttpClientManager
+from legacy.partners.dsp_partners import DSPPartnerF
+from legacy.partners.ssp_partners import SSPPartnerO
+
+XML_REPORT = b"""<root>
+    <report><date>2025-01-01</date><impressions>900</impressions><revenue>9.9</revenue></report>
+    <report><date>2025-01-02</date><impressions>1200</impressions><revenue>12.5</revenue></report>
+</root>"""
+
+
+def chunked(body, size=16):
+    async def stream():
+        for i in range(0, len(body), size):
+            yield body[i:i + size]
+    return stream()
+
+
+def fetch(partner, handler):
+    async def run():
+        async with HttpClientManager(transport=httpx.MockTransport(handler)) as client:
+            partner.bind_client(client)
+            return await partner.fetch_records("https://partner.example/report")
+    return asyncio.run(run())
+
+
+def test_streaming_xml_partner_parses_chunks():
+    """Проверяет, что XML-партнёр в потоковом режиме разбирает тело по кускам."""
+    # ----------------- Act -----------------
+    result = fetch(DSPPartnerF(), lambda request: httpx.Response(200, content=chunked(XML_REPORT)))
+
+    # ----------------- Assert -----------------
+    assert result == [PartnerRecord("2025-01-01", 900, 9.9), PartnerRecord("2025-01-02", 1200, 12.5)]
+
+
+def test_streaming_json_partner_uses_buffered_parser():
+    """Проверяет, что JSON-партнёр с включённым потоком разбирает тело после загрузки."""
+    # ----------------- Arrange -----------------
+    partner = SSPPartnerO(stream_response=True)
+    body = json.dumps({"data": [{"date": "2025-01-01", "impressionCount": 2000, "spent": 20.5}]}).encode()
+
+    # ----------------- Act -----------------
+    result = fetch(partner, lambda request: httpx.Response(200, content=chunked(body)))
+
+    # ----------------- Assert -----------------
+    assert result == [PartnerRecord("2025-01-01", 2000, 20.5)]
+
+
+def test_content_length_over_limit_raises():
+    """Проверяет, что заявленный Content-Length больше лимита отклоняется до чтения тела."""
+    # ----------------- Arrange -----------------
+    partner = DSPPartnerF(max_body_size=10)
+
+    # ----------------- Act & Assert -----------------
+    with pytest.raises(ResponseTooLargeError):
+        fetch(partner, lambda request: httpx.Response(200, content=XML_REPORT))
+
+
+def test_streamed_body_over_limit_raises():
+    """Проверяет, что тело без Content-Length обрывается при превышении лимита."""
+    # ----------------- Arrange -----------------
+    partner = DSPPartnerF(max_body_size=32)
+
+    # ----------------- Act & Assert -----------------
+    with pytest.raises(ResponseTooLargeError):
+        fetch(partner, lambda request: httpx.Response(200, content=chunked(XML_REPORT)))
@@ -0,0 +1,163 @@
+import asyncio
+from dataclasses import dataclass
+import json
+
+import httpx
+import pytest
+
+from legacy.config import RETRY_CONFIG
+from legacy.http_client import HttpClientManager
+from legacy.partners.ssp_partners import SSPPartnerA, SSPPartnerB, SSPPartnerO
+from legacy.token_store import FileTokenStore, TokenStore
+
+
+def test_token_expires_with_margin(mocker):
+    """Проверяет, что токен перестаёт выдаваться за expiry_margin до истечения."""
+    # ----------------- Arrange -----------------
+    store = TokenStore(expiry_margin=60)
+    mocker.patch("legacy.token_store.time.time", return_value=1000.0)
+    store.set("superpartner", "token", expires_in=100)
+
+    # ----------------- Act & Assert -----------------
+    assert store.get("superpartner") == "token"
+    mocker.patch("legacy.token_store.time.time", return_value=1041.0)
+    assert store.get("superpartner") is None
+
+
+def test_file_store_is_shared_between_instances(tmp_path):
+    """Проверяет, что токен, сохранённый одним процессом, виден другому через файл."""
+    # ----------------- Arrange -----------------
+    path = str(tmp_path / "tokens.json")
+    FileTokenStore(path).set("ssp-partner-b", "shared-token")
+
+    # ----------------- Act -----------------
+    result = FileTokenStore(path).get("ssp-partner-b")
+
+    # ----------------- Assert -----------------
+    assert result == "shared-token"
+    with open(path) as file:
+        assert json.load(file)["ssp-partner-b"]["token"] == "shared-token"
+
+
+def test_file_store_invalidate_removes_token(tmp_path):
+    """Проверяет, что invalidate удаляет токен и из файла."""
+    # ----------------- Arrange -----------------
+    path = str(tmp_path / "tokens.json")
+    FileTokenStore(path).set("ssp-partner-b", "shared-token")
+
+    # ----------------- Act -----------------
+    FileTokenStore(path).invalidate("ssp-partner-b")
+
+    # ----------------- Assert -----------------
+    assert FileTokenStore(path).get("ssp-partner-b") is None
+
+
+def run_with_transport(handler, coro_factory):
+    async def run():
+        async with HttpClientManager(transport=httpx.MockTransport(handler)) as client:
+            return await coro_factory(client)
+    return asyncio.run(run())
+
+
+def test_cached_token_skips_login_for_next_job():
+    """Проверяет, что второй экземпляр партнёра берёт токен из кэша без логина."""
+    # ----------------- Arrange -----------------
+    logins = []
+
+    def handler(request):
+        logins.append(str(request.url))
+        return httpx.Response(200, json={"access_token": "oauth-token", "expires_in": 3600})
+
+    async def two_jobs(client):
+        for partner in (SSPPartnerA(), SSPPartnerA()):
+            partner.bind_client(client)
+            await partner.authentificate()
+        return partner._headers
+
+    # ----------------- Act -----------------
+    headers = run_with_transport(handler, two_jobs)
+
+    # ----------------- Assert -----------------
+    assert logins == ["https://ssp-partner-a.example/oauth2/token"]
+    assert headers["Authorization"] == "Bearer oauth-token"
+
+
+def test_request_data_refreshes_token_on_401():
+    """Проверяет, что на 401 партнёр логинится заново и повторяет запрос с новым токеном."""
+    # ----------------- Arrange -----------------
+    store = TokenStore()
+    store.set("ssp-partner-b", "stale-token")
+    partner = SSPPartnerB(token_store=store)
+
+    def handler(request):
+        if request.method == "POST":
+            return httpx.Response(200, json={"data": "fresh-token"})
+        if request.headers["Authorization"] == "Token stale-token":
+            return httpx.Response(401)
+        return httpx.Response(200, text="report")
+
+    async def fetch(client):
+        partner.bind_client(client)
+        await partner.authentificate()
+        return await partner.request_data("https://ssp-partner-b.example/report")
+
+    # ----------------- Act -----------------
+    result = run_with_transport(handler, fetch)
+
+    # ----------------- Assert -----------------
+    assert result == "report"
+    assert store.get("ssp-partner-b") == "fresh-token"
+
+
+def test_login_is_retried_and_rejected_login_raises(mocker):
+    """Проверяет, что логин повторяется после 503, а отказ (403) поднимает ошибку, а не ломает разбор JSON."""
+    # ----------------- Arrange -----------------
+    mocker.patch.dict(RETRY_CONFIG, {"backoff_base": 0.001, "backoff_max": 0.01})
+    statuses = {"ssp-partner-a.example": [503, 200], "ssp-partner-b.example": [403]}
+
+    def handler(request):
+        status = statuses[request.url.host].pop(0)
+        return httpx.Response(status, json={"access_token": "oauth-token", "expires_in": 3600} if status == 200 else {})
+
+    async def login(client):
+        partner_a, partner_b = SSPPartnerA(token_store=TokenStore()), SSPPartnerB(token_store=TokenStore())
+        for partner in (partner_a, partner_b):
+            partner.bind_client(client)
+        await partner_a.authentificate()
+        with pytest.raises(httpx.HTTPStatusError):
+            await partner_b.authentificate()
+        return partner_a._headers
+
+    # ----------------- Act -----------------
+    headers = run_with_transport(handler, login)
+
+    # ----------------- Assert -----------------
+    assert headers["Authorization"] == "Bearer oauth-token"
+    assert statuses == {"ssp-partner-a.example": [], "ssp-partner-b.example": []}
+
+
+def test_file_store_is_private_to_owner(tmp_path):
+    """Проверяет, что файл токенов и его .lock доступны только владельцу, даже если файл был создан раньше."""
+    # ----------------- Arrange -----------------
+    path = tmp_path / "tokens.json"
+    path.write_text("{}")
+    path.chmod(0o644)
+
+    # ----------------- Act -----------------
+    FileTokenStore(str(path)).set("ssp-partner-b", "shared-token")
+
+    # ----------------- Assert -----------------
+    assert path.stat().st_mode & 0o777 == 0o600
+    assert (tmp_path / "tokens.json.lock").stat().st_mode & 0o777 == 0o600
+
+
+def test_partner_with_auth_scheme_must_override_request_token():
+    """Проверяет, что партнёр с auth_scheme без request_token не создаётся, а не падает посреди запуска."""
+    # ----------------- Act & Assert -----------------
+    with pytest.raises(TypeError, match="request_token"):
+        @dataclass
+        class PartnerWithoutLogin(SSPPartnerO):
+            auth_scheme: str = "Bearer"
+
+    with pytest.raises(TypeError, match="request_token"):
+        SSPPartnerO(auth_scheme="Bearer")
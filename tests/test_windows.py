@@ -0,0 +1,73 @@
+import asyncio
+import datetime
+from unittest.mock import AsyncMock
+
+import pandas as pd
+import pytest
+
+from legacy.abstract_partners import PartnerRecord
+from legacy.parser import ok_parser
+from legacy.partners.ssp_partners import SSPPartnerO
+from legacy.windows import split_date_range
+
+
+def test_no_window_returns_whole_range():
+    """Проверяет, что без окна диапазон не делится."""
+    start, finish = datetime.date(2025, 1, 1), datetime.date(2025, 12, 31)
+    assert split_date_range(start, finish) == [(start, finish)]
+
+
+def test_day_windows():
+    """Проверяет деление по дням."""
+    result = split_date_range(datetime.date(2025, 1, 30), datetime.date(2025, 2, 1), "day")
+    assert result == [
+        (datetime.date(2025, 1, 30), datetime.date(2025, 1, 30)),
+        (datetime.date(2025, 1, 31), datetime.date(2025, 1, 31)),
+        (datetime.date(2025, 2, 1), datetime.date(2025, 2, 1)),
+    ]
+
+
+def test_week_windows_follow_calendar_weeks():
+    """Проверяет деление по календарным неделям (пн–вс) с обрезкой краёв."""
+    # 2025-01-01 — среда
+    result = split_date_range(datetime.date(2025, 1, 1), datetime.date(2025, 1, 14), "week")
+    assert result == [
+        (datetime.date(2025, 1, 1), datetime.date(2025, 1, 5)),
+        (datetime.date(2025, 1, 6), datetime.date(2025, 1, 12)),
+        (datetime.date(2025, 1, 13), datetime.date(2025, 1, 14)),
+    ]
+
+
+def test_month_windows_with_timestamps():
+    """Проверяет деление по месяцам для pd.Timestamp, включая февраль."""
+    result = split_date_range(pd.Timestamp("2024-01-15"), pd.Timestamp("2024-03-10"), "month")
+    assert result == [
+        (pd.Timestamp("2024-01-15"), pd.Timestamp("2024-01-31")),
+        (pd.Timestamp("2024-02-01"), pd.Timestamp("2024-02-29")),
+        (pd.Timestamp("2024-03-01"), pd.Timestamp("2024-03-10")),
+    ]
+
+
+def test_unknown_window_raises():
+    """Проверяет, что неизвестное окно отклоняется."""
+    with pytest.raises(ValueError):
+        split_date_range(datetime.date(2025, 1, 1), datetime.date(2025, 1, 2), "year")
+
+
+def test_ok_parser_fetches_every_window():
+    """Проверяет, что ok_parser строит и загружает URL для каждого окна партнёра."""
+    # ----------------- Arrange -----------------
+    partner = SSPPartnerO(date_window="month")
+    partner.fetch_records = AsyncMock(return_value=[PartnerRecord("2025-01-01", 1, 1.0)])
+
+    # ----------------- Act -----------------
+    result = asyncio.run(ok_parser(partner, datetime.date(2025, 1, 1), datetime.date(2025, 3, 1)))
+
+    # ----------------- Assert -----------------
+    fetched_urls = [call.args[0] for call in partner.fetch_records.call_args_list]
+    assert fetched_urls == [
+        "https://ssp-partner-o.example/reporting/dsp?start_date=2025-01-01&end_date=2025-01-31",
+        "https://ssp-partner-o.example/reporting/dsp?start_date=2025-02-01&end_date=2025-02-28",
+        "https://ssp-partner-o.example/reporting/dsp?start_date=2025-03-01&end_date=2025-03-01",
+    ]
+    assert len(result) == 3